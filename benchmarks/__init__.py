@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准脚本，不访问网络
+"""
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+端到端爬取基准
+四个爬虫分别爬取本地模拟站点（spider_core.mocksite）上 10 / 1000 / 100000 页的合成站点，
+统计抓取延迟分位数、每页解析耗时、每秒记录数、峰值内存（RSS）和导出文件耗时，
+结果保存为 JSON，可以与之前的结果比较并标出退化的指标。
+
+每个用例在单独的子进程中运行，峰值 RSS 只包含该爬虫本身；模拟站点运行在主进程中。
+
+运行方式（在仓库根目录）:
+    python -m benchmarks.bench_crawl --sizes 10 1000
+    python -m benchmarks.bench_crawl --compare bench_results/crawl_20250101_120000.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import functools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_strainer import scratch_dir  # noqa: E402
+from spider_core.mocksite import MockSite  # noqa: E402
+
+# 爬虫名 -> (目录, 模块, 类名, 模拟站点名)
+SPIDERS = {
+    'maoyan': ('p02_maoyan', 'maoyan_spider', 'MaoyanSpider', 'maoyan'),
+    'cnblogs': ('p03_cnblogs', 'cnblogs_spider', 'CnblogsSpider', 'cnblogs'),
+    'enhanced': ('p04_bendibao', 'enhanced_crawler', 'EnhancedSchoolPolicyCrawler', 'bendibao'),
+    'school': ('p04_bendibao', 'school_policy_crawler', 'SchoolPolicyCrawler', 'bendibao'),
+}
+SIZES = (10, 1000, 100000)
+RESULTS_DIR = os.path.join(ROOT, 'bench_results')
+
+# 比较时的指标：(名称, 越大越好)
+METRICS = [
+    ('records_per_s', True),
+    ('parse_ms_per_page', False),
+    ('fetch_ms.p50', False),
+    ('fetch_ms.p99', False),
+    ('write_s', False),
+    ('peak_rss_mb', False),
+]
+
+
+def percentiles(samples):
+    """毫秒样本的 p50/p90/p99/max（最近秩法）"""
+    if not samples:
+        return {'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {'p50': rank(50), 'p90': rank(90), 'p99': rank(99), 'max': ordered[-1]}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位是 KB，macOS 上是字节
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class StageTimes:
+    """按阶段收集耗时（毫秒），包装爬虫实例上的方法"""
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def wrap(self, obj, method, stage):
+        func = getattr(obj, method)
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                with self.lock:
+                    self.samples.setdefault(stage, []).append(elapsed)
+
+        setattr(obj, method, timed)
+
+    def get(self, stage):
+        return self.samples.get(stage, [])
+
+
+def build_spider(name):
+    directory, module, class_name, _ = SPIDERS[name]
+    sys.path.insert(0, os.path.join(ROOT, directory))
+    return getattr(__import__(module), class_name)()
+
+
+def run_case(name, base_url, pages):
+    """子进程中运行一个用例，返回结果字典"""
+    from spider_core.ratelimit import RateLimiter
+
+    with scratch_dir(), contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        spider = build_spider(name)
+        spider.base_url = base_url
+        # 本地站点不限速，出错时立即重试
+        spider.rate_limiter = RateLimiter()
+        spider.retry_backoff = 0
+        times = StageTimes()
+        times.wrap(spider, 'get_page_content', 'fetch')
+        times.wrap(spider, 'parse', 'parse')
+        exports = [method for method in ('save_to_json', 'save_to_csv', 'save_to_parquet') if hasattr(spider, method)]
+        for method in exports:
+            times.wrap(spider, method, 'write')
+
+        start = time.perf_counter()
+        if name == 'maoyan':
+            # crawl 结束时自己导出 JSON/CSV/Parquet
+            spider.crawl()
+        else:
+            spider.crawl_all_pages()
+            for method in exports:
+                getattr(spider, method)()
+        total = time.perf_counter() - start
+        records = sum(1 for _ in spider.iter_records())
+
+    write_s = sum(times.get('write')) / 1000
+    crawl_s = total - write_s
+    parse_samples = times.get('parse')
+    return {
+        'spider': name,
+        'pages': pages,
+        'records': records,
+        'pages_fetched': len(times.get('fetch')),
+        'crawl_s': round(crawl_s, 3),
+        'pages_per_s': round(len(parse_samples) / crawl_s, 1) if crawl_s else 0,
+        'records_per_s': round(records / crawl_s, 1) if crawl_s else 0,
+        'fetch_ms': {key: round(value, 2) for key, value in percentiles(times.get('fetch')).items()},
+        'parse_ms': {key: round(value, 2) for key, value in percentiles(parse_samples).items()},
+        'parse_ms_per_page': round(sum(parse_samples) / len(parse_samples), 3) if parse_samples else 0,
+        'write_s': round(write_s, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def run(spiders, sizes, latency=0, error_rate=0.0):
+    results = []
+    for pages in sizes:
+        for name in spiders:
+            with MockSite(pages=pages, latency=latency, error_rate=error_rate) as site:
+                command = [sys.executable, '-m', 'benchmarks.bench_crawl', '--run-case', name,
+                           '--base-url', site.base_url(SPIDERS[name][3]), '--pages', str(pages)]
+                completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"{name} {pages} 页运行失败:\n{completed.stderr}", file=sys.stderr)
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            result['requests'] = site.request_count
+            results.append(result)
+            print_row(result)
+    return results
+
+
+def print_header():
+    print(f"{'爬虫':<10}{'页数':>8}{'记录数':>10}{'页/秒':>9}{'记录/秒':>10}{'抓取p50':>9}{'抓取p99':>9}"
+          f"{'解析ms/页':>10}{'导出s':>8}{'RSS MB':>8}")
+
+
+def print_row(result):
+    print(f"{result['spider']:<10}{result['pages']:>8}{result['records']:>10}{result['pages_per_s']:>9.1f}"
+          f"{result['records_per_s']:>10.1f}{result['fetch_ms']['p50']:>9.2f}{result['fetch_ms']['p99']:>9.2f}"
+          f"{result['parse_ms_per_page']:>10.2f}{result['write_s']:>8.2f}{result['peak_rss_mb']:>8.1f}")
+
+
+def metric(result, name):
+    value = result
+    for part in name.split('.'):
+        value = value[part]
+    return value
+
+
+def compare(baseline, results, threshold=0.2):
+    """与之前的结果逐项比较，变差超过 threshold（比例）的指标记为退化，返回退化列表"""
+    previous = {(result['spider'], result['pages']): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get((result['spider'], result['pages']))
+        if old is None:
+            continue
+        for name, higher_is_better in METRICS:
+            before, after = metric(old, name), metric(result, name)
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            flag = "  <-- 退化" if worse > threshold else ""
+            if flag:
+                regressions.append((result['spider'], result['pages'], name, before, after))
+            print(f"{result['spider']:<10}{result['pages']:>8}  {name:<18}{before:>12.2f} -> {after:>12.2f}"
+                  f"  ({change:+.0%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端爬取基准（本地模拟站点，不访问外网）")
+    parser.add_argument('--spiders', nargs='+', choices=sorted(SPIDERS), default=list(SPIDERS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES), help="合成站点的页数")
+    parser.add_argument('--latency', type=float, default=0, help="模拟站点每个请求的延迟（秒）")
+    parser.add_argument('--error-rate', type=float, default=0, help="模拟站点随机返回 503 的概率")
+    parser.add_argument('--output', help="结果 JSON 路径，默认 bench_results/crawl_<时间>.json")
+    parser.add_argument('--compare', help="与之前的结果 JSON 比较")
+    parser.add_argument('--threshold', type=float, default=0.2, help="变差超过该比例时记为退化")
+    # 子进程内部使用
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    parser.add_argument('--pages', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.base_url, args.pages)))
+        return 0
+
+    print_header()
+    results = run(args.spiders, args.sizes, args.latency, args.error_rate)
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"crawl_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n与 {args.compare} 比较（阈值 {args.threshold:.0%}）:")
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n发现 {len(regressions)} 项退化")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
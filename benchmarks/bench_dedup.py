@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+跨运行去重（spider_core.dedup）的微基准
+先用 N 个键建好去重库（模拟之前的运行），再在新的一次运行中分别测量：
+- Bloom 探测：没见过的键只做 crc32 和一次按位与
+- 新键 check：Bloom 判断没见过，直接放行，不查 SQLite、不算指纹（不含批量写入）
+- 批量写入：待写入的键算指纹后写入 SQLite，按键折算
+- 本次重复 check：键在本次运行中刚登记过，还在内存中
+- 以前见过 check：Bloom 命中后查 SQLite 的精确指纹
+以及没见过的键的 Bloom 误判率、位图大小和扩容次数。
+
+运行方式（在仓库根目录）:
+    python -m benchmarks.bench_dedup
+    python -m benchmarks.bench_dedup --sizes 100000 1000000 3000000 --capacity 1000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_strainer import scratch_dir  # noqa: E402
+from spider_core.dedup import DedupFilter  # noqa: E402
+
+SIZES = (100_000, 1_000_000)
+# 每项测量的键数
+SAMPLE = 100_000
+
+
+def make_keys(prefix, count):
+    return [f'http://sh.bendibao.com/news/{prefix}/{i}.shtm' for i in range(count)]
+
+
+def per_op(func, keys):
+    """对每个键调用一次 func，返回每次的微秒数"""
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def run_size(size, capacity=None, sample=SAMPLE):
+    # 默认容量按本次基准会登记的全部键数设置，不触发扩容
+    capacity = capacity or size + 2 * sample
+    path = os.path.abspath('dedup.db')
+    existing = make_keys('old', size)
+    started = time.perf_counter()
+    with DedupFilter(path, capacity=capacity) as dedup:
+        for key in existing:
+            dedup.check(key)
+    build = time.perf_counter() - started
+
+    unseen = make_keys('new', sample)
+    with DedupFilter(path, capacity=capacity) as dedup:
+        probe = per_op(dedup.bloom.__contains__, unseen)
+        false_positive_rate = sum(key in dedup.bloom for key in unseen) / len(unseen)
+        # 测量期间不触发批量写入，写入单独计时
+        dedup.batch_size = len(unseen) + 1
+        check_new = per_op(dedup.check, unseen)
+        started = time.perf_counter()
+        dedup.flush()
+        flush = (time.perf_counter() - started) / len(unseen) * 1e6
+
+        recent = make_keys('recent', min(sample, 1000))
+        for key in recent:
+            dedup.check(key)
+        check_duplicate = per_op(dedup.check, recent * (sample // len(recent)))
+        check_known = per_op(dedup.check, existing[:sample])
+        bloom_mb = len(dedup.bloom.words) * 8 / 1024 / 1024
+        resizes = dedup.resizes
+    os.remove(path)
+    return {
+        'keys': size,
+        'build_s': round(build, 2),
+        'probe_us': round(probe, 3),
+        'check_new_us': round(check_new, 3),
+        'flush_us_per_key': round(flush, 3),
+        'check_duplicate_us': round(check_duplicate, 3),
+        'check_known_us': round(check_known, 3),
+        'false_positive_rate': round(false_positive_rate, 5),
+        'bloom_mb': round(bloom_mb, 1),
+        'resizes': resizes,
+    }
+
+
+def print_header():
+    print(f"{'键数':>10}{'建库 s':>9}{'探测 µs':>10}{'新键 µs':>10}{'写入 µs/键':>12}{'本次重复 µs':>13}"
+          f"{'以前见过 µs':>13}{'误判率':>9}{'位图 MB':>9}{'扩容':>6}")
+
+
+def print_row(row):
+    print(f"{row['keys']:>10}{row['build_s']:>9.2f}{row['probe_us']:>10.3f}{row['check_new_us']:>10.3f}"
+          f"{row['flush_us_per_key']:>12.3f}{row['check_duplicate_us']:>13.3f}{row['check_known_us']:>13.3f}"
+          f"{row['false_positive_rate']:>9.2%}{row['bloom_mb']:>9.1f}{row['resizes']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="跨运行去重的微基准（本地 SQLite，不访问网络）")
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES), help="去重库中已有的键数，可给多个")
+    parser.add_argument('--capacity', type=int, help="Bloom 初始容量，默认能容纳全部键；小于键数时测量扩容")
+    parser.add_argument('--sample', type=int, default=SAMPLE, help="每项测量的键数")
+    parser.add_argument('--json', help="同时把结果写入该 JSON 文件")
+    args = parser.parse_args()
+
+    print_header()
+    rows = []
+    with scratch_dir():
+        for size in args.sizes:
+            row = run_size(size, args.capacity, args.sample)
+            rows.append(row)
+            print_row(row)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
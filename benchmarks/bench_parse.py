@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+解析函数微基准
+不访问网络，只测纯解析函数：parse_movie_info、parse_blog_list / extract_blog_info、
+parse_page / extract_summary / extract_publish_time、get_total_pages。
+页面包括仓库中保存的页面（output/film.html、output/cnblogs.html、模拟站点的本地宝列表页）
+和把列表条目放大到数千条的合成页面，每个函数在各解析后端上分别测量：
+- 每次调用耗时（autorange 后重复 3 次取最小值）和每个条目的耗时
+- 调用期间的峰值内存（tracemalloc，只统计 Python 对象，lxml 文档树的 C 内存不在其中）
+- 调用结束、保留返回值时仍存活的内存块数（CPython 没有累计分配次数的计数器，
+  用存活块数衡量函数留下了多少对象）
+
+运行方式（在仓库根目录）:
+    python -m benchmarks.bench_parse
+    python -m benchmarks.bench_parse --items 1000 5000 --functions parse_blog_list extract_blog_info
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'p02_maoyan'))
+sys.path.insert(0, os.path.join(ROOT, 'p03_cnblogs'))
+sys.path.insert(0, os.path.join(ROOT, 'p04_bendibao'))
+
+from maoyan_spider import MaoyanSpider  # noqa: E402
+from cnblogs_spider import CnblogsSpider  # noqa: E402
+from enhanced_crawler import EnhancedSchoolPolicyCrawler  # noqa: E402
+from school_policy_crawler import SchoolPolicyCrawler  # noqa: E402
+from benchmarks.bench_strainer import read_fixture, scratch_dir  # noqa: E402
+from spider_core.mocksite import render_bendibao_list  # noqa: E402
+from spider_core.pages import ParsedPage  # noqa: E402
+from spider_core.parsers import HAS_LXML, HTML_PARSER, LXML, LXML_XPATH, make_soup, make_tree  # noqa: E402
+
+FUNCTIONS = (
+    'parse_movie_info',
+    'parse_blog_list',
+    'extract_blog_info',
+    'parse_page',
+    'extract_summary',
+    'extract_publish_time',
+    'get_total_pages',
+)
+# 合成页面默认的列表条目数
+ITEMS = (1000,)
+# 本地宝合成页面的总页数，只影响分页链接
+BENDIBAO_PAGES = 50
+
+
+def available_backends():
+    return (HTML_PARSER, LXML, LXML_XPATH) if HAS_LXML else (HTML_PARSER,)
+
+
+# ---- 页面 ----
+
+def scale_list(html_content, tag, class_name, wrapper, count):
+    """取出页面中的列表条目，循环复制到 count 条，包进 wrapper 模板"""
+    entries = [str(node) for node in make_soup(html_content, HTML_PARSER).find_all(tag, class_=class_name)]
+    body = ''.join(entries[i % len(entries)] for i in range(count))
+    return wrapper.format(body)
+
+
+def fixtures(items):
+    """返回 {站点: [(页面名, HTML)]}：保存的页面在前，之后是各规模的合成页面"""
+    film = read_fixture('film.html')
+    cnblogs = read_fixture('cnblogs.html')
+    pages = {
+        'maoyan': [('film.html', film)],
+        'cnblogs': [('cnblogs.html', cnblogs)],
+        'bendibao': [('list_17_727_1.htm', render_bendibao_list(1, BENDIBAO_PAGES))],
+    }
+    for count in items:
+        pages['maoyan'].append((f'film x{count}', scale_list(
+            film, 'dd', None, '<html><body><dl class="board-wrapper">{}</dl></body></html>', count)))
+        pages['cnblogs'].append((f'cnblogs x{count}', scale_list(
+            cnblogs, 'div', 'day', '<html><body><div id="mainContent"><div class="forFlow">{}</div></div></body></html>',
+            count)))
+        pages['bendibao'].append((f'bendibao x{count}', render_bendibao_list(1, BENDIBAO_PAGES, count)))
+    return pages
+
+
+# ---- 用例 ----
+
+def maoyan_cases(spider, name, html_content, backend):
+    spider.parser_backend = backend
+    items = len(spider.parse_movie_info(html_content))
+    yield 'parse_movie_info', items, lambda: spider.parse_movie_info(html_content)
+
+
+def cnblogs_cases(spider, name, html_content, backend):
+    spider.parser_backend = backend
+    items = len(spider.parse_blog_list(html_content))
+    yield 'parse_blog_list', items, lambda: spider.parse_blog_list(html_content)
+
+    # 单条提取，不含建树
+    if backend == LXML_XPATH:
+        day_divs = make_tree(html_content).xpath("//div[contains(concat(' ', normalize-space(@class), ' '), ' day ')]")
+        extract = spider.extract_blog_info_xpath
+    else:
+        day_divs = make_soup(html_content, backend, parse_only=spider.list_strainer).find_all('div', class_='day')
+        extract = spider.extract_blog_info
+    yield 'extract_blog_info', len(day_divs), lambda: [extract(day_div) for day_div in day_divs]
+
+
+def bendibao_cases(spiders, name, html_content, backend):
+    # 本地宝爬虫中 lxml-xpath 同 lxml
+    if backend == LXML_XPATH:
+        return
+    enhanced, school = spiders
+    for spider in spiders:
+        spider.parser_backend = backend
+    label = {enhanced: 'enhanced', school: 'school'}
+
+    for spider in spiders:
+        items = len(spider.parse_page(html_content, 1))
+        yield f'parse_page[{label[spider]}]', items, lambda spider=spider: spider.parse_page(html_content, 1)
+
+    articles = make_soup(html_content, backend).select('.list-article li')
+    titles = [article.find('a').get_text().strip() for article in articles]
+    pairs = list(zip(articles, titles))
+    yield 'extract_summary', len(articles), lambda: [enhanced.extract_summary(a, title) for a, title in pairs]
+    yield 'extract_publish_time', len(articles), lambda: [enhanced.extract_publish_time(a) for a in articles]
+
+    # 文档树已构建好，只测分页链接的查找；耗时随文档树大小增长，按文章数折算
+    page = ParsedPage(None, html_content, backend)
+    page.soup
+    for spider in spiders:
+        yield f'get_total_pages[{label[spider]}]', len(articles), lambda spider=spider: spider.get_total_pages(page)
+
+
+# ---- 测量 ----
+
+def measure(func, repeat=3):
+    """返回 (每次调用 ms, 峰值 KB, 存活内存块数)"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    per_call = min(timer.repeat(repeat, number)) / number * 1000
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    del result
+    return per_call, peak, blocks
+
+
+def run(items=ITEMS, functions=FUNCTIONS, backends=None):
+    backends = backends or available_backends()
+    with scratch_dir(), contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        maoyan = MaoyanSpider()
+        cnblogs = CnblogsSpider()
+        bendibao = (EnhancedSchoolPolicyCrawler(), SchoolPolicyCrawler())
+        sites = {
+            'maoyan': lambda name, html, backend: maoyan_cases(maoyan, name, html, backend),
+            'cnblogs': lambda name, html, backend: cnblogs_cases(cnblogs, name, html, backend),
+            'bendibao': lambda name, html, backend: bendibao_cases(bendibao, name, html, backend),
+        }
+        rows = []
+        for site, pages in fixtures(items).items():
+            for name, html_content in pages:
+                for backend in backends:
+                    for function, count, func in sites[site](name, html_content, backend):
+                        if function.split('[')[0] not in functions:
+                            continue
+                        per_call, peak, blocks = measure(func)
+                        row = {
+                            'function': function,
+                            'page': name,
+                            'backend': backend,
+                            'items': count,
+                            'ms_per_call': round(per_call, 3),
+                            'us_per_item': round(per_call * 1000 / count, 1) if count else 0,
+                            'peak_kb': round(peak),
+                            'live_blocks': blocks,
+                        }
+                        rows.append(row)
+                        print_row(row, file=sys.stderr)
+    return rows
+
+
+def print_header(file=None):
+    print(f"{'函数':<32}{'页面':<20}{'后端':<12}{'条目':>7}{'ms/次':>10}{'µs/条':>9}{'峰值 KB':>10}{'存活块':>9}",
+          file=file)
+
+
+def print_row(row, file=None):
+    print(f"{row['function']:<32}{row['page']:<20}{row['backend']:<12}{row['items']:>7}{row['ms_per_call']:>10.3f}"
+          f"{row['us_per_item']:>9.1f}{row['peak_kb']:>10}{row['live_blocks']:>9}", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解析函数微基准（保存的页面与放大的合成页面，不访问网络）")
+    parser.add_argument('--items', nargs='*', type=int, default=list(ITEMS), help="合成页面的列表条目数，可给多个")
+    parser.add_argument('--functions', nargs='+', choices=FUNCTIONS, default=list(FUNCTIONS))
+    parser.add_argument('--backends', nargs='+', choices=available_backends(), help="默认测量全部可用后端")
+    parser.add_argument('--json', help="同时把结果写入该 JSON 文件")
+    args = parser.parse_args()
+
+    # 进度逐行写到 stderr（stdout 在测量期间被重定向）
+    print_header(file=sys.stderr)
+    rows = run(args.items, args.functions, args.backends)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
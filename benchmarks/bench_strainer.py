@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+SoupStrainer 限定子树解析的基准
+在 output/cnblogs.html、output/film.html 上比较整棵树解析与只解析列表子树的
+耗时和峰值内存
+
+运行方式（在仓库根目录）:
+    python -m benchmarks.bench_strainer
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'p02_maoyan'))
+sys.path.insert(0, os.path.join(ROOT, 'p03_cnblogs'))
+
+from maoyan_spider import MaoyanSpider  # noqa: E402
+from cnblogs_spider import CnblogsSpider  # noqa: E402
+from spider_core.parsers import HTML_PARSER, LXML  # noqa: E402
+
+
+def read_fixture(name):
+    with open(os.path.join(ROOT, 'output', name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def measure(parse, html_content, repeat):
+    """返回 (平均耗时 ms, 峰值内存 KB)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        parse(html_content)  # 预热
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse(html_content)
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+
+        tracemalloc.start()
+        parse(html_content)
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+@contextlib.contextmanager
+def scratch_dir():
+    """爬虫初始化会在当前目录创建数据目录，基准期间切换到临时目录"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_') as workdir:
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(cwd)
+
+
+def run(repeat=50):
+    with scratch_dir():
+        cases = [
+            ('film.html', MaoyanSpider(), 'parse_movie_info'),
+            ('cnblogs.html', CnblogsSpider(), 'parse_blog_list'),
+        ]
+
+    rows = []
+    for fixture, spider, method in cases:
+        html_content = read_fixture(fixture)
+        strainer = spider.list_strainer
+        for backend in (HTML_PARSER, LXML):
+            spider.parser_backend = backend
+            spider.list_strainer = None
+            before = measure(getattr(spider, method), html_content, repeat)
+            spider.list_strainer = strainer
+            after = measure(getattr(spider, method), html_content, repeat)
+            rows.append((fixture, backend, before, after))
+    return rows
+
+
+def main():
+    rows = run()
+    print(f"{'页面':<14}{'后端':<13}{'整树 ms':>9}{'子树 ms':>9}{'整树 KB':>10}{'子树 KB':>10}")
+    for fixture, backend, (time_before, mem_before), (time_after, mem_after) in rows:
+        print(f"{fixture:<14}{backend:<13}{time_before:>9.2f}{time_after:>9.2f}{mem_before:>10.0f}{mem_after:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
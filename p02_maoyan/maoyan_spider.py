@@ -5,51 +5,130 @@
 爬取 https://www.maoyan.com/board/4 网站上的前 100 名经典影片
 """
 
-import requests
+import argparse
 import json
 import os
+import sys
 import time
-from bs4 import BeautifulSoup
-import re
-from urllib.parse import urljoin
+from bs4 import SoupStrainer
+from urllib.parse import urljoin, urlparse
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from spider_core.downloads import DownloadPool, COMPLETED, SKIPPED, FAILED
+from spider_core.imagestore import ImageStore
+from spider_core.pagination import OffsetPagination
+from spider_core.parsers import LXML_XPATH, make_soup, make_tree, class_xpath, first, node_text
+from spider_core.spider import (USER_AGENT, BaseSpider, add_metrics_arguments, add_offline_arguments,
+                                apply_metrics_arguments, apply_offline_arguments, records_alias)
+
+# SQLite 表结构：以电影名+上映时间为主键，按评分和上映时间建索引
+DB_TABLE = 'movies'
+DB_COLUMNS = [
+    ('name', 'TEXT NOT NULL'),
+    ('release_time', 'TEXT NOT NULL'),
+    ('stars', 'TEXT'),
+    ('score', 'REAL'),
+    ('image_url', 'TEXT'),
+    ('local_image_path', 'TEXT'),
+]
+DB_KEY = ('name', 'release_time')
+DB_INDEXES = ('score', 'release_time')
+
+# Parquet 列类型，评分转为浮点数
+PARQUET_FIELDS = [
+    ('name', 'string'),
+    ('stars', 'string'),
+    ('release_time', 'string'),
+    ('score', 'float'),
+    ('image_url', 'string'),
+    ('local_image_path', 'string'),
+]
+
+
+def poster_file_name(img_url):
+    """海报 URL 的文件名（不含扩展名），如 .../mmdb/d2dad592...0815.jpg?imageView2/... 取 d2dad592...0815"""
+    return os.path.splitext(os.path.basename(urlparse(img_url).path))[0]
+
+
+class MaoyanSpider(BaseSpider):
+    headers = {
+        'User-Agent': USER_AGENT,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    }
+    # 榜单页每 2 秒一个请求；海报所在的图片 CDN 不限速
+    rate = None
+    host_limits = {'www.maoyan.com': (0.5, 1)}
+    # 榜单按 offset 翻页，每页 10 部
+    first_page = 0
+    page_size = 10
+    db_table = DB_TABLE
+    db_columns = DB_COLUMNS
+    key_fields = DB_KEY
+    db_indexes = DB_INDEXES
+    parquet_fields = PARQUET_FIELDS
+    item_name = '部电影'
+    name = 'maoyan'
+    # 笔记本 02_猫眼100.ipynb 下载海报的目录，文件名取自海报 URL，图片仓库为空时导入一次
+    film_dir = os.path.join(ROOT, 'film')
+    movies_data = records_alias()
 
-class MaoyanSpider:
     def __init__(self):
-        self.base_url = "https://www.maoyan.com/board/4"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
-        
         # 创建保存目录
         self.data_dir = "maoyan_data"
+        # 榜单页的条件请求缓存，页面未变化时服务器返回 304
+        super().__init__(cache_dir=os.path.join(self.data_dir, "http_cache"))
+        self.base_url = "https://www.maoyan.com/board/4"
+        # 榜单页只需要 <dd> 电影条目，解析时跳过导航、脚本等其余部分
+        self.list_strainer = SoupStrainer('dd')
+        # 海报下载池：总线程数与图片 CDN 单域名并发数
+        self.image_workers = 8
+        self.image_host_limit = 4
+        # 海报分块写盘的块大小，以及单张海报的大小上限（None 表示不限制）
+        self.image_chunk_size = 64 * 1024
+        self.max_image_bytes = 10 * 1024 * 1024
+        # 爬取期间的海报下载池
+        self.image_pool = None
+        
+        # 旧版按电影名保存的海报目录，仅用于导入图片仓库
         self.images_dir = os.path.join(self.data_dir, "images")
-        os.makedirs(self.images_dir, exist_ok=True)
+        # 按内容寻址的海报仓库，相同海报只存一份
+        self.image_store = ImageStore(os.path.join(self.data_dir, "image_store"))
+        if not len(self.image_store):
+            self.import_previous_images()
+            self.import_film_directory()
         
-        self.movies_data = []
+        self.jsonl_path = os.path.join(self.data_dir, "maoyan_movies.jsonl")
+        # 断点续爬的检查点文件，每汇总完一页更新一次
+        self.checkpoint_path = os.path.join(self.data_dir, "maoyan_checkpoint.json")
+        # 重复爬取时按电影名+上映时间原地更新的 SQLite 数据库
+        self.db_path = os.path.join(self.data_dir, "maoyan_movies.db")
+        # 按爬取日期分区的 Parquet 导出目录
+        self.parquet_dir = os.path.join(self.data_dir, "parquet")
 
-    def get_page_content(self, offset=0):
-        """获取页面内容"""
-        url = f"{self.base_url}?offset={offset}"
-        try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            return response.text
-        except requests.RequestException as e:
-            print(f"请求页面失败: {e}")
-            return None
+    def page_url(self, offset=0):
+        """榜单页 URL"""
+        return f"{self.base_url}?offset={offset}"
+
+    def page_label(self, offset):
+        return f"第 {offset // self.page_size + 1} 页"
+
+    def make_pagination(self, start, max_pages):
+        return OffsetPagination(self.page_url, start=start, step=self.page_size, max_pages=max_pages)
+
+    def parse(self, offset, html_content):
+        return self.parse_movie_info(html_content)
 
     def parse_movie_info(self, html_content):
         """解析电影信息"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+        if self.parser_backend == LXML_XPATH:
+            return self._parse_movie_info_xpath(html_content)
+        
+        soup = make_soup(html_content, self.parser_backend, parse_only=self.list_strainer)
         movies = []
         
         # 查找电影列表
@@ -99,114 +178,169 @@ class MaoyanSpider:
         
         return movies
 
+    def _parse_movie_info_xpath(self, html_content):
+        """解析电影信息（lxml + XPath 快速路径，结果与 parse_movie_info 一致）"""
+        tree = make_tree(html_content)
+        movies = []
+        
+        for item in tree.xpath('//dd'):
+            try:
+                name_elem = first(item, './/' + class_xpath('p', 'name'))
+                movie_name = node_text(name_elem, strip=True) if name_elem is not None else "未知"
+                
+                star_elem = first(item, './/' + class_xpath('p', 'star'))
+                stars = node_text(star_elem, strip=True).replace('主演：', '') if star_elem is not None else "未知"
+                
+                time_elem = first(item, './/' + class_xpath('p', 'releasetime'))
+                release_time = node_text(time_elem, strip=True).replace('上映时间：', '') if time_elem is not None else "未知"
+                
+                score_elem = first(item, './/' + class_xpath('p', 'score'))
+                score = node_text(score_elem, strip=True) if score_elem is not None else "暂无评分"
+                
+                img_elem = first(item, './/' + class_xpath('img', 'board-img'))
+                if img_elem is not None and img_elem.get('data-src'):
+                    img_url = img_elem.get('data-src')
+                elif img_elem is not None and img_elem.get('src'):
+                    img_url = img_elem.get('src')
+                else:
+                    img_url = ""
+                
+                movie_info = {
+                    'name': movie_name,
+                    'stars': stars,
+                    'release_time': release_time,
+                    'score': score,
+                    'image_url': img_url
+                }
+                
+                movies.append(movie_info)
+                print(f"解析到电影: {movie_name}")
+                
+            except Exception as e:
+                print(f"解析电影信息时出错: {e}")
+                continue
+        
+        return movies
+
     def download_image(self, img_url, movie_name):
         """下载电影图片"""
+        return self._download_image(img_url, movie_name)[1]
+
+    def _download_image(self, img_url, movie_name):
+        """下载电影图片，返回 (状态, 本地路径)"""
         if not img_url:
-            return None
+            return FAILED, None
             
         try:
-            # 清理文件名中的非法字符
-            safe_name = re.sub(r'[<>:"/\\|?*]', '_', movie_name)
-            file_extension = os.path.splitext(img_url)[1]
-            if not file_extension:
-                file_extension = '.jpg'
-            
-            filename = f"{safe_name}{file_extension}"
-            filepath = os.path.join(self.images_dir, filename)
+            # 仓库索引里已有该 URL，或从 film/ 导入过同名海报，直接跳过下载
+            filepath = self.image_store.lookup(img_url) or self.image_store.lookup_name(poster_file_name(img_url))
+            if filepath:
+                self.image_store.link(os.path.basename(filepath), url=img_url, name=movie_name)
+                print(f"图片已存在: {movie_name}")
+                self.metrics.inc('images', result=SKIPPED)
+                return SKIPPED, filepath
             
-            # 如果文件已存在，跳过下载
-            if os.path.exists(filepath):
-                print(f"图片已存在: {filename}")
-                return filepath
+            with self.metrics.time('rate_limit'):
+                self.rate_limiter.wait(img_url)
+            # 分块写入临时文件，完整下载后按内容摘要存入仓库；网络和写盘分开计时
+            timings = {}
+            start = time.perf_counter()
+            filepath = self.image_store.download(self.session, img_url, movie_name, timings=timings,
+                                                 chunk_size=self.image_chunk_size, max_bytes=self.max_image_bytes)
+            write_seconds = timings.get('write', 0.0)
+            self.metrics.observe('image_download', time.perf_counter() - start - write_seconds)
+            self.metrics.observe('image_write', write_seconds)
+            self.metrics.inc('image_bytes', os.path.getsize(filepath))
+            self.metrics.inc('images', result=COMPLETED)
             
-            response = self.session.get(img_url, timeout=10)
-            response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-            
-            print(f"下载图片成功: {filename}")
-            return filepath
+            print(f"下载图片成功: {movie_name}")
+            return COMPLETED, filepath
             
         except Exception as e:
             print(f"下载图片失败 {movie_name}: {e}")
-            return None
+            self.metrics.inc('images', result=FAILED)
+            return FAILED, None
 
-    def save_to_json(self, data):
-        """保存数据到JSON文件"""
+    def import_previous_images(self):
+        """把上次爬取按电影名保存的海报导入图片仓库，之后按 URL 直接命中"""
         filepath = os.path.join(self.data_dir, "maoyan_movies.json")
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"数据已保存到: {filepath}")
+        if not os.path.exists(filepath):
+            return 0
+        
+        with open(filepath, 'r', encoding='utf-8') as f:
+            movies = json.load(f)
+        
+        imported = 0
+        for movie in movies:
+            # 旧数据可能是在 Windows 上生成的路径
+            local_path = (movie.get('local_image_path') or '').replace('\\', os.sep)
+            if movie.get('image_url') and local_path and os.path.exists(local_path):
+                self.image_store.add_file(local_path, url=movie['image_url'], name=movie['name'])
+                imported += 1
+        
+        if imported:
+            self.image_store.save()
+            print(f"已将 {imported} 张旧海报导入图片仓库")
+        return imported
+
+    def import_film_directory(self):
+        """把 film/ 中的海报导入图片仓库，以文件名登记，之后同一海报的 URL 按文件名命中"""
+        if not os.path.isdir(self.film_dir):
+            return 0
+        imported = self.image_store.import_directory(self.film_dir)
+        if imported:
+            self.image_store.save()
+            print(f"已将 {self.film_dir} 中的 {imported} 张海报导入图片仓库")
+        return imported
+
+    def save_to_json(self, data):
+        """保存数据到JSON文件，data 可以是列表或记录迭代器"""
+        return self.export_json(os.path.join(self.data_dir, "maoyan_movies.json"), data)
 
     def save_to_csv(self, data):
-        """保存数据到CSV文件"""
-        import csv
-        
+        """保存数据到CSV文件，data 可以是列表或记录迭代器"""
         filepath = os.path.join(self.data_dir, "maoyan_movies.csv")
-        with open(filepath, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.writer(f)
-            # 写入表头
-            writer.writerow(['电影名', '主演', '上映时间', '评分', '图片URL', '本地图片路径'])
-            
-            for movie in data:
-                writer.writerow([
-                    movie['name'],
-                    movie['stars'],
-                    movie['release_time'],
-                    movie['score'],
-                    movie['image_url'],
-                    movie.get('local_image_path', '')
-                ])
-        
-        print(f"数据已保存到: {filepath}")
+        header = ['电影名', '主演', '上映时间', '评分', '图片URL', '本地图片路径']
+        return self.export_csv(filepath, header, lambda movie: [
+            movie['name'],
+            movie['stars'],
+            movie['release_time'],
+            movie['score'],
+            movie['image_url'],
+            movie.get('local_image_path', '')
+        ], data)
 
-    def crawl(self):
-        """主爬取函数"""
+    def process_pages(self, pages):
+        """
+        海报交给下载池，每页的海报下载完成后立即产出该页，JSONL 和检查点逐页推进；
+        等待期间分页器仍在后台预取下一页
+        """
+        for offset, next_offset, movies in pages:
+            print(f"{self.page_label(offset)}解析到 {len(movies)} 部电影")
+            futures = [self.image_pool.submit(movie['image_url'], self._download_image, movie['image_url'], movie['name'])
+                       if movie['image_url'] else None for movie in movies]
+            # 等待海报下载完成并更新数据
+            for movie, image_future in zip(movies, futures):
+                movie['local_image_path'] = image_future.result() if image_future else None
+            yield offset, next_offset, movies
+
+    def crawl(self, resume=False):
+        """主爬取函数，resume 为 True 时从检查点继续"""
         print("开始爬取猫眼电影经典影片...")
         
-        total_movies = 0
-        page_offset = 0
+        self.image_pool = DownloadPool(max_workers=self.image_workers, per_host=self.image_host_limit)
+        with self.image_pool:
+            count = self.crawl_pages(resume=resume)
         
-        while total_movies < 100:
-            print(f"正在爬取第 {page_offset//10 + 1} 页...")
-            
-            html_content = self.get_page_content(page_offset)
-            if not html_content:
-                print(f"获取第 {page_offset//10 + 1} 页失败")
-                break
-            
-            movies = self.parse_movie_info(html_content)
-            if not movies:
-                print(f"第 {page_offset//10 + 1} 页没有解析到电影信息")
-                break
-            
-            # 下载图片并更新数据
-            for movie in movies:
-                if total_movies >= 100:
-                    break
-                    
-                local_image_path = self.download_image(movie['image_url'], movie['name'])
-                movie['local_image_path'] = local_image_path
-                self.movies_data.append(movie)
-                total_movies += 1
-                
-                # 添加延迟，避免请求过快
-                time.sleep(1)
-            
-            print(f"已爬取 {total_movies} 部电影")
-            
-            # 翻页
-            page_offset += 10
-            
-            # 添加页面间延迟
-            time.sleep(2)
+        self.image_pool.report()
+        self.image_store.save()
         
-        # 保存数据
-        if self.movies_data:
-            self.save_to_json(self.movies_data)
-            self.save_to_csv(self.movies_data)
-            print(f"\n爬取完成！共获取 {len(self.movies_data)} 部电影信息")
+        # 从内存或 JSONL 生成 JSON 和 CSV
+        if count:
+            self.save_to_json(self.iter_records())
+            self.save_to_csv(self.iter_records())
+            self.save_to_parquet()
+            print(f"\n爬取完成！共获取 {count} 部电影信息")
             print(f"数据保存在: {self.data_dir} 目录")
         else:
             print("没有获取到任何电影数据")
@@ -214,8 +348,17 @@ class MaoyanSpider:
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="爬取猫眼电影 TOP100")
+    parser.add_argument('--resume', action='store_true', help="从上次中断的检查点继续")
+    add_offline_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
     spider = MaoyanSpider()
-    spider.crawl()
+    apply_offline_arguments(spider, args)
+    apply_metrics_arguments(spider, args)
+    spider.crawl(resume=args.resume)
+    spider.report_metrics()
 
 
 if __name__ == "__main__":
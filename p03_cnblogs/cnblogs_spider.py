@@ -1,43 +1,94 @@
-import requests
-from bs4 import BeautifulSoup
-import time
-import json
-import csv
+import argparse
+from bs4 import SoupStrainer
+import itertools
 from datetime import datetime
 import re
+import os
+import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spider_core.frontier import Frontier
+from spider_core.pagination import END_OF_LIST
+from spider_core.parsers import LXML_XPATH, make_soup, make_tree, class_xpath, first, node_text
+from spider_core.sinks import iter_jsonl
+from spider_core.spider import (BaseSpider, add_metrics_arguments, add_offline_arguments, apply_metrics_arguments,
+                                apply_offline_arguments, records_alias)
+
+# SQLite 表结构：以博客 URL 为主键，按发布时间和阅读量建索引
+DB_TABLE = 'blogs'
+DB_COLUMNS = [
+    ('url', 'TEXT NOT NULL'),
+    ('title', 'TEXT'),
+    ('summary', 'TEXT'),
+    ('publish_time', 'TEXT'),
+    ('read_count', 'INTEGER'),
+    ('comment_count', 'INTEGER'),
+    ('recommend_count', 'INTEGER'),
+]
+DB_KEY = ('url',)
+DB_INDEXES = ('publish_time', 'read_count')
+
+# 这些列表页字段都没变时，认为文章没有更新，不再抓取详情页
+DETAIL_SIGNATURE_FIELDS = ('title', 'summary', 'publish_time')
+
+# Parquet 列类型
+PARQUET_FIELDS = [
+    ('title', 'string'),
+    ('url', 'string'),
+    ('summary', 'string'),
+    ('publish_time', 'timestamp'),
+    ('read_count', 'int'),
+    ('comment_count', 'int'),
+    ('recommend_count', 'int'),
+]
+
+
+class CnblogsSpider(BaseSpider):
+    # 每 2 秒一个请求，请求本身的耗时计入间隔
+    rate = 0.5
+    db_table = DB_TABLE
+    db_columns = DB_COLUMNS
+    key_fields = DB_KEY
+    db_indexes = DB_INDEXES
+    parquet_fields = PARQUET_FIELDS
+    detail_signature_fields = DETAIL_SIGNATURE_FIELDS
+    item_name = '篇博客'
+    name = 'cnblogs'
+    blog_data = records_alias()
 
-class CnblogsSpider:
     def __init__(self):
+        super().__init__(cache_dir="http_cache")
         self.base_url = "https://www.cnblogs.com/pinard"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        self.blog_data = []
-    
-    def get_page_content(self, page_num):
-        """获取指定页面的内容"""
+        # 列表页只需要 div.day 博客分组，解析时跳过导航、侧边栏和脚本
+        self.list_strainer = SoupStrainer('div', class_='day')
+        self.jsonl_path = "cnblogs_pinard_data.jsonl"
+        # 断点续爬的检查点文件，每完成一页更新一次
+        self.checkpoint_path = "cnblogs_pinard_checkpoint.json"
+        # 重复爬取时按 URL 原地更新的 SQLite 数据库
+        self.db_path = "cnblogs_pinard.db"
+        # 按爬取日期分区的 Parquet 导出目录
+        self.parquet_dir = "cnblogs_pinard_parquet"
+        # 列表页中的博客详情页 URL 放进调度队列，列表页深度为 0
+        self.frontier = Frontier(max_depth=1)
+    
+    def page_url(self, page_num):
+        """列表页 URL"""
         if page_num == 1:
-            url = self.base_url
-        else:
-            url = f"{self.base_url}/default.html?page={page_num}"
-        
-        try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            return response.text
-        except requests.RequestException as e:
-            print(f"获取第{page_num}页失败: {e}")
-            return None
+            return self.base_url
+        return f"{self.base_url}/default.html?page={page_num}"
+    
+    def parse(self, page_num, html_content):
+        return self.parse_blog_list(html_content)
     
     def parse_blog_list(self, html_content):
         """解析博客列表页面，提取博客信息"""
         if not html_content:
             return []
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        if self.parser_backend == LXML_XPATH:
+            return self._parse_blog_list_xpath(html_content)
+        
+        soup = make_soup(html_content, self.parser_backend, parse_only=self.list_strainer)
         blog_items = []
         
         # 根据实际网站结构，博客文章在div.day中
@@ -81,63 +132,152 @@ class CnblogsSpider:
         
         # 提取元信息（时间、阅读量、评论数、推荐数）- 在postDesc div中
         meta_div = day_div.find('div', class_='postDesc')
-        if meta_div:
-            meta_text = meta_div.get_text()
-            
-            # 提取时间
-            time_match = re.search(r'posted @ (\d{4}-\d{2}-\d{2} \d{2}:\d{2})', meta_text)
-            if time_match:
-                blog['publish_time'] = time_match.group(1)
-            else:
-                blog['publish_time'] = ''
-            
-            # 提取阅读量
-            read_match = re.search(r'阅读\((\d+)\)', meta_text)
-            if read_match:
-                blog['read_count'] = int(read_match.group(1))
-            else:
-                blog['read_count'] = 0
-            
-            # 提取评论数
-            comment_match = re.search(r'评论\((\d+)\)', meta_text)
-            if comment_match:
-                blog['comment_count'] = int(comment_match.group(1))
-            else:
-                blog['comment_count'] = 0
-            
-            # 提取推荐数
-            recommend_match = re.search(r'推荐\((\d+)\)', meta_text)
-            if recommend_match:
-                blog['recommend_count'] = int(recommend_match.group(1))
-            else:
-                blog['recommend_count'] = 0
-        else:
-            blog['publish_time'] = ''
-            blog['read_count'] = 0
-            blog['comment_count'] = 0
-            blog['recommend_count'] = 0
+        blog.update(self.parse_meta(meta_div.get_text() if meta_div else ''))
+        
+        return blog
+    
+    def parse_meta(self, meta_text):
+        """从postDesc文本中提取发布时间、阅读量、评论数、推荐数"""
+        meta = {}
+        
+        # 提取时间
+        time_match = re.search(r'posted @ (\d{4}-\d{2}-\d{2} \d{2}:\d{2})', meta_text)
+        meta['publish_time'] = time_match.group(1) if time_match else ''
+        
+        # 提取阅读量
+        read_match = re.search(r'阅读\((\d+)\)', meta_text)
+        meta['read_count'] = int(read_match.group(1)) if read_match else 0
+        
+        # 提取评论数
+        comment_match = re.search(r'评论\((\d+)\)', meta_text)
+        meta['comment_count'] = int(comment_match.group(1)) if comment_match else 0
+        
+        # 提取推荐数
+        recommend_match = re.search(r'推荐\((\d+)\)', meta_text)
+        meta['recommend_count'] = int(recommend_match.group(1)) if recommend_match else 0
+        
+        return meta
+    
+    def _parse_blog_list_xpath(self, html_content):
+        """解析博客列表页面（lxml + XPath 快速路径，结果与 parse_blog_list 一致）"""
+        tree = make_tree(html_content)
+        blog_items = []
+        
+        day_divs = tree.xpath('//' + class_xpath('div', 'day'))
+        
+        print(f"找到 {len(day_divs)} 个博客日期分组")
+        
+        for day_div in day_divs:
+            try:
+                blog_info = self.extract_blog_info_xpath(day_div)
+                if blog_info:
+                    blog_items.append(blog_info)
+            except Exception as e:
+                print(f"解析博客项时出错: {e}")
+                continue
+        
+        return blog_items
+    
+    def extract_blog_info_xpath(self, day_div):
+        """从单个博客项（lxml 元素）中提取信息"""
+        blog = {}
+        
+        title_div = first(day_div, './/' + class_xpath('div', 'postTitle'))
+        title_link = first(title_div, './/a') if title_div is not None else None
+        if title_link is None:
+            return None
+        blog['title'] = node_text(title_link).strip()
+        blog['url'] = title_link.get('href', '')
+        
+        summary_div = first(day_div, './/' + class_xpath('div', 'postCon'))
+        if summary_div is None:
+            summary_div = first(day_div, './/' + class_xpath('div', 'c_b_p_desc'))
+        blog['summary'] = node_text(summary_div).strip() if summary_div is not None else ''
+        
+        meta_div = first(day_div, './/' + class_xpath('div', 'postDesc'))
+        blog.update(self.parse_meta(node_text(meta_div) if meta_div is not None else ''))
         
         return blog
     
-    def crawl_all_pages(self, total_pages=14):
-        """爬取所有页面"""
-        print(f"开始爬取 {total_pages} 页博客数据...")
+    def crawl_all_pages(self, max_pages=None, resume=False):
+        """
+        爬取所有页面：逐页抓取直到空页或重复页，解析当前页时预取下一页；
+        max_pages 为页数上限，resume 为 True 时从检查点继续
+        """
+        print("开始爬取博客数据...")
+        return self.crawl_pages(max_pages=max_pages, resume=resume)
+    
+    def load_previous_records(self):
+        """上次爬取的数据：优先读 JSONL（保持列表顺序），没有时从数据库按发布时间倒序读取"""
+        if os.path.exists(self.jsonl_path):
+            return list(iter_jsonl(self.jsonl_path))
+        if os.path.exists(self.db_path):
+            fields = ['title', 'url', 'summary', 'publish_time', 'read_count', 'comment_count', 'recommend_count']
+            with self.open_db() as db:
+                return db.query(f"SELECT {', '.join(fields)} FROM {DB_TABLE} ORDER BY publish_time DESC")
+        return []
+    
+    def crawl_incremental(self, max_pages=14):
+        """
+        增量爬取：列表按时间倒序，逐页抓取，整页都是已知博客时停止；
+        新博客放在已有数据前面，重新抓到的旧博客更新阅读/评论/推荐数
+        """
+        previous = self.load_previous_records()
+        known = {blog['url'] for blog in previous}
+        print(f"增量爬取，已有 {len(known)} 篇博客")
         
-        for page in range(1, total_pages + 1):
-            print(f"正在爬取第 {page} 页...")
-            
-            html_content = self.get_page_content(page)
-            if html_content:
+        new_blogs = []
+        fetched = {}
+        pages_requested = 0
+        with self.open_db() as db:
+            for page in range(1, max_pages + 1):
+                pages_requested += 1
+                html_content = self.get_page_content(page)
+                # 页面不存在（404/410）说明已经翻过末页，正常结束
+                if html_content is END_OF_LIST:
+                    break
+                if not html_content:
+                    print(f"第 {page} 页爬取失败，停止增量爬取")
+                    break
                 blog_items = self.parse_blog_list(html_content)
-                self.blog_data.extend(blog_items)
-                print(f"第 {page} 页爬取完成，获取到 {len(blog_items)} 篇博客")
-            else:
-                print(f"第 {page} 页爬取失败")
-            
-            # 添加延时，避免请求过于频繁
-            time.sleep(2)
+                fresh = [blog for blog in blog_items if blog['url'] not in known]
+                print(f"第 {page} 页获取到 {len(blog_items)} 篇博客，其中新博客 {len(fresh)} 篇")
+                db.write_many(blog_items)
+                new_blogs.extend(fresh)
+                known.update(blog['url'] for blog in fresh)
+                fetched.update((blog['url'], blog) for blog in blog_items)
+                if not fresh:
+                    break
+            db.report()
+        
+        merged = new_blogs + [fetched.get(blog['url'], blog) for blog in previous]
+        self.replace_records(merged)
         
-        print(f"爬取完成，总共获取到 {len(self.blog_data)} 篇博客")
+        print(f"增量爬取完成，请求 {pages_requested} 页，新增 {len(new_blogs)} 篇博客，共 {len(merged)} 篇")
+        if self.replay:
+            self.replay.report()
+        elif self.http_cache:
+            self.http_cache.report()
+        return new_blogs
+    
+    def extract_blog_detail(self, html_content):
+        """提取博客正文和发布、更新时间"""
+        soup = make_soup(html_content, self.parser_backend)
+        body = soup.find(id='cnblogs_post_body')
+        post_date = soup.find(id='post-date')
+        return {
+            'content': body.get_text().strip() if body else '',
+            'post_time': post_date.get_text().strip() if post_date else '',
+            'updated_time': post_date.get('data-date-updated', '') if post_date else '',
+        }
+    
+    extract_detail = extract_blog_detail
+    
+    def top_read_since(self, since, limit=10):
+        """查询 since（如 '2019-01-01'）之后发布的阅读量最高的博客，走 publish_time 索引"""
+        with self.open_db() as db:
+            return db.query(f"SELECT * FROM {DB_TABLE} WHERE publish_time >= ? "
+                            f"ORDER BY read_count DESC LIMIT ?", (since, limit))
     
     def save_to_json(self, filename=None):
         """保存数据到JSON文件"""
@@ -145,11 +285,7 @@ class CnblogsSpider:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"cnblogs_pinard_data_{timestamp}.json"
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.blog_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"数据已保存到 {filename}")
-        return filename
+        return self.export_json(filename)
     
     def save_to_csv(self, filename=None):
         """保存数据到CSV文件"""
@@ -157,39 +293,42 @@ class CnblogsSpider:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"cnblogs_pinard_data_{timestamp}.csv"
         
-        if not self.blog_data:
+        records = self.iter_records()
+        first_record = next(records, None)
+        if first_record is None:
             print("没有数据可保存")
             return
         
         fieldnames = ['title', 'publish_time', 'read_count', 'comment_count', 'recommend_count', 'summary', 'url']
         
-        with open(filename, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(self.blog_data)
-        
-        print(f"数据已保存到 {filename}")
-        return filename
+        return self.export_csv(filename, fieldnames, records=itertools.chain([first_record], records))
     
     def display_summary(self):
         """显示数据摘要"""
-        if not self.blog_data:
+        # 一次遍历完成统计，不要求全部记录都在内存中
+        total_blogs = total_reads = total_comments = total_recommends = 0
+        first_blogs = []
+        for blog in self.iter_records():
+            total_blogs += 1
+            total_reads += blog['read_count']
+            total_comments += blog['comment_count']
+            total_recommends += blog['recommend_count']
+            if len(first_blogs) < 5:
+                first_blogs.append(blog)
+        
+        if not total_blogs:
             print("没有数据")
             return
         
-        total_reads = sum(blog['read_count'] for blog in self.blog_data)
-        total_comments = sum(blog['comment_count'] for blog in self.blog_data)
-        total_recommends = sum(blog['recommend_count'] for blog in self.blog_data)
-        
         print(f"\n数据摘要:")
-        print(f"总博客数: {len(self.blog_data)}")
+        print(f"总博客数: {total_blogs}")
         print(f"总阅读量: {total_reads}")
         print(f"总评论数: {total_comments}")
         print(f"总推荐数: {total_recommends}")
         
         # 显示前5篇博客
         print(f"\n前5篇博客:")
-        for i, blog in enumerate(self.blog_data[:5], 1):
+        for i, blog in enumerate(first_blogs, 1):
             print(f"{i}. {blog['title']}")
             print(f"   时间: {blog['publish_time']}")
             print(f"   阅读: {blog['read_count']}, 评论: {blog['comment_count']}, 推荐: {blog['recommend_count']}")
@@ -199,10 +338,26 @@ class CnblogsSpider:
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="爬取博客园 pinard 的博客列表")
+    parser.add_argument('--resume', action='store_true', help="从上次中断的检查点继续")
+    parser.add_argument('--incremental', action='store_true', help="只抓取上次之后的新博客并合并到已有数据")
+    parser.add_argument('--details', action='store_true', help="抓取博客详情页，合并正文到列表记录")
+    add_offline_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
     spider = CnblogsSpider()
+    apply_offline_arguments(spider, args)
+    apply_metrics_arguments(spider, args)
+    
+    if args.incremental:
+        spider.crawl_incremental(max_pages=14)
+    else:
+        # 爬取所有页，末页自动发现
+        spider.crawl_all_pages(resume=args.resume)
     
-    # 爬取所有14页数据
-    spider.crawl_all_pages(total_pages=14)
+    if args.details:
+        spider.crawl_details()
     
     # 显示数据摘要
     spider.display_summary()
@@ -210,6 +365,10 @@ def main():
     # 保存数据
     json_file = spider.save_to_json()
     csv_file = spider.save_to_csv()
+    spider.save_to_parquet()
+    
+    # 各阶段耗时和计数
+    spider.report_metrics()
     
     print(f"\n爬取完成!")
     print(f"JSON文件: {json_file}")
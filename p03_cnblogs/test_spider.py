@@ -1,13 +1,23 @@
+import os
+import sys
 import requests
 from bs4 import BeautifulSoup
 import re
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spider_core.mocksite import MockSite
+
 def test_cnblogs_spider():
     """测试cnblogs爬虫功能"""
     print("开始测试cnblogs爬虫...")
     
     # 测试第一页的爬取
-    url = 'https://www.cnblogs.com/pinard'
+    # 请求本地模拟站点，不访问外网
+    with MockSite() as site:
+        check_page(site.base_url('cnblogs'))
+
+
+def check_page(url):
     try:
         response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
         response.encoding = 'utf-8'
@@ -6,80 +6,129 @@
 包括所有分页内容
 """
 
-import requests
-from bs4 import BeautifulSoup
-import time
-import json
-import csv
+import argparse
+import itertools
 import os
-from urllib.parse import urljoin
+import sys
+from urllib.parse import urljoin, urlparse
 import re
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spider_core.dedup import DedupFilter
+from spider_core.frontier import Frontier
+from spider_core.extraction import SelectorPlan
+from spider_core.pages import as_page
+from spider_core.parsers import make_soup
+from spider_core.selector_cache import SelectorCache, template_fingerprint
+from spider_core.spider import (BaseSpider, add_metrics_arguments, add_offline_arguments, apply_metrics_arguments,
+                                apply_offline_arguments, records_alias)
+
+# 日期，以及用于查找时间文本节点的日期或时刻
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+TIME_TEXT_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}|\d{2}:\d{2}')
+
+# 文章列表的两个备用查找策略：class 含 list/article/news/box 的 li，以及所有带链接的 li
+LI_CLASS_PATTERN = re.compile(r'list|article|news|box')
+FALLBACK_LI_CLASS = 'fallback:li-class'
+FALLBACK_LI_LINK = 'fallback:li-link'
+
+# SQLite 表结构：以政策 URL 为主键，按发布时间建索引
+DB_TABLE = 'policies'
+DB_COLUMNS = [
+    ('url', 'TEXT NOT NULL'),
+    ('title', 'TEXT'),
+    ('summary', 'TEXT'),
+    ('publish_time', 'TEXT'),
+    ('page', 'INTEGER'),
+    ('crawl_time', 'TEXT'),
+]
+DB_KEY = ('url',)
+DB_INDEXES = ('publish_time',)
+
+# 这些列表页字段都没变时，认为政策没有更新，不再抓取详情页
+DETAIL_SIGNATURE_FIELDS = ('title', 'summary', 'publish_time')
+
+# Parquet 列类型
+PARQUET_FIELDS = [
+    ('title', 'string'),
+    ('url', 'string'),
+    ('summary', 'string'),
+    ('publish_time', 'timestamp'),
+    ('page', 'int'),
+    ('crawl_time', 'timestamp'),
+]
+
+
+class EnhancedSchoolPolicyCrawler(BaseSpider):
+    # 每秒一个请求，请求本身的耗时计入间隔
+    rate = 1.0
+    db_table = DB_TABLE
+    db_columns = DB_COLUMNS
+    key_fields = DB_KEY
+    db_indexes = DB_INDEXES
+    parquet_fields = PARQUET_FIELDS
+    detail_signature_fields = DETAIL_SIGNATURE_FIELDS
+    item_name = '篇文章'
+    name = 'bendibao_enhanced'
+    all_data = records_alias()
 
-class EnhancedSchoolPolicyCrawler:
     def __init__(self):
+        super().__init__(cache_dir="http_cache")
         self.base_url = "http://sh.bendibao.com/news/list_17_727_{}.htm"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        self.all_data = []
-        
-    def get_page_content(self, page_num):
-        """获取指定页面的内容"""
-        url = self.base_url.format(page_num)
-        try:
-            response = self.session.get(url, timeout=10)
-            response.encoding = 'utf-8'
-            if response.status_code == 200:
-                return response.text
-            else:
-                print(f"页面 {page_num} 请求失败，状态码: {response.status_code}")
-                return None
-        except Exception as e:
-            print(f"页面 {page_num} 请求异常: {e}")
-            return None
-    
-    def parse_page(self, html_content, page_num):
-        """解析页面内容，提取学校政策信息"""
-        if not html_content:
-            return []
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        articles = []
-        
-        # 查找文章列表 - 使用更精确的选择器
-        articles_list = None
-        
-        # 首先尝试精确匹配
-        article_selectors = [
+        # 文章列表选择器，按优先级排列
+        self.article_selectors = [
             '.list-article li',
-            '.news-list li', 
+            '.news-list li',
             '.list-content li',
             '.article-list li',
             'ul.list li',
             '.list-box li',
             '.news-box li'
         ]
+        # 记住每种页面模板上命中的列表选择器，跨运行保存
+        self.selector_cache = SelectorCache("selector_cache.json")
+        # 摘要和发布时间的候选选择器，按优先级排列
+        self.summary_selectors = ['p', '.summary', '.desc', '.intro', '.content', '.text']
+        self.time_selectors = [
+            '.time',
+            '.date',
+            '.publish-time',
+            '.pub-time',
+            'span[class*="time"]',
+            'span[class*="date"]'
+        ]
+        # 编译成一个提取计划，每篇文章只遍历一次子树
+        self.article_plan = SelectorPlan(self.summary_selectors + self.time_selectors,
+                                         string_pattern=TIME_TEXT_PATTERN)
+        self.jsonl_path = "enhanced_school_policies.jsonl"
+        # 断点续爬的检查点文件，每完成一页更新一次
+        self.checkpoint_path = "enhanced_school_policies_checkpoint.json"
+        # 重复爬取时按 URL 原地更新的 SQLite 数据库
+        self.db_path = "school_policies.db"
+        # 跨运行的去重过滤器：置顶文章会出现在多页，同一次运行中只保留第一次出现
+        self.dedup_path = "school_policies_dedup.db"
+        # 按爬取日期分区的 Parquet 导出目录
+        self.parquet_dir = "enhanced_school_policies_parquet"
+        # 列表页中的政策详情页 URL 放进调度队列，列表页深度为 0
+        self.frontier = Frontier(max_depth=1)
+        # 详情页正文和发布时间的候选选择器，按优先级排列
+        self.detail_content_selectors = ['#bo', '.content', '.article-content', '.news-content', 'article']
+        self.detail_time_selectors = ['.time', '.public_time', '.date', '.publish-time']
         
-        for selector in article_selectors:
-            articles_list = soup.select(selector)
-            if articles_list:
-                print(f"使用选择器: {selector} 找到 {len(articles_list)} 篇文章")
-                break
+    def parse(self, page_num, page):
+        return self.parse_page(page, page_num)
+    
+    def parse_page(self, html_content, page_num):
+        """解析页面内容，提取学校政策信息（html_content 可以是 HTML 字符串或 ParsedPage）"""
+        if not html_content:
+            return []
         
-        # 如果没找到，使用备用选择器
-        if not articles_list:
-            print(f"页面 {page_num} 未找到文章列表，尝试备用选择器...")
-            articles_list = soup.find_all('li', class_=re.compile(r'list|article|news|box'))
-            if articles_list:
-                print(f"使用备用选择器找到 {len(articles_list)} 篇文章")
-            else:
-                # 最后尝试查找所有包含链接的li元素
-                articles_list = [li for li in soup.find_all('li') if li.find('a')]
-                if articles_list:
-                    print(f"使用通用选择器找到 {len(articles_list)} 篇文章")
+        soup = as_page(html_content, self.parser_backend).soup
+        articles = []
+        
+        # 查找文章列表，优先使用上次命中的选择器
+        articles_list = self.find_article_list(soup, page_num)
         
         for article in articles_list:
             try:
@@ -98,11 +147,14 @@ class EnhancedSchoolPolicyCrawler:
                 else:
                     full_url = ""
                 
+                # 一次遍历收集候选节点，供摘要和发布时间共用
+                candidates = self.scan_article(article)
+                
                 # 提取摘要
-                summary = self.extract_summary(article, title)
+                summary = self.extract_summary(article, title, candidates)
                 
                 # 提取发布时间
-                publish_time = self.extract_publish_time(article)
+                publish_time = self.extract_publish_time(article, candidates)
                 
                 article_data = {
                     'title': title,
@@ -122,22 +174,72 @@ class EnhancedSchoolPolicyCrawler:
         
         return articles
     
-    def extract_summary(self, article, title):
+    def select_articles(self, soup, strategy):
+        """按单个查找策略取文章列表：CSS 选择器或两个备用策略之一"""
+        if strategy == FALLBACK_LI_CLASS:
+            return soup.find_all('li', class_=LI_CLASS_PATTERN)
+        if strategy == FALLBACK_LI_LINK:
+            return [li for li in soup.find_all('li') if li.find('a')]
+        return soup.select(strategy)
+    
+    def find_article_list(self, soup, page_num):
+        """查找文章列表：先试该站点该模板上次命中的策略，失效时再完整查找"""
+        key = self.selector_cache.key(urlparse(self.base_url).netloc, template_fingerprint(soup))
+        known = self.selector_cache.get(key)
+        if known:
+            articles_list = self.select_articles(soup, known)
+            if articles_list:
+                self.selector_cache.record_hit()
+                print(f"使用已知选择器: {known} 找到 {len(articles_list)} 篇文章")
+                return articles_list
+            print(f"已知选择器 {known} 不再匹配，重新查找...")
+            self.selector_cache.record_stale(key)
+        
+        articles_list = []
+        winner = None
+        # 首先尝试精确匹配
+        for selector in self.article_selectors:
+            articles_list = self.select_articles(soup, selector)
+            if articles_list:
+                print(f"使用选择器: {selector} 找到 {len(articles_list)} 篇文章")
+                winner = selector
+                break
+        
+        # 如果没找到，使用备用选择器
+        if not articles_list:
+            print(f"页面 {page_num} 未找到文章列表，尝试备用选择器...")
+            articles_list = self.select_articles(soup, FALLBACK_LI_CLASS)
+            if articles_list:
+                print(f"使用备用选择器找到 {len(articles_list)} 篇文章")
+                winner = FALLBACK_LI_CLASS
+            else:
+                # 最后尝试查找所有包含链接的li元素
+                articles_list = self.select_articles(soup, FALLBACK_LI_LINK)
+                if articles_list:
+                    print(f"使用通用选择器找到 {len(articles_list)} 篇文章")
+                    winner = FALLBACK_LI_LINK
+        
+        self.selector_cache.learn(key, winner)
+        return articles_list
+    
+    def scan_article(self, article):
+        """一次遍历文章节点，同时收集摘要和发布时间的全部候选节点"""
+        first_matches, time_strings = self.article_plan.scan(article)
+        split = len(self.summary_selectors)
+        return {
+            'summary': first_matches[:split],
+            'time': first_matches[split:],
+            'time_strings': time_strings,
+        }
+    
+    def extract_summary(self, article, title, candidates=None):
         """提取文章摘要"""
         summary = ""
+        if candidates is None:
+            candidates = self.scan_article(article)
         
-        # 尝试多种可能的摘要元素
-        summary_selectors = [
-            'p',
-            '.summary',
-            '.desc', 
-            '.intro',
-            '.content',
-            '.text'
-        ]
-        
-        for selector in summary_selectors:
-            summary_element = article.select_one(selector)
+        # 按 summary_selectors 的顺序尝试各候选元素
+        for summary_element in candidates['summary']:
             if summary_element:
                 summary_text = summary_element.get_text().strip()
                 if summary_text and summary_text != title:
@@ -152,51 +254,42 @@ class EnhancedSchoolPolicyCrawler:
             summary_lines = []
             for line in lines:
                 line = line.strip()
-                if line and line != title and not re.search(r'\d{4}-\d{2}-\d{2}', line):
+                if line and line != title and not DATE_PATTERN.search(line):
                     summary_lines.append(line)
             if summary_lines:
                 summary = ' '.join(summary_lines[:2])  # 取前两行作为摘要
         
         return summary
     
-    def extract_publish_time(self, article):
+    def extract_publish_time(self, article, candidates=None):
         """提取发布时间"""
         publish_time = ""
+        if candidates is None:
+            candidates = self.scan_article(article)
         
-        # 尝试多种可能的时间元素
-        time_selectors = [
-            '.time',
-            '.date',
-            '.publish-time',
-            '.pub-time',
-            'span[class*="time"]',
-            'span[class*="date"]'
-        ]
-        
-        for selector in time_selectors:
-            time_element = article.select_one(selector)
+        # 按 time_selectors 的顺序尝试各候选元素
+        for time_element in candidates['time']:
             if time_element:
                 time_text = time_element.get_text().strip()
-                if re.search(r'\d{4}-\d{2}-\d{2}', time_text):
+                if DATE_PATTERN.search(time_text):
                     publish_time = time_text
                     break
         
         # 如果没有找到时间，尝试从其他位置查找
         if not publish_time:
-            time_elements = article.find_all(string=re.compile(r'\d{4}-\d{2}-\d{2}|\d{2}:\d{2}'))
-            for elem in time_elements:
-                if re.search(r'\d{4}-\d{2}-\d{2}', elem):
+            for elem in candidates['time_strings']:
+                if DATE_PATTERN.search(elem):
                     publish_time = elem.strip()
                     break
         
         return publish_time
     
     def get_total_pages(self, html_content):
-        """获取总页数"""
+        """获取总页数（html_content 可以是 HTML 字符串或 ParsedPage）"""
         if not html_content:
             return 1
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = as_page(html_content, self.parser_backend).soup
         
         # 查找分页信息
         page_selectors = [
@@ -248,88 +341,108 @@ class EnhancedSchoolPolicyCrawler:
                 except:
                     continue
 
-        max_page = 7  # 人工设定
         print(f"检测到总页数: {max_page}")
         return max_page
     
-    def crawl_all_pages(self, start_page=1, max_pages=None):
-        """爬取所有页面"""
+    def crawl_all_pages(self, start_page=1, max_pages=None, resume=False):
+        """
+        爬取所有页面：逐页抓取直到空页或重复页，解析当前页时预取下一页；
+        max_pages 为页数上限，resume 为 True 时从检查点继续
+        """
         print("开始爬取学校政策信息...")
         
-        # 先获取第一页来确定总页数
-        first_page_html = self.get_page_content(start_page)
-        if not first_page_html:
-            print("无法获取第一页内容")
-            return
-        
-        total_pages = self.get_total_pages(first_page_html)
-        if max_pages and max_pages < total_pages:
-            total_pages = max_pages
-        
-        print(f"准备爬取 {total_pages} 页")
-        
-        for page_num in range(start_page, total_pages + 1):
-            print(f"\n正在爬取第 {page_num} 页...")
-            
-            html_content = self.get_page_content(page_num)
-            if not html_content:
-                print(f"第 {page_num} 页获取失败，跳过")
-                continue
-                
-            articles = self.parse_page(html_content, page_num)
-            self.all_data.extend(articles)
-            
-            print(f"第 {page_num} 页爬取完成，找到 {len(articles)} 篇文章")
-            
-            # 添加延迟避免请求过快
-            time.sleep(1)
-        
-        print(f"\n爬取完成！总共获取 {len(self.all_data)} 篇文章")
+        count = self.crawl_pages(start_page, max_pages, resume)
+        self.selector_cache.save()
+        self.selector_cache.report()
+        return count
+    
+    def process_pages(self, pages):
+        """
+        跨运行去重：同一次运行中重复出现的文章（如置顶文章）只保留第一次；
+        运行编号记在检查点里，--resume 时沿用，中断前写出的文章仍算本次运行
+        """
+        state = self.checkpoint.state if self.checkpoint else {}
+        with DedupFilter(self.dedup_path, run=state.get('dedup_run')) as dedup:
+            state['dedup_run'] = dedup.run
+            for page_num, next_page, articles in pages:
+                found = len(articles)
+                articles, duplicates = dedup.filter(articles, lambda article: article['url'])
+                print(f"第 {page_num} 页找到 {found} 篇文章，重复 {duplicates} 篇（{duplicates / found:.0%}）")
+                try:
+                    yield page_num, next_page, articles
+                except BaseException:
+                    # 这一页没写完，续爬时会重做，它的文章不能登记为本次已见
+                    dedup.discard()
+                    raise
+                # 这一页已写出并记入检查点，登记的文章随之写入 SQLite；Bloom 位图在结束时保存
+                dedup.flush()
+            dedup.report()
+    
+    def extract_policy_detail(self, html_content):
+        """提取政策正文和详情页上的发布时间"""
+        soup = make_soup(html_content, self.parser_backend)
+        content = ''
+        for selector in self.detail_content_selectors:
+            element = soup.select_one(selector)
+            if element:
+                content = element.get_text().strip()
+                break
+        detail_time = ''
+        for selector in self.detail_time_selectors:
+            element = soup.select_one(selector)
+            if element:
+                time_match = re.search(r'\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2})?', element.get_text())
+                if time_match:
+                    detail_time = time_match.group()
+                    break
+        return {'content': content, 'detail_time': detail_time}
+    
+    extract_detail = extract_policy_detail
     
     def save_to_json(self, filename="enhanced_school_policies.json"):
         """保存数据到JSON文件"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.all_data, f, ensure_ascii=False, indent=2)
-        print(f"数据已保存到 {filename}")
+        self.export_json(filename)
     
     def save_to_csv(self, filename="enhanced_school_policies.csv"):
         """保存数据到CSV文件"""
-        with open(filename, 'w', encoding='utf-8', newline='') as f:
-            if self.all_data:
-                fieldnames = self.all_data[0].keys()
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.all_data)
-        print(f"数据已保存到 {filename}")
+        records = self.iter_records()
+        first_record = next(records, None)
+        if first_record is None:
+            # 与之前一致：没有数据时生成空文件
+            open(filename, 'w', encoding='utf-8').close()
+            print(f"数据已保存到 {filename}")
+            return filename
+        return self.export_csv(filename, list(first_record.keys()), records=itertools.chain([first_record], records))
     
     def display_summary(self):
-        """显示爬取结果摘要"""
-        if not self.all_data:
-            print("没有爬取到数据")
-            return
-        
-        print(f"\n=== 爬取结果摘要 ===")
-        print(f"总文章数: {len(self.all_data)}")
-        
-        # 按页面统计
-        pages = set(item['page'] for item in self.all_data)
-        print(f"爬取页面数: {len(pages)}")
-        
-        # 按年份统计
+        """显示爬取结果摘要（文章数、页数等运行统计见 report_metrics）"""
+        # 一次遍历完成统计，不要求全部记录都在内存中
+        total_articles = 0
         year_stats = {}
-        for article in self.all_data:
+        first_articles = []
+        for article in self.iter_records():
+            total_articles += 1
             year_match = re.search(r'(\d{4})', article['publish_time'])
             if year_match:
                 year = year_match.group(1)
                 year_stats[year] = year_stats.get(year, 0) + 1
+            if len(first_articles) < 5:
+                first_articles.append(article)
+        
+        if not total_articles:
+            print("没有爬取到数据")
+            return
+        
+        print(f"\n=== 爬取结果摘要 ===")
         
-        print(f"\n按年份统计:")
+        # 按年份统计
+        print(f"按年份统计:")
         for year, count in sorted(year_stats.items()):
             print(f"  {year}年: {count} 篇")
         
         # 显示前5篇文章
         print(f"\n前5篇文章:")
-        for i, article in enumerate(self.all_data[:5], 1):
+        for i, article in enumerate(first_articles, 1):
             print(f"{i}. {article['title']}")
             print(f"   发布时间: {article['publish_time']}")
             print(f"   摘要: {article['summary'][:50]}..." if article['summary'] else "   摘要: 无")
@@ -339,10 +452,21 @@ class EnhancedSchoolPolicyCrawler:
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="爬取上海本地宝学校政策信息")
+    parser.add_argument('--resume', action='store_true', help="从上次中断的检查点继续")
+    parser.add_argument('--details', action='store_true', help="抓取政策详情页，合并正文到列表记录")
+    add_offline_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
     crawler = EnhancedSchoolPolicyCrawler()
+    apply_offline_arguments(crawler, args)
+    apply_metrics_arguments(crawler, args)
     
     # 爬取所有页面
-    crawler.crawl_all_pages()
+    crawler.crawl_all_pages(resume=args.resume)
+    if args.details:
+        crawler.crawl_details()
     
     # 显示摘要
     crawler.display_summary()
@@ -350,6 +474,10 @@ def main():
     # 保存数据
     crawler.save_to_json()
     crawler.save_to_csv()
+    crawler.save_to_parquet()
+    
+    # 各阶段耗时和页数、文章数等计数
+    crawler.report_metrics()
     
     print("增强版爬虫任务完成！")
 
@@ -6,45 +6,55 @@
 包括所有分页内容
 """
 
-import requests
-from bs4 import BeautifulSoup
-import time
-import json
 import os
 from urllib.parse import urljoin
 import re
+import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spider_core.pages import PageMemo, as_page
+from spider_core.pagination import END_OF_LIST, PageNumberPagination
+from spider_core.spider import BaseSpider, records_alias
+
+
+class SchoolPolicyCrawler(BaseSpider):
+    # 每秒一个请求，请求本身的耗时计入间隔
+    rate = 1.0
+    # 没有检查点，某一页抓取失败时跳过它继续爬后面的页
+    skip_failed_pages = 3
+    item_name = '篇文章'
+    name = 'bendibao_school'
+    all_data = records_alias()
 
-class SchoolPolicyCrawler:
     def __init__(self):
+        super().__init__(cache_dir=None)
         self.base_url = "http://sh.bendibao.com/news/list_17_727_{}.htm"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        self.all_data = []
+        # 单次爬取内的页面备忘录，每次 crawl_all_pages 开始时重建
+        self.page_memo = PageMemo(self.parser_backend)
+        # 每解析完一页就追加到 JSONL
+        self.jsonl_path = "school_policies.jsonl"
         
-    def get_page_content(self, page_num):
-        """获取指定页面的内容"""
+    def get_page(self, page_num):
+        """获取指定页面的 ParsedPage，同一次爬取中每个 URL 只抓取、解析一次"""
         url = self.base_url.format(page_num)
-        try:
-            response = self.session.get(url, timeout=10)
-            response.encoding = 'utf-8'
-            if response.status_code == 200:
-                return response.text
-            else:
-                print(f"页面 {page_num} 请求失败，状态码: {response.status_code}")
-                return None
-        except Exception as e:
-            print(f"页面 {page_num} 请求异常: {e}")
-            return None
+        return self.page_memo.get(url, lambda: self.get_page_content(page_num))
+    
+    def fetch_page(self, page_num):
+        page = self.get_page(page_num)
+        # 页面不存在（404/410）时把 END_OF_LIST 交给分页器，按列表结束处理
+        return page.html if page.html is END_OF_LIST else page
+    
+    def parse(self, page_num, page):
+        # 解析之后不再需要这一页：备忘录只在检测总页数和解析第一页之间复用页面
+        self.page_memo.discard(self.page_url(page_num))
+        return self.parse_page(page, page_num)
     
     def parse_page(self, html_content, page_num):
-        """解析页面内容，提取学校政策信息"""
+        """解析页面内容，提取学校政策信息（html_content 可以是 HTML 字符串或 ParsedPage）"""
         if not html_content:
             return []
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = as_page(html_content, self.parser_backend).soup
         articles = []
         
         # 查找文章列表，根据网站结构可能需要调整选择器
@@ -174,11 +184,11 @@ class SchoolPolicyCrawler:
         return articles
     
     def get_total_pages(self, html_content):
-        """获取总页数"""
+        """获取总页数（html_content 可以是 HTML 字符串或 ParsedPage）"""
         if not html_content:
             return 1
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = as_page(html_content, self.parser_backend).soup
         
         # 查找分页信息 - 改进分页检测逻辑
         page_selectors = [
@@ -234,73 +244,46 @@ class SchoolPolicyCrawler:
         print(f"检测到总页数: {max_page}")
         return max_page
     
-    def crawl_all_pages(self, start_page=1, max_pages=None):
-        """爬取所有页面"""
-        print("开始爬取学校政策信息...")
-        
-        # 先获取第一页来确定总页数
-        first_page_html = self.get_page_content(start_page)
-        if not first_page_html:
-            print("无法获取第一页内容")
-            return
-        
-        total_pages = self.get_total_pages(first_page_html)
+    def make_pagination(self, start_page, max_pages):
+        """先获取第一页来确定总页数，解析结果留给后面的 parse_page 复用"""
+        total_pages = self.get_total_pages(self.get_page(start_page))
         if max_pages and max_pages < total_pages:
             total_pages = max_pages
         
         print(f"准备爬取 {total_pages} 页")
+        return PageNumberPagination(self.page_url, start=start_page, max_pages=max(total_pages - start_page + 1, 1))
+    
+    def crawl_all_pages(self, start_page=1, max_pages=None):
+        """爬取所有页面"""
+        print("开始爬取学校政策信息...")
         
-        for page_num in range(start_page, total_pages + 1):
-            print(f"\n正在爬取第 {page_num} 页...")
-            
-            html_content = self.get_page_content(page_num)
-            if not html_content:
-                print(f"第 {page_num} 页获取失败，跳过")
-                continue
-                
-            articles = self.parse_page(html_content, page_num)
-            self.all_data.extend(articles)
-            
-            print(f"第 {page_num} 页爬取完成，找到 {len(articles)} 篇文章")
-            
-            # 添加延迟避免请求过快
-            time.sleep(1)
-        
-        print(f"\n爬取完成！总共获取 {len(self.all_data)} 篇文章")
+        self.page_memo = PageMemo(self.parser_backend)
+        self.crawl_pages(start_page, max_pages)
+        print(f"页面抓取 {self.page_memo.fetches} 次，复用 {self.page_memo.hits} 次")
+        self.page_memo.clear()
     
     def save_to_json(self, filename="school_policies.json"):
         """保存数据到JSON文件"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.all_data, f, ensure_ascii=False, indent=2)
-        print(f"数据已保存到 {filename}")
+        self.export_json(filename)
     
     def save_to_csv(self, filename="school_policies.csv"):
         """保存数据到CSV文件"""
-        import csv
-        
-        with open(filename, 'w', encoding='utf-8', newline='') as f:
-            if self.all_data:
-                fieldnames = self.all_data[0].keys()
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.all_data)
-        print(f"数据已保存到 {filename}")
+        if not self.all_data:
+            open(filename, 'w', encoding='utf-8').close()
+            print(f"数据已保存到 {filename}")
+            return
+        self.export_csv(filename, list(self.all_data[0].keys()))
     
     def display_summary(self):
-        """显示爬取结果摘要"""
+        """显示爬取结果摘要（文章数、页数等运行统计见 report_metrics）"""
         if not self.all_data:
             print("没有爬取到数据")
             return
         
         print(f"\n=== 爬取结果摘要 ===")
-        print(f"总文章数: {len(self.all_data)}")
-        
-        # 按页面统计
-        pages = set(item['page'] for item in self.all_data)
-        print(f"爬取页面数: {len(pages)}")
         
         # 显示前5篇文章
-        print(f"\n前5篇文章:")
+        print(f"前5篇文章:")
         for i, article in enumerate(self.all_data[:5], 1):
             print(f"{i}. {article['title']}")
             print(f"   发布时间: {article['publish_time']}")
@@ -322,6 +305,9 @@ def main():
     crawler.save_to_json()
     crawler.save_to_csv()
     
+    # 各阶段耗时和页数、文章数等计数
+    crawler.report_metrics()
+    
     print("爬虫任务完成！")
 
 
@@ -6,15 +6,44 @@
 """
 
 from school_policy_crawler import SchoolPolicyCrawler
+import pytest
 import requests
 from bs4 import BeautifulSoup
 
+from spider_core.mocksite import MockSite
+from spider_core.ratelimit import RateLimiter
+
+# 本地模拟站点（3 页列表），测试不访问外网；由 site 夹具或 main() 启动，结束时关闭
+SITE = None
+
+
+@pytest.fixture(scope='module', autouse=True)
+def site():
+    global SITE
+    with MockSite(pages=3) as SITE:
+        yield SITE
+    SITE = None
+
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    """爬取结果（如 school_policies.jsonl）写到临时目录，不留在当前目录"""
+    monkeypatch.chdir(tmp_path)
+
+
+def make_crawler():
+    """指向本地模拟站点的爬虫"""
+    crawler = SchoolPolicyCrawler()
+    crawler.base_url = SITE.base_url('bendibao')
+    crawler.rate_limiter = RateLimiter()
+    return crawler
+
 
 def test_page_detection():
     """测试分页检测功能"""
     print("=== 测试分页检测 ===")
     
-    crawler = SchoolPolicyCrawler()
+    crawler = make_crawler()
     
     # 获取第一页内容
     html_content = crawler.get_page_content(1)
@@ -64,7 +93,7 @@ def test_single_page_parsing():
     """测试单页内容解析"""
     print("\n=== 测试单页内容解析 ===")
     
-    crawler = SchoolPolicyCrawler()
+    crawler = make_crawler()
     html_content = crawler.get_page_content(1)
     
     if html_content:
@@ -89,7 +118,7 @@ def test_multiple_pages():
     """测试多页爬取"""
     print("\n=== 测试多页爬取 ===")
     
-    crawler = SchoolPolicyCrawler()
+    crawler = make_crawler()
     
     # 只爬取前2页进行测试
     crawler.crawl_all_pages(max_pages=2)
@@ -110,8 +139,15 @@ def test_multiple_pages():
 
 def main():
     """主测试函数"""
+    global SITE
     print("开始测试爬虫功能...\n")
-    
+    with MockSite(pages=3) as SITE:
+        run_all()
+    SITE = None
+
+
+def run_all():
+    """依次运行各项测试并汇总"""
     # 测试分页检测
     total_pages = test_page_detection()
     
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+爬虫公共组件
+供 p02_maoyan、p03_cnblogs、p04_bendibao 下的各个爬虫共享
+"""
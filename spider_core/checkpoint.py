@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+断点续爬
+检查点文件记录已完成的页、待抓取的页及其 URL、JSONL 输出的写入位置，
+每完成一页原子地重写一次；--resume 时跳过已完成的页，
+把 JSONL 截断到检查点记录的位置后继续追加，不会重复记录
+"""
+
+import json
+import os
+import time
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.completed = []
+        self.pending = {}
+        self.sink_offset = 0
+        self.sink_count = 0
+        # 各爬虫自己需要保存的状态，如总页数
+        self.state = {}
+
+    def load(self):
+        """读取检查点，文件不存在时返回 False"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.completed = data['completed']
+        self.pending = {key: url for key, url in data['pending']}
+        self.sink_offset = data['sink_offset']
+        self.sink_count = data['sink_count']
+        self.state = data.get('state', {})
+        return True
+
+    def start(self, pages, url_func):
+        """登记本次要爬取的页，返回其中尚未完成的页"""
+        done = set(self.completed)
+        todo = [page for page in pages if page not in done]
+        for page in todo:
+            self.pending.setdefault(page, url_func(page))
+        return todo
+
+    def page_done(self, page, sink):
+        """一页的记录已写入 sink，更新检查点"""
+        self.completed.append(page)
+        self.pending.pop(page, None)
+        self.sink_offset = sink.offset
+        self.sink_count = sink.count
+        self.save()
+
+    def advance(self, page, sink, next_page=None, next_url=None):
+        """
+        自动分页时使用：一页完成后把下一页登记为待抓取，
+        下次从 state['next_page'] 继续；next_page 为 None 表示已到末页
+        """
+        self.state['next_page'] = next_page
+        self.pending = {next_page: next_url} if next_page is not None else {}
+        self.page_done(page, sink)
+
+    def end_reached(self):
+        """分页正常结束（空页、重复页、没有下一页），不再有待抓取的页"""
+        self.pending = {}
+
+    def save(self):
+        """原子地写入检查点文件"""
+        data = {
+            'completed': self.completed,
+            'pending': sorted(self.pending.items()),
+            'sink_offset': self.sink_offset,
+            'sink_count': self.sink_count,
+            'state': self.state,
+            'updated': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        temp_path = self.path + '.part'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def finish(self):
+        """全部页都已完成时删除检查点，否则保留以便下次继续"""
+        if self.pending:
+            print(f"还有 {len(self.pending)} 页未完成，检查点保存在 {self.path}，可用 --resume 继续")
+            self.save()
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def report(self):
+        print(f"从检查点继续：已完成 {len(self.completed)} 页，已写入 {self.sink_count} 条记录")
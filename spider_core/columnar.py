@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Parquet 列式导出
+按字段类型把记录转换成带类型的列（计数为 int64、时间为 timestamp、评分为 float64），
+按爬取日期分区写到 <root>/crawl_date=YYYY-MM-DD/part-0.parquet，
+读取单列时只解码该列
+
+依赖 pyarrow，未安装时导出会给出提示
+"""
+
+import os
+import re
+from datetime import date, datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+PART_FILE = 'part-0.parquet'
+
+# 时间字段取第一个日期/时刻，如 '2019-07-01 18:10'、'1994-09-10(加拿大)'、'发布于 2025-01-03 10:00'
+_TIMESTAMP_PATTERN = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?')
+
+
+def parse_timestamp(value):
+    """解析时间文本，无法解析时返回 None"""
+    if not value:
+        return None
+    match = _TIMESTAMP_PATTERN.search(str(value))
+    if not match:
+        return None
+    parts = [int(part) if part else 0 for part in match.groups()]
+    try:
+        return datetime(*parts)
+    except ValueError:
+        return None
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_string(value):
+    return None if value is None else str(value)
+
+
+# 字段类型名 -> 转换函数；对应的 Arrow 类型见 arrow_type
+_CONVERTERS = {
+    'string': parse_string,
+    'int': parse_int,
+    'float': parse_float,
+    'timestamp': parse_timestamp,
+}
+
+
+def arrow_type(type_name):
+    return {
+        'string': pa.string(),
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'timestamp': pa.timestamp('ms'),
+    }[type_name]
+
+
+def require_pyarrow():
+    if not HAS_PYARROW:
+        raise ImportError("导出 Parquet 需要安装 pyarrow: pip install pyarrow")
+
+
+def make_schema(fields):
+    """fields: [(列名, 类型名), ...]，类型名为 string/int/float/timestamp"""
+    require_pyarrow()
+    return pa.schema([(name, arrow_type(type_name)) for name, type_name in fields])
+
+
+def partition_dir(root, crawl_date=None):
+    """按爬取日期分区的目录，crawl_date 默认为今天"""
+    crawl_date = crawl_date or date.today()
+    if not isinstance(crawl_date, str):
+        crawl_date = crawl_date.isoformat()
+    return os.path.join(root, f'crawl_date={crawl_date}')
+
+
+def export_parquet(records, root, fields, crawl_date=None, batch_size=10000):
+    """
+    把记录流式转换成列并写入当天的分区，返回写入的文件路径和行数；
+    同一天重复导出会覆盖该天的分区文件
+    """
+    schema = make_schema(fields)
+    converters = [(name, _CONVERTERS[type_name]) for name, type_name in fields]
+    directory = partition_dir(root, crawl_date)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, PART_FILE)
+    temp_path = path + '.part'
+
+    rows = 0
+    columns = {name: [] for name, _ in fields}
+    with pq.ParquetWriter(temp_path, schema) as writer:
+        def write_batch():
+            writer.write_batch(pa.record_batch([columns[name] for name, _ in fields], schema=schema))
+            for values in columns.values():
+                values.clear()
+
+        for record in records:
+            for name, convert in converters:
+                columns[name].append(convert(record.get(name)))
+            rows += 1
+            if rows % batch_size == 0:
+                write_batch()
+        if rows % batch_size or not rows:
+            write_batch()
+    os.replace(temp_path, path)
+    return path, rows
+
+
+def read_parquet(root, columns=None, filters=None):
+    """
+    读取整个导出目录（所有爬取日期），crawl_date 作为分区列出现；
+    columns 只列出需要的列时其余列不会被解码
+    """
+    require_pyarrow()
+    return pq.read_table(root, columns=columns, filters=filters, partitioning='hive')
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+跨运行的记录去重
+内存中只放一个大小固定的分块 Bloom 过滤器，精确的 64 位指纹和最后出现的运行编号保存在 SQLite。
+Bloom 判断没见过的键（绝大多数新记录）直接放行，一次查询只需 crc32 加一次按位与，
+精确指纹留到写入 SQLite 时再批量计算；
+判断见过时再查精确存储，以区分本次运行内的重复（如置顶文章出现在多页）、
+以前运行见过的记录和 Bloom 的误判。
+每页结束只把新登记的键写入 SQLite，Bloom 位图在关闭时保存；
+SQLite 中同时保存每个键的 crc32，上次运行异常退出、位图与精确存储不一致时据此重建位图，
+键数超过位图容量时也据此把位图扩大一倍，误判率不随键数增长。
+各路径的耗时见 benchmarks/bench_dedup.py
+"""
+
+import hashlib
+import random
+import sqlite3
+import zlib
+from array import array
+
+NEW = 'new'
+KNOWN = 'known'
+DUPLICATE = 'duplicate'
+
+# 每个键约占的位数和置位数，对应误判率约 0.5%（误判由精确存储纠正）
+BITS_PER_KEY = 16
+NUM_BITS = 8
+_MASK_COUNT = 1 << 12
+
+
+def _make_masks(num_bits):
+    """预先生成 4096 个各有 num_bits 个 1 的 64 位掩码，查询时按哈希取一个"""
+    rng = random.Random(num_bits)
+    masks = []
+    for _ in range(_MASK_COUNT):
+        mask = 0
+        for bit in rng.sample(range(64), num_bits):
+            mask |= 1 << bit
+        masks.append(mask)
+    return masks
+
+
+_MASKS = _make_masks(NUM_BITS)
+
+
+class BlockedBloomFilter:
+    """每个键的位都落在同一个 64 位字里：按 crc32 选字，按混合后的哈希选掩码"""
+
+    def __init__(self, capacity, words=None):
+        self.words = words if words is not None else array('Q', bytes(8 * max(1, capacity * BITS_PER_KEY // 64)))
+        self.size = len(self.words)
+        # 保持设计误判率时能容纳的键数
+        self.capacity = self.size * 64 // BITS_PER_KEY
+
+    def __contains__(self, key):
+        h = zlib.crc32(key.encode('utf-8'))
+        mask = _MASKS[(h * 2654435761 >> 20) & 0xFFF]
+        return self.words[h % self.size] & mask == mask
+
+    def add(self, key):
+        """置位，返回之前是否已经全部置位（即 key 可能见过）；查询和置位共用一次哈希"""
+        h = zlib.crc32(key.encode('utf-8'))
+        index = h % self.size
+        mask = _MASKS[(h * 2654435761 >> 20) & 0xFFF]
+        word = self.words[index]
+        if word & mask == mask:
+            return True
+        self.words[index] = word | mask
+        return False
+
+    def add_hashes(self, hashes):
+        """按保存的 crc32 批量置位，用于重建位图"""
+        words, size = self.words, self.size
+        for h in hashes:
+            words[h % size] |= _MASKS[(h * 2654435761 >> 20) & 0xFFF]
+
+
+def key_fingerprint(key):
+    """精确存储用的 64 位指纹（SQLite 的有符号整数）"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+class DedupFilter:
+    def __init__(self, path, capacity=1_000_000, batch_size=1000, run=None):
+        """
+        path: SQLite 文件，保存 Bloom 位图和精确指纹
+        capacity: 预计的键数量，决定新建 Bloom 的大小；实际键数超过容量时位图自动扩大一倍
+        run: 本次运行的编号，默认为已保存的最大编号加一；从检查点继续时传入中断前的编号，
+             中断前登记的键仍算本次运行
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            # h 为键的 crc32，重建 Bloom 位图用
+            self.conn.execute('CREATE TABLE IF NOT EXISTS keys (fp INTEGER PRIMARY KEY, last_run INTEGER, '
+                              'h INTEGER NOT NULL)')
+            # key_count 为保存位图时精确存储中的键数，对不上说明位图没有随最后写入的键一起保存
+            self.conn.execute('CREATE TABLE IF NOT EXISTS bloom (id INTEGER PRIMARY KEY CHECK (id = 0), words BLOB, '
+                              'key_count INTEGER)')
+        # 精确存储中的键数加上待写入的新键数
+        self.key_count = self.conn.execute('SELECT COUNT(*) FROM keys').fetchone()[0]
+        row = self.conn.execute('SELECT words, key_count FROM bloom').fetchone()
+        self.bloom = None
+        if row and row[1] == self.key_count:
+            words = array('Q')
+            words.frombytes(row[0])
+            self.bloom = BlockedBloomFilter(0, words)
+        if self.bloom is None or self.bloom.capacity < self.key_count:
+            self.bloom = BlockedBloomFilter(max(capacity, 2 * self.key_count))
+            if self.key_count:
+                self.bloom.add_hashes(h for h, in self.conn.execute('SELECT h FROM keys'))
+                print(f"去重：已从 {self.key_count} 个键重建 Bloom 位图（上次没有正常保存，或键数超过了容量）")
+        if run is None:
+            run = (self.conn.execute('SELECT MAX(last_run) FROM keys').fetchone()[0] or 0) + 1
+        self.run = run
+        # 尚未写入 SQLite 的 键 -> 运行编号，写入时才计算指纹
+        self.pending = {}
+        self.counts = {NEW: 0, KNOWN: 0, DUPLICATE: 0}
+        self.false_positives = 0
+        self.resizes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def checked(self):
+        return sum(self.counts.values())
+
+    def __contains__(self, key):
+        """只查询不登记"""
+        return key in self.bloom and self._last_run(key) is not None
+
+    def _last_run(self, key):
+        run = self.pending.get(key)
+        if run is not None:
+            return run
+        row = self.conn.execute('SELECT last_run FROM keys WHERE fp = ?', (key_fingerprint(key),)).fetchone()
+        return row[0] if row else None
+
+    def check(self, key):
+        """登记 key 并返回 NEW（从没见过）、KNOWN（以前的运行见过）或 DUPLICATE（本次运行已经出现过）"""
+        if self.bloom.add(key):
+            last_run = self._last_run(key)
+            if last_run == self.run:
+                self.counts[DUPLICATE] += 1
+                return DUPLICATE
+            if last_run is None:
+                self.false_positives += 1
+                status = NEW
+            else:
+                status = KNOWN
+        else:
+            # Bloom 没见过：不碰精确存储，也不算指纹
+            status = NEW
+        self.counts[status] += 1
+        pending = self.pending
+        pending[key] = self.run
+        if status is NEW:
+            self.key_count += 1
+            if self.key_count > self.bloom.capacity:
+                self._grow()
+        if len(pending) >= self.batch_size:
+            self.flush()
+        return status
+
+    def _grow(self):
+        """键数超过 Bloom 的容量时把位图扩大一倍，从保存的哈希和待写入的键重建"""
+        bloom = BlockedBloomFilter(2 * self.bloom.capacity)
+        bloom.add_hashes(h for h, in self.conn.execute('SELECT h FROM keys'))
+        bloom.add_hashes(zlib.crc32(key.encode('utf-8')) for key in self.pending)
+        self.bloom = bloom
+        self.resizes += 1
+
+    def filter(self, records, key_func):
+        """去掉本次运行内重复的记录，返回 (保留的记录, 重复数)"""
+        kept = [record for record in records if self.check(key_func(record)) != DUPLICATE]
+        return kept, len(records) - len(kept)
+
+    def flush(self):
+        if self.pending:
+            with self.conn:
+                self.conn.executemany('INSERT INTO keys (fp, last_run, h) VALUES (?, ?, ?) '
+                                      'ON CONFLICT (fp) DO UPDATE SET last_run = excluded.last_run',
+                                      [(key_fingerprint(key), run, zlib.crc32(key.encode('utf-8')))
+                                       for key, run in self.pending.items()])
+            self.pending = {}
+
+    def discard(self):
+        """丢弃尚未写入的键，如中断时没写完的一页；Bloom 中多出的位只会造成可纠正的误判"""
+        self.pending = {}
+
+    def save(self):
+        """写入待保存的指纹和 Bloom 位图"""
+        self.flush()
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO bloom (id, words, key_count) '
+                              'VALUES (0, ?, (SELECT COUNT(*) FROM keys))', (self.bloom.words.tobytes(),))
+
+    def close(self):
+        if self.conn is not None:
+            self.save()
+            self.conn.close()
+            self.conn = None
+
+    def report(self):
+        rate = self.counts[DUPLICATE] / self.checked if self.checked else 0
+        print(f"去重：检查 {self.checked} 条，新记录 {self.counts[NEW]} 条，以前见过 {self.counts[KNOWN]} 条，"
+              f"本次重复 {self.counts[DUPLICATE]} 条（{rate:.1%}），Bloom 误判 {self.false_positives} 次"
+              + (f"，位图扩容 {self.resizes} 次" if self.resizes else ""))
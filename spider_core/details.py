@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+详情页抓取
+列表页记录中的 url 经调度队列并发抓取，提取正文和发布信息后合并回列表记录；
+每篇文章保存列表页元数据的签名，下次运行签名没变时直接复用上次的详情，不再请求
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from spider_core.frontier import PRIORITY_DETAIL, run_frontier
+from spider_core.storage import SQLiteSink
+
+DETAIL_TABLE = 'details'
+DETAIL_COLUMNS = [
+    ('url', 'TEXT NOT NULL'),
+    ('signature', 'TEXT'),
+    ('detail', 'TEXT'),
+    ('fetched_at', 'TEXT'),
+]
+
+
+def list_signature(record, fields):
+    """列表页元数据的签名，fields 中任一字段变化签名就不同"""
+    data = json.dumps([record.get(field) for field in fields], ensure_ascii=False)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class DetailStage:
+    def __init__(self, db_path, fetch_func, extract_func, signature_fields, workers=4):
+        """
+        db_path: 保存详情和签名的数据库，与列表记录共用一个文件
+        fetch_func(url): 返回详情页 HTML，失败时返回 None
+        extract_func(html): 返回要合并进列表记录的字段字典
+        signature_fields: 判断文章是否变化的列表页字段
+        """
+        self.db_path = db_path
+        self.fetch_func = fetch_func
+        self.extract_func = extract_func
+        self.signature_fields = signature_fields
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.fetched = 0
+        self.reused = 0
+        self.failed = 0
+
+    def open_db(self):
+        return SQLiteSink(self.db_path, DETAIL_TABLE, DETAIL_COLUMNS, ('url',))
+
+    def run(self, records, frontier):
+        """抓取 records 对应的详情页，返回 {url: 详情字段}"""
+        signatures = {record['url']: list_signature(record, self.signature_fields)
+                      for record in records if record.get('url')}
+        with self.open_db() as db:
+            stored = {row['url']: row for row in db.query(f"SELECT url, signature, detail FROM {DETAIL_TABLE}")}
+
+        details = {}
+        rows = []
+
+        def handler(url, depth, meta):
+            signature = signatures.get(url)
+            if signature is None:
+                return
+            row = stored.get(url)
+            if row and row['signature'] == signature:
+                details[url] = json.loads(row['detail'])
+                with self.lock:
+                    self.reused += 1
+                return
+            html_content = self.fetch_func(url)
+            if not html_content:
+                with self.lock:
+                    self.failed += 1
+                return
+            detail = self.extract_func(html_content)
+            details[url] = detail
+            with self.lock:
+                self.fetched += 1
+                rows.append({
+                    'url': url,
+                    'signature': signature,
+                    'detail': json.dumps(detail, ensure_ascii=False),
+                    'fetched_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                })
+
+        # 详情页 URL 只在这里入队，列表中重复的 URL 由队列去重
+        for url in signatures:
+            frontier.add(url, PRIORITY_DETAIL, depth=1)
+        run_frontier(frontier, handler, self.workers)
+
+        with self.open_db() as db:
+            db.write_many(rows)
+        return details
+
+    @staticmethod
+    def join(records, details):
+        """把详情字段合并回列表记录"""
+        for record in records:
+            detail = details.get(record.get('url'))
+            yield dict(record, **detail) if detail else record
+
+    def report(self):
+        print(f"详情页：抓取 {self.fetched} 篇，未变化复用 {self.reused} 篇，失败 {self.failed} 篇")
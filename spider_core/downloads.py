@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+有界的并发下载池
+总线程数有上限，同一域名（如图片 CDN）另有单独的并发上限，
+结束时汇总完成、跳过、失败的数量
+"""
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+COMPLETED = 'completed'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _default_file_mode():
+    """普通 open() 新建文件时的权限：0o666 去掉 umask"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# mkstemp 建的临时文件是 0600，重命名后会保留，下载完成后改回按 umask 的权限
+FILE_MODE = _default_file_mode()
+
+
+def stream_to_file(session, url, filepath, chunk_size=DEFAULT_CHUNK_SIZE, max_bytes=None, timeout=10, hasher=None,
+                   timings=None):
+    """
+    分块下载 url 到 filepath，返回写入的字节数
+    先写入同目录下的临时文件，下载完整后再原子地重命名，
+    中途被杀掉的进程只会留下临时文件，不会出现半截的目标文件；
+    传入 hasher（如 hashlib.sha256()）时边下载边计算内容摘要，
+    传入字典 timings 时把写盘（含重命名）耗费的秒数累加到 timings['write']
+    """
+    write_seconds = 0.0
+    with session.get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        content_length = response.headers.get('Content-Length')
+        if max_bytes and content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise ValueError(f"文件大小 {content_length} 字节超过上限 {max_bytes} 字节")
+
+        directory = os.path.dirname(filepath) or '.'
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(filepath), suffix='.part')
+        written = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if not chunk:
+                        continue
+                    written += len(chunk)
+                    if max_bytes and written > max_bytes:
+                        raise ValueError(f"文件大小超过上限 {max_bytes} 字节")
+                    start = time.perf_counter()
+                    f.write(chunk)
+                    write_seconds += time.perf_counter() - start
+                    if hasher is not None:
+                        hasher.update(chunk)
+                start = time.perf_counter()
+            os.chmod(temp_path, FILE_MODE)
+            os.replace(temp_path, filepath)
+            write_seconds += time.perf_counter() - start
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    if timings is not None:
+        timings['write'] = timings.get('write', 0.0) + write_seconds
+    return written
+
+
+def remove_partial_files(directory):
+    """清理之前被中断的下载留下的临时文件，返回清理的数量"""
+    removed = 0
+    for name in os.listdir(directory):
+        if name.startswith('.') and name.endswith('.part'):
+            os.remove(os.path.join(directory, name))
+            removed += 1
+    return removed
+
+
+class DownloadPool:
+    def __init__(self, max_workers=8, per_host=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+        self.per_host = per_host
+        self.host_semaphores = {}
+        self.lock = threading.Lock()
+        self.stats = {COMPLETED: 0, SKIPPED: 0, FAILED: 0}
+        self.failures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def _semaphore(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.host_semaphores:
+                self.host_semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_semaphores[host]
+
+    def _run(self, url, func, args):
+        with self._semaphore(url):
+            try:
+                status, result = func(*args)
+            except Exception as e:
+                print(f"下载任务异常 {url}: {e}")
+                status, result = FAILED, None
+        with self.lock:
+            self.stats[status] += 1
+            if status == FAILED:
+                self.failures.append(url)
+        return result
+
+    def submit(self, url, func, *args):
+        """提交下载任务，func 返回 (状态, 结果)，Future 的结果为 func 返回的结果"""
+        return self.executor.submit(self._run, url, func, args)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def report(self):
+        """打印下载汇总"""
+        print(f"图片下载汇总: 完成 {self.stats[COMPLETED]} 张，"
+              f"已存在跳过 {self.stats[SKIPPED]} 张，失败 {self.stats[FAILED]} 张")
+        for url in self.failures:
+            print(f"  下载失败: {url}")
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+预编译的提取计划
+把"依次尝试多个 CSS 选择器"的级联编译一次，之后对每个元素只遍历一次子树，
+同时找出每个选择器的第一个匹配节点，以及匹配给定正则的文本节点
+"""
+
+import re
+
+import soupsieve
+from bs4 import NavigableString, Tag
+
+# 可以直接编译成判断函数的简单选择器：tag、.class、tag.class、tag[attr*="value"]
+_SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?(?:\.([\w-]+))?$')
+_CONTAINS_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?\[([\w-]+)\*="([^"]*)"\]$')
+
+
+def _attribute_text(tag, attr):
+    value = tag.get(attr)
+    if isinstance(value, list):
+        return ' '.join(value)
+    return value
+
+
+def compile_selector(selector):
+    """把选择器编译成 match(tag) -> bool 的函数，复杂选择器交给 soupsieve"""
+    selector = selector.strip()
+    simple = _SIMPLE_SELECTOR.match(selector)
+    if simple and (simple.group(1) or simple.group(2)):
+        name, class_name = simple.group(1), simple.group(2)
+        name = name.lower() if name else None
+
+        def match(tag):
+            if name and tag.name != name:
+                return False
+            return not class_name or class_name in (tag.get('class') or ())
+        return match
+
+    contains = _CONTAINS_SELECTOR.match(selector)
+    if contains:
+        name, attr, needle = contains.groups()
+        name = name.lower() if name else None
+
+        def match(tag):
+            if name and tag.name != name:
+                return False
+            value = _attribute_text(tag, attr)
+            return value is not None and needle in value
+        return match
+
+    return soupsieve.compile(selector).match
+
+
+class SelectorPlan:
+    def __init__(self, selectors, string_pattern=None):
+        """
+        selectors: 按优先级排列的 CSS 选择器
+        string_pattern: 需要同时收集的文本节点正则（可选）
+        """
+        self.selectors = list(selectors)
+        self.matchers = [compile_selector(selector) for selector in self.selectors]
+        self.string_pattern = re.compile(string_pattern) if isinstance(string_pattern, str) else string_pattern
+
+    def scan(self, element):
+        """
+        一次遍历 element 的后代，返回 (first_matches, strings)
+        first_matches[i] 等价于 element.select_one(selectors[i])，
+        strings 等价于 element.find_all(string=string_pattern)
+        """
+        first_matches = [None] * len(self.matchers)
+        strings = []
+        for node in element.descendants:
+            if isinstance(node, Tag):
+                for i, match in enumerate(self.matchers):
+                    if first_matches[i] is None and match(node):
+                        first_matches[i] = node
+            elif self.string_pattern is not None and isinstance(node, NavigableString):
+                if self.string_pattern.search(node):
+                    strings.append(node)
+        return first_matches, strings
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+URL 调度队列（frontier）
+- 优先级队列，每个域名一个子队列，同优先级时轮流从各域名取，避免一个站点占满工作线程
+- URL 规范化后取 64 位指纹去重，已见集合用排好序的 array('Q') 保存，每个 URL 约 8 字节
+- 超过深度上限的 URL 不入队
+列表页把详情页 URL 放进队列，工作线程从队列中取出处理
+"""
+
+import hashlib
+import heapq
+import itertools
+import threading
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 数字越小越先处理
+PRIORITY_LIST = 0
+PRIORITY_DETAIL = 10
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """规范化 URL：协议和域名小写，去掉默认端口和锚点，查询参数排序，空路径补 /"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def url_fingerprint(url):
+    """规范化 URL 的 64 位指纹"""
+    digest = hashlib.blake2b(canonicalize_url(url).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class SeenSet:
+    """
+    紧凑的已见 URL 集合：新指纹先放进小的 set，
+    攒够 merge_threshold 个后并入有序的 array('Q')，查找用二分
+    """
+
+    def __init__(self, merge_threshold=65536):
+        self.merge_threshold = merge_threshold
+        self.fingerprints = array('Q')
+        self.recent = set()
+
+    def __len__(self):
+        return len(self.fingerprints) + len(self.recent)
+
+    def __contains__(self, url):
+        return self._contains(url_fingerprint(url))
+
+    def _contains(self, fingerprint):
+        if fingerprint in self.recent:
+            return True
+        index = bisect_left(self.fingerprints, fingerprint)
+        return index < len(self.fingerprints) and self.fingerprints[index] == fingerprint
+
+    def add(self, url):
+        """加入 URL，之前没见过时返回 True"""
+        fingerprint = url_fingerprint(url)
+        if self._contains(fingerprint):
+            return False
+        self.recent.add(fingerprint)
+        if len(self.recent) >= self.merge_threshold:
+            self._merge()
+        return True
+
+    def _merge(self, *sorted_runs):
+        """把 recent 和若干有序指纹序列归并进 fingerprints，逐个写入新数组，不构建中间列表"""
+        self.fingerprints = array('Q', heapq.merge(self.fingerprints, sorted(self.recent), *sorted_runs))
+        self.recent = set()
+
+    def save(self, path):
+        """保存为二进制指纹文件，下次运行可以继续去重"""
+        self._merge()
+        with open(path, 'wb') as f:
+            self.fingerprints.tofile(f)
+
+    def load(self, path):
+        """并入 save 保存的指纹文件（文件中的指纹已排好序）"""
+        loaded = array('Q')
+        with open(path, 'rb') as f:
+            loaded.frombytes(f.read())
+        self._merge(loaded)
+
+
+class Frontier:
+    def __init__(self, max_depth=None, seen=None):
+        """
+        max_depth: 深度上限，起始页深度为 0，None 表示不限
+        seen: 共用的 SeenSet，默认新建
+        """
+        self.max_depth = max_depth
+        self.seen = seen if seen is not None else SeenSet()
+        # 域名 -> [(priority, 序号, url, depth, meta)] 小顶堆
+        self.queues = {}
+        # 域名 -> 上次被取出的序号，同优先级时先取等得最久的域名
+        self.last_served = {}
+        self.counter = itertools.count()
+        self.size = 0
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.added = 0
+        self.duplicates = 0
+        self.too_deep = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, url, priority=PRIORITY_LIST, depth=0, meta=None):
+        """URL 入队，重复或超过深度上限时返回 False"""
+        if not url:
+            return False
+        with self.condition:
+            if self.max_depth is not None and depth > self.max_depth:
+                self.too_deep += 1
+                return False
+            if not self.seen.add(url):
+                self.duplicates += 1
+                return False
+            host = urlsplit(url).hostname or ''
+            heapq.heappush(self.queues.setdefault(host, []), (priority, next(self.counter), url, depth, meta))
+            self.size += 1
+            self.added += 1
+            self.condition.notify()
+            return True
+
+    def add_many(self, urls, priority=PRIORITY_LIST, depth=0):
+        return sum(self.add(url, priority, depth) for url in urls)
+
+    def _pop_locked(self):
+        host = min(self.queues, key=lambda h: (self.queues[h][0][0], self.last_served.get(h, -1)))
+        queue = self.queues[host]
+        _, _, url, depth, meta = heapq.heappop(queue)
+        if not queue:
+            del self.queues[host]
+        self.last_served[host] = next(self.counter)
+        self.size -= 1
+        return url, depth, meta
+
+    def pop(self, block=True):
+        """
+        取出下一个 (url, depth, meta)；队列为空时：
+        block 为 True 则等到有新 URL，或所有已取出的 URL 都处理完（此时返回 None）
+        取出的 URL 处理完后要调用 task_done()
+        """
+        with self.condition:
+            while not self.queues:
+                if not block or self.in_flight == 0:
+                    return None
+                self.condition.wait()
+            self.in_flight += 1
+            return self._pop_locked()
+
+    def task_done(self):
+        with self.condition:
+            self.in_flight -= 1
+            if self.in_flight == 0 and not self.queues:
+                self.condition.notify_all()
+
+    def report(self):
+        print(f"URL 队列：入队 {self.added} 个，重复 {self.duplicates} 个，超过深度 {self.too_deep} 个，"
+              f"剩余 {self.size} 个")
+
+
+def run_frontier(frontier, handler, workers=4):
+    """
+    用 workers 个线程处理队列直到清空，handler(url, depth, meta) 中可以继续往队列里加 URL；
+    返回处理的 URL 数量
+    """
+    processed = itertools.count()
+
+    def work():
+        while True:
+            item = frontier.pop()
+            if item is None:
+                return
+            try:
+                handler(*item)
+                next(processed)
+            except Exception as e:
+                print(f"处理 {item[0]} 失败: {e}")
+            finally:
+                frontier.task_done()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in range(workers):
+            executor.submit(work)
+    return next(processed)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP 条件请求缓存
+以 requests 传输适配器的形式挂在 Session 上，保存页面内容及其 ETag/Last-Modified，
+再次请求时带上 If-None-Match/If-Modified-Since，服务器返回 304 时直接使用本地副本
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from requests.adapters import HTTPAdapter
+
+# 随缓存内容一起保存的响应头
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class HTTPCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + '.json'), os.path.join(self.cache_dir, key + '.body')
+
+    def get(self, url):
+        """返回 (元信息, 内容)，没有缓存时返回 None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url:
+            return None
+        return meta, body
+
+    def put(self, url, headers, body):
+        """保存带校验信息的响应，没有 ETag/Last-Modified 的响应不缓存"""
+        meta = {'url': url, 'headers': {name: headers[name] for name in STORED_HEADERS if name in headers}}
+        if 'ETag' not in meta['headers'] and 'Last-Modified' not in meta['headers']:
+            return False
+        meta_path, body_path = self._paths(url)
+        # 先写内容再写元信息，读取时以元信息为准
+        self._write_atomic(body_path, body)
+        self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        return True
+
+    @staticmethod
+    def _write_atomic(path, data):
+        temp_path = f"{path}.{threading.get_ident()}.part"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def report(self):
+        """打印命中统计"""
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        print(f"HTTP缓存: 命中 {self.hits} 次，未命中 {self.misses} 次，命中率 {rate:.1f}%")
+
+
+class CachingAdapter(HTTPAdapter):
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request, stream=False, **kwargs):
+        # 只缓存非流式的 GET 请求，图片等流式下载直接透传
+        if request.method != 'GET' or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        cached = self.cache.get(request.url)
+        if cached:
+            meta, body = cached
+            if 'ETag' in meta['headers']:
+                request.headers['If-None-Match'] = meta['headers']['ETag']
+            if 'Last-Modified' in meta['headers']:
+                request.headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if cached and response.status_code == 304:
+            # 未修改，用本地副本构造一个正常的 200 响应
+            response.status_code = 200
+            response.reason = 'OK'
+            response.headers.update(meta['headers'])
+            response._content = body
+            response._content_consumed = True
+            response.from_cache = True
+            self.cache.record(hit=True)
+            return response
+
+        response.from_cache = False
+        self.cache.record(hit=False)
+        if response.status_code == 200:
+            self.cache.put(request.url, response.headers, response.content)
+        return response
+
+
+def install_cache(session, cache_dir):
+    """在 session 上挂载缓存适配器，返回 HTTPCache 以便查看统计"""
+    cache = HTTPCache(cache_dir)
+    adapter = CachingAdapter(cache)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return cache
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+按内容寻址的图片仓库
+图片以内容摘要命名保存在 blobs/ 下，相同内容只存一份；
+index.json 记录 URL 摘要 -> 图片、名称 -> 图片 的映射，
+启动时一次性读入内存，已知 URL 无需再访问文件系统
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from urllib.parse import urlparse
+
+from .downloads import stream_to_file, remove_partial_files
+
+
+class ImageStore:
+    def __init__(self, root):
+        self.root = root
+        self.blobs_dir = os.path.join(root, 'blobs')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        self.index_path = os.path.join(root, 'index.json')
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        remove_partial_files(self.tmp_dir)
+
+        self.lock = threading.Lock()
+        self.index = {'urls': {}, 'names': {}, 'blobs': {}}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index.update(json.load(f))
+
+    def __len__(self):
+        return len(self.index['blobs'])
+
+    @staticmethod
+    def url_key(url):
+        """URL 的摘要，作为索引键"""
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def extension(url, default='.jpg'):
+        """从 URL 路径推断扩展名，忽略查询参数"""
+        return os.path.splitext(urlparse(url).path)[1] or default
+
+    def blob_path(self, blob):
+        """图片文件的本地路径，按摘要前两位分目录"""
+        return os.path.join(self.blobs_dir, blob[:2], blob)
+
+    def lookup(self, url):
+        """已下载过的 URL 返回本地路径，否则返回 None"""
+        blob = self.index['urls'].get(self.url_key(url))
+        return self.blob_path(blob) if blob else None
+
+    def lookup_name(self, name):
+        """按名称（如电影名）查找图片路径"""
+        blob = self.index['names'].get(name)
+        return self.blob_path(blob) if blob else None
+
+    def link(self, blob, url=None, name=None):
+        """记录 URL、名称与图片的对应关系"""
+        with self.lock:
+            if url:
+                self.index['urls'][self.url_key(url)] = blob
+            if name:
+                self.index['names'][name] = blob
+
+    def _commit_blob(self, temp_path, digest, extension):
+        """把临时文件放入仓库，内容已存在时丢弃临时文件，返回图片名"""
+        blob = digest + extension
+        with self.lock:
+            if digest in self.index['blobs']:
+                os.remove(temp_path)
+                return self.index['blobs'][digest]
+            target = self.blob_path(blob)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(temp_path, target)
+            self.index['blobs'][digest] = blob
+        return blob
+
+    def download(self, session, url, name=None, **stream_kwargs):
+        """下载 url 并存入仓库，返回本地路径"""
+        hasher = hashlib.sha256()
+        temp_path = os.path.join(self.tmp_dir, f'.{self.url_key(url)}-{uuid.uuid4().hex}.part')
+        stream_to_file(session, url, temp_path, hasher=hasher, **stream_kwargs)
+        blob = self._commit_blob(temp_path, hasher.hexdigest(), self.extension(url))
+        self.link(blob, url=url, name=name)
+        return self.blob_path(blob)
+
+    def add_file(self, path, url=None, name=None):
+        """把已有的本地图片复制进仓库，返回本地路径"""
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        extension = os.path.splitext(path)[1] or '.jpg'
+        if digest in self.index['blobs']:
+            blob = self.index['blobs'][digest]
+        else:
+            temp_path = os.path.join(self.tmp_dir, f'.{digest}-{uuid.uuid4().hex}.part')
+            shutil.copyfile(path, temp_path)
+            blob = self._commit_blob(temp_path, digest, extension)
+        self.link(blob, url=url, name=name)
+        return self.blob_path(blob)
+
+    def import_directory(self, directory, use_names=True):
+        """导入目录下的所有图片（如 film/、maoyan_data/images/），文件名去掉扩展名作为名称"""
+        imported = 0
+        for filename in sorted(os.listdir(directory)):
+            path = os.path.join(directory, filename)
+            if not os.path.isfile(path):
+                continue
+            name = os.path.splitext(filename)[0] if use_names else None
+            self.add_file(path, name=name)
+            imported += 1
+        return imported
+
+    def save(self):
+        """原子地写回索引文件"""
+        temp_path = self.index_path + '.part'
+        with self.lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+爬取指标
+按阶段记录耗时直方图（抓取、限速等待、建连、TLS、服务器响应、下载正文、解析、写出、海报下载、导出……）
+和计数器（页数、记录数、各状态码的响应数、重试、字节数……），
+运行结束时打印汇总表，也可以导出为 Prometheus 文本格式：写入文件（供 node_exporter 的
+textfile collector 采集）或在本地端口上提供 /metrics。
+
+    metrics = CrawlMetrics('cnblogs')
+    with metrics.time('parse'):
+        ...
+    metrics.inc('responses', status=200)
+    metrics.report()
+    metrics.write('cnblogs.prom')
+"""
+
+import bisect
+import contextlib
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# 直方图桶上界（秒），覆盖本地解析的毫秒级到慢请求的数十秒
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 各阶段的说明，汇总表按这个顺序排列
+STAGES = {
+    'fetch': '抓取一页（含等待和重试）',
+    'rate_limit': '限速等待',
+    'retry_sleep': '重试退避',
+    'connect': '建立连接（DNS+TCP）',
+    'tls': 'TLS 握手',
+    'server': '服务器响应（到响应头）',
+    'download': '下载正文',
+    'parse': '解析列表页',
+    'parse_detail': '解析详情页',
+    'write': '写出 JSONL/数据库/检查点',
+    'image_download': '海报下载（网络）',
+    'image_write': '海报写盘',
+    'save_json': '导出 JSON',
+    'save_csv': '导出 CSV',
+    'save_parquet': '导出 Parquet',
+}
+
+COUNTERS = {
+    'pages': '写出的列表页数',
+    'records': '写出的记录数',
+    'responses': '收到的 HTTP 响应数，按状态码',
+    'response_bytes': '列表页和详情页的正文字节数',
+    'request_errors': '连接错误、超时等请求异常次数',
+    'retries': '重试次数',
+    'fetch_failures': '重试后仍失败的抓取次数',
+    'connections': '新建的 HTTP 连接数',
+    'images': '海报数，按结果',
+    'image_bytes': '下载的海报字节数',
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        # 最后一个桶是 +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """按桶线性插值估计分位数（同 Prometheus 的 histogram_quantile），不超过实际最大值"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def cumulative(self):
+        """[(桶上界, 累计次数)]，最后一项为 ('+Inf', count)"""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class CrawlMetrics:
+    def __init__(self, spider, buckets=STAGE_BUCKETS):
+        """spider: 指标上的 spider 标签，区分同一台机器上的不同爬虫"""
+        self.spider = spider
+        self.buckets = buckets
+        self.stages = {}
+        # (计数器名, ((标签, 值), ...)) -> 数值
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.last_write = 0.0
+        # 当前线程本次请求中建连和 TLS 花的时间，用于从响应耗时中扣除
+        self._setup = threading.local()
+
+    # ---- 记录 ----
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        """记录 with 块的耗时，抛出异常时也记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage, func):
+        """返回记录每次调用耗时的 func 包装"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.time(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_setup(self, seconds):
+        self._setup.seconds = getattr(self._setup, 'seconds', 0.0) + seconds
+
+    def take_setup(self):
+        """取出并清零当前线程累计的建连时间"""
+        seconds = getattr(self._setup, 'seconds', 0.0)
+        self._setup.seconds = 0.0
+        return seconds
+
+    # ---- 查询 ----
+
+    def stage(self, stage):
+        """某阶段的直方图，没有记录过时返回空直方图"""
+        with self.lock:
+            return self.stages.get(stage) or Histogram(self.buckets)
+
+    def counter(self, name, **labels):
+        """计数器的值；不给标签时返回该计数器各标签值之和"""
+        with self.lock:
+            if labels:
+                return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+            return sum(value for (key, _), value in self.counters.items() if key == name)
+
+    def _ordered_stages(self):
+        return sorted(self.stages, key=lambda stage: (list(STAGES).index(stage) if stage in STAGES else len(STAGES),
+                                                      stage))
+
+    # ---- 导出 ----
+
+    def to_prometheus(self):
+        """Prometheus 文本格式"""
+        spider = (('spider', self.spider),)
+        lines = []
+        with self.lock:
+            lines.append('# HELP spider_stage_seconds 爬取各阶段耗时（秒）')
+            lines.append('# TYPE spider_stage_seconds histogram')
+            for stage in self._ordered_stages():
+                histogram = self.stages[stage]
+                labels = spider + (('stage', stage),)
+                for bound, total in histogram.cumulative():
+                    le = bound if bound == '+Inf' else _format_value(float(bound))
+                    lines.append(f'spider_stage_seconds_bucket{_format_labels(labels + (("le", le),))} {total}')
+                lines.append(f'spider_stage_seconds_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+                lines.append(f'spider_stage_seconds_count{_format_labels(labels)} {histogram.count}')
+
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                metric = f'spider_{name}_total'
+                lines.append(f'# HELP {metric} {COUNTERS.get(name, name)}')
+                lines.append(f'# TYPE {metric} counter')
+                for (key, labels), value in sorted(self.counters.items(), key=lambda item: str(item[0])):
+                    if key == name:
+                        lines.append(f'{metric}{_format_labels(spider + labels)} {_format_value(value)}')
+
+            lines.append('# HELP spider_start_time_seconds 本次运行的开始时间（Unix 时间戳）')
+            lines.append('# TYPE spider_start_time_seconds gauge')
+            lines.append(f'spider_start_time_seconds{_format_labels(spider)} {_format_value(self.started)}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path, min_interval=0):
+        """原子地写出 Prometheus 文本文件；距上次写出不到 min_interval 秒时跳过，返回是否写出"""
+        now = time.monotonic()
+        if min_interval and now - self.last_write < min_interval:
+            return False
+        self.last_write = now
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = path + '.part'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+        return True
+
+    def serve(self, port=0, host='127.0.0.1'):
+        """在后台线程中提供 http://host:port/metrics，返回 server（server.server_address 为实际地址）"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def report(self):
+        """打印本次运行的各阶段耗时和计数器"""
+        with self.lock:
+            stages = [(stage, self.stages[stage]) for stage in self._ordered_stages()]
+            counters = sorted(self.counters.items(), key=lambda item: str(item[0]))
+        print(f"\n=== 运行指标（{self.spider}，{time.time() - self.started:.1f} 秒）===")
+        if stages:
+            print(f"{'阶段':<16}{'次数':>8}{'总耗时 s':>11}{'平均 ms':>10}{'p50 ms':>10}{'p90 ms':>10}"
+                  f"{'p99 ms':>10}{'最大 ms':>10}")
+            for stage, histogram in stages:
+                mean = histogram.sum / histogram.count * 1000
+                print(f"{stage:<16}{histogram.count:>8}{histogram.sum:>11.2f}{mean:>10.2f}"
+                      f"{histogram.quantile(0.5) * 1000:>10.2f}{histogram.quantile(0.9) * 1000:>10.2f}"
+                      f"{histogram.quantile(0.99) * 1000:>10.2f}{histogram.max * 1000:>10.2f}")
+        for (name, labels), value in counters:
+            label_text = ', '.join(f'{key}={value}' for key, value in labels)
+            print(f"  {COUNTERS.get(name, name)}{f'（{label_text}）' if label_text else ''}: {value}")
+
+
+class _TimedConnection:
+    """记录新建连接的建连（DNS+TCP）和 TLS 握手耗时"""
+    metrics = None
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        self._connect_seconds = time.perf_counter() - start
+        self.metrics.observe('connect', self._connect_seconds)
+        return sock
+
+    def connect(self):
+        self._connect_seconds = 0.0
+        start = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - start
+        if isinstance(self, HTTPSConnection):
+            self.metrics.observe('tls', max(elapsed - self._connect_seconds, 0.0))
+        self.metrics.inc('connections')
+        self.metrics.add_setup(elapsed)
+
+
+def instrument_session(session, metrics):
+    """
+    让 session 上已挂载的适配器（含条件请求缓存、录制适配器）新建的连接记录建连和 TLS 耗时；
+    DNS 解析在 urllib3 的建连内部完成，计入 connect
+    """
+    http = type('TimedHTTPConnection', (_TimedConnection, HTTPConnection), {'metrics': metrics})
+    https = type('TimedHTTPSConnection', (_TimedConnection, HTTPSConnection), {'metrics': metrics})
+    pools = {
+        'http': type('TimedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http}),
+        'https': type('TimedHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https}),
+    }
+    for adapter in set(session.adapters.values()):
+        manager = getattr(adapter, 'poolmanager', None)
+        if manager is not None:
+            manager.pool_classes_by_scheme = pools
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟站点
+在 127.0.0.1 上起一个 HTTP 服务，按原站点的 URL 结构返回页面，爬虫改 base_url 即可完全离线运行：
+- /pinard、/pinard/default.html?page=N：博客园列表页（output/cnblogs.html），/pinard/p/...：博客详情页
+- /board/4?offset=K：猫眼榜单页（output/film.html），/mmdb/...：海报（film/ 目录）
+- /news/list_17_727_N.htm：合成的本地宝列表页，/news/....shtm：政策详情页
+每页的记录各不相同，超过 pages 的页为空页；可以配置延迟、随机错误和固定出错的路径，
+也可以优先返回响应存档（见 replay.py）中录制的页面。
+
+    with MockSite(pages=20, latency=0.01) as site:
+        spider.base_url = site.base_url('cnblogs')
+
+命令行：python -m spider_core.mocksite --pages 20 --port 8000
+"""
+
+import argparse
+import datetime
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from spider_core.replay import ResponseArchive
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_DIR = os.path.join(ROOT, 'output')
+POSTER_DIR = os.path.join(ROOT, 'film')
+
+HTML_TYPE = 'text/html; charset=utf-8'
+BENDIBAO_LIST = re.compile(r'/news/list_17_727_(\d+)\.htm')
+MAOYAN_NAME = re.compile(r'(<p class="name"><a [^>]*>)([^<]+)(</a>)')
+
+CNBLOGS_DETAIL = ('<html><body><h1 class="postTitle">{path}</h1>'
+                  '<span id="post-date" data-date-updated="2019-07-02 10:11">2019-07-01 18:10</span>'
+                  '<div id="cnblogs_post_body"><p>正文 {path}</p></div></body></html>')
+BENDIBAO_DETAIL = ('<html><body><h1>{path}</h1><div class="time">{date} 10:00</div>'
+                   '<div id="bo"><p>正文 {path}</p></div></body></html>')
+BENDIBAO_ITEM = ('<li><a href="/news/{page}-{index}.shtm">第{page}页政策{index}</a>'
+                 '<p>第{page}页政策{index}的摘要</p><span class="time">{date}</span></li>')
+EMPTY_PAGE = '<html><head><meta charset="utf-8"></head><body></body></html>'
+
+
+def _read_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def publish_date(number):
+    """第 number 篇合成文章的发布日期，越往后越早"""
+    return (datetime.date(2025, 6, 30) - datetime.timedelta(days=number // 5)).isoformat()
+
+
+def render_bendibao_list(page, pages, items_per_page=20):
+    """合成的本地宝列表页：pages 页中的第 page 页，每页 items_per_page 篇文章，带页码和末页链接"""
+    items = ''
+    if page <= pages:
+        first = (page - 1) * items_per_page
+        items = ''.join(BENDIBAO_ITEM.format(page=page, index=i, date=publish_date(first + i))
+                        for i in range(items_per_page))
+    links = ''.join(f'<a href="list_17_727_{n}.htm">{n}</a>' for n in range(1, min(pages, 10) + 1))
+    if page < pages:
+        links += f'<a href="list_17_727_{page + 1}.htm">下一页</a>'
+    links += f'<a href="list_17_727_{pages}.htm">末页</a>'
+    return ('<html><head><meta charset="utf-8"><title>上海本地宝</title></head><body>'
+            f'<div class="list-article"><ul>{items}</ul></div><div class="page">{links}</div></body></html>')
+
+
+class MockSite:
+    def __init__(self, pages=5, latency=0, error_rate=0.0, errors=None, items_per_page=20,
+                 archive=None, seed=0, port=0, missing_status=None):
+        """
+        pages: 每个站点的列表页数，之后的页为空页
+        latency: 每个请求的延迟（秒），也可以是 (最小, 最大) 区间
+        error_rate: 随机返回 503 的概率
+        errors: {路径: 状态码}，如 {'/pinard/default.html?page=3': 500}，这些路径固定返回该状态码
+        items_per_page: 合成的本地宝列表页每页文章数
+        archive: 响应存档目录，存档中有的路径优先返回录制的内容
+        missing_status: 超过 pages 的列表页返回该状态码（如 404），默认返回 200 的空页
+        """
+        self.pages = pages
+        self.latency = latency
+        self.error_rate = error_rate
+        self.errors = dict(errors or {})
+        self.items_per_page = items_per_page
+        self.missing_status = missing_status
+        self.random = random.Random(seed)
+        self.archive = ResponseArchive(archive) if archive else None
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), type('Handler', (_Handler,), {'site': self}))
+        self.server.daemon_threads = True
+        self.thread = None
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.lock = threading.Lock()
+        # 每个路径的请求次数
+        self.requests = Counter()
+        self.failures = 0
+
+        self.cnblogs_html = _read_fixture('cnblogs.html').replace('https://www.cnblogs.com', self.url)
+        self.maoyan_html = _read_fixture('film.html').replace('https://p0.pipi.cn/mmdb/', self.url + '/mmdb/')
+        self.archived = {}
+        if self.archive:
+            origins = {'{0.scheme}://{0.netloc}'.format(urlsplit(entry['url'])) for entry in self.archive}
+            for entry in self.archive:
+                parts = urlsplit(entry['url'])
+                self.archived[parts.path + ('?' + parts.query if parts.query else '')] = (entry, origins)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.archive:
+            self.archive.close()
+
+    def base_url(self, site):
+        """各爬虫的 base_url：'cnblogs'、'maoyan' 或 'bendibao'"""
+        return {
+            'cnblogs': f'{self.url}/pinard',
+            'maoyan': f'{self.url}/board/4',
+            'bendibao': f'{self.url}/news/list_17_727_{{}}.htm',
+        }[site]
+
+    @property
+    def request_count(self):
+        return sum(self.requests.values())
+
+    # ---- 请求处理 ----
+
+    def respond(self, target):
+        """返回 (状态码, Content-Type, 正文字节)"""
+        with self.lock:
+            self.requests[target] += 1
+            delay = self.random.uniform(*self.latency) if isinstance(self.latency, tuple) else self.latency
+            failed = self.error_rate and self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if target in self.errors:
+            return self._fail(self.errors[target])
+        if failed:
+            return self._fail(503)
+
+        if target in self.archived:
+            return self._archived(*self.archived[target])
+
+        parts = urlsplit(target)
+        path = parts.path
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        if path in ('/pinard', '/pinard/', '/pinard/default.html'):
+            page = int(query.get('page', 1))
+            return self._list_page(page > self.pages, self.cnblogs_page, page)
+        if path.startswith('/pinard/p/'):
+            return 200, HTML_TYPE, CNBLOGS_DETAIL.format(path=path).encode('utf-8')
+        if path == '/board/4':
+            offset = int(query.get('offset', 0))
+            return self._list_page(offset // 10 >= self.pages, self.maoyan_page, offset)
+        if path.startswith('/mmdb/'):
+            return 200, 'image/jpeg', self.poster(os.path.basename(path))
+        match = BENDIBAO_LIST.fullmatch(path)
+        if match:
+            page = int(match.group(1))
+            return self._list_page(page > self.pages, self.bendibao_page, page)
+        if path.startswith('/news/') and path.endswith('.shtm'):
+            return 200, HTML_TYPE, BENDIBAO_DETAIL.format(path=path, date=publish_date(0)).encode('utf-8')
+        return 404, HTML_TYPE, b'not found'
+
+    def _list_page(self, beyond_last, render, key):
+        if beyond_last and self.missing_status:
+            return self.missing_status, HTML_TYPE, b'not found'
+        return 200, HTML_TYPE, render(key).encode('utf-8')
+
+    def _fail(self, status):
+        with self.lock:
+            self.failures += 1
+        return status, HTML_TYPE, b'error'
+
+    def _archived(self, entry, origins):
+        body = self.archive.read_body(entry)
+        content_type = entry['headers'].get('Content-Type', HTML_TYPE)
+        if content_type.startswith('text/'):
+            # 录制页面中原站点的绝对链接改为指向本地
+            text = body.decode('utf-8', errors='replace')
+            for origin in origins:
+                text = text.replace(origin, self.url)
+            body = text.encode('utf-8')
+        return entry['status'], content_type, body
+
+    # ---- 页面生成 ----
+
+    def cnblogs_page(self, page):
+        if page > self.pages:
+            return EMPTY_PAGE
+        if page == 1:
+            return self.cnblogs_html
+        return self.cnblogs_html.replace(f'{self.url}/pinard/p/', f'{self.url}/pinard/p/{page}-')
+
+    def maoyan_page(self, offset):
+        index = offset // 10
+        if index >= self.pages:
+            return EMPTY_PAGE
+        if index == 0:
+            return self.maoyan_html
+        return MAOYAN_NAME.sub(lambda m: f'{m.group(1)}{m.group(2)} {index + 1}{m.group(3)}', self.maoyan_html)
+
+    def poster(self, name):
+        path = os.path.join(POSTER_DIR, name)
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                return f.read()
+        return hashlib.sha1(name.encode('utf-8')).digest() * 64
+
+    def bendibao_page(self, page):
+        return render_bendibao_list(page, self.pages, self.items_per_page)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 响应头和正文分两次写出，不关 Nagle 时每个请求会多等约 40ms 的延迟确认
+    disable_nagle_algorithm = True
+    site = None
+
+    def do_GET(self):
+        status, content_type, body = self.site.respond(self.path)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动本地模拟站点，供爬虫离线运行")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--pages', type=int, default=5, help="每个站点的列表页数")
+    parser.add_argument('--latency', type=float, default=0, help="每个请求的延迟（秒）")
+    parser.add_argument('--error-rate', type=float, default=0, help="随机返回 503 的概率")
+    parser.add_argument('--archive', help="优先返回该响应存档中录制的页面")
+    args = parser.parse_args()
+
+    site = MockSite(pages=args.pages, latency=args.latency, error_rate=args.error_rate,
+                    archive=args.archive, port=args.port)
+    print(f"模拟站点已启动：{site.url}")
+    for name in ('cnblogs', 'maoyan', 'bendibao'):
+        print(f"  {name}: --base-url {site.base_url(name)}")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+已解析页面与单次爬取内的页面备忘录
+同一个 URL 在一次爬取中只抓取一次、只构建一次文档树，
+例如第一页既用于检测总页数又用于提取文章；
+页面用完后调用 discard 移除，备忘录只保留还没用完的页，内存不随页数增长
+"""
+
+import threading
+
+from .parsers import DEFAULT_BACKEND, make_soup
+
+
+class ParsedPage:
+    """一次抓取得到的页面，文档树在第一次使用时构建并缓存"""
+
+    def __init__(self, url, html, backend=DEFAULT_BACKEND):
+        self.url = url
+        self.html = html
+        self.backend = backend
+        self._soup = None
+
+    def __bool__(self):
+        return bool(self.html)
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = make_soup(self.html, self.backend)
+        return self._soup
+
+
+def as_page(html_content, backend=DEFAULT_BACKEND):
+    """兼容旧调用：传入 HTML 字符串时包装成 ParsedPage"""
+    if isinstance(html_content, ParsedPage):
+        return html_content
+    return ParsedPage(None, html_content, backend)
+
+
+class PageMemo:
+    def __init__(self, backend=DEFAULT_BACKEND):
+        self.backend = backend
+        self.pages = {}
+        self.lock = threading.Lock()
+        self.url_locks = {}
+        self.fetches = 0
+        self.hits = 0
+
+    def get(self, url, fetch_func):
+        """返回 url 对应的 ParsedPage，第一次访问时调用 fetch_func() 抓取"""
+        with self.lock:
+            url_lock = self.url_locks.setdefault(url, threading.Lock())
+        # 同一 URL 的并发请求排队等待第一次抓取的结果
+        with url_lock:
+            if url in self.pages:
+                with self.lock:
+                    self.hits += 1
+                return self.pages[url]
+            page = ParsedPage(url, fetch_func(), self.backend)
+            with self.lock:
+                self.fetches += 1
+                self.pages[url] = page
+            return page
+
+    def discard(self, url):
+        """移除已经用完的页面，之后再访问会重新抓取"""
+        with self.lock:
+            self.pages.pop(url, None)
+            self.url_locks.pop(url, None)
+
+    def clear(self):
+        with self.lock:
+            self.pages.clear()
+            self.url_locks.clear()
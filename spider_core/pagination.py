@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+自动发现分页
+三种分页方式：页码模板、offset、跟随"下一页"链接；
+逐页抓取直到页面为空或与之前的页重复，不再需要写死总页数。
+解析第 N 页的同时在后台预取后面的页：页码和 offset 分页可以同时预取多页，
+跟随链接分页要先拿到当前页才知道下一页，只能预取一页
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from bs4 import SoupStrainer
+
+from spider_core.parsers import make_soup
+
+# 停止原因
+EMPTY = 'empty'
+REPEATED = 'repeated'
+FAILED = 'failed'
+LAST = 'last'
+LIMIT = 'limit'
+
+
+class _EndOfList:
+    """取页函数的特殊返回值：页面不存在（如 404/410），表示已经翻过末页而不是抓取失败"""
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'END_OF_LIST'
+
+
+END_OF_LIST = _EndOfList()
+
+
+class PageNumberPagination:
+    """页码分页：url_func(页码) 生成 URL"""
+    # 下一页不依赖页面内容，可以提前预取多页
+    predictable = True
+
+    def __init__(self, url_func, start=1, max_pages=None):
+        self.url_func = url_func
+        self.start = start
+        self.max_pages = max_pages
+
+    def first(self):
+        return self.start
+
+    def url(self, key):
+        return self.url_func(key)
+
+    def next_key(self, key, content):
+        return key + 1
+
+    def within_limit(self, key):
+        return self.max_pages is None or key < self.start + self.max_pages
+
+
+class OffsetPagination(PageNumberPagination):
+    """offset 分页：每页 step 条，url_func(offset) 生成 URL"""
+
+    def __init__(self, url_func, start=0, step=10, max_pages=None):
+        super().__init__(url_func, start, max_pages)
+        self.step = step
+
+    def next_key(self, key, content):
+        return key + self.step
+
+    def within_limit(self, key):
+        return self.max_pages is None or key < self.start + self.max_pages * self.step
+
+
+class NextLinkPagination:
+    """跟随"下一页"链接分页，页面的 key 就是 URL"""
+    predictable = False
+
+    def __init__(self, start_url, link_texts=('下一页',), max_pages=None):
+        self.start_url = start_url
+        self.link_texts = link_texts
+        self.max_pages = max_pages
+        self.visited = 0
+
+    def first(self):
+        return self.start_url
+
+    def url(self, key):
+        return key
+
+    def next_key(self, key, content):
+        self.visited += 1
+        return find_next_link(content, key, self.link_texts)
+
+    def within_limit(self, key):
+        return self.max_pages is None or self.visited < self.max_pages
+
+
+def find_next_link(html_content, base_url, link_texts=('下一页',)):
+    """找到文字包含 link_texts 之一的链接，返回绝对 URL，没有时返回 None"""
+    soup = make_soup(html_content, parse_only=SoupStrainer('a'))
+    for link in soup.find_all('a', href=True):
+        text = link.get_text().strip()
+        if any(link_text in text for link_text in link_texts):
+            return urljoin(base_url, link['href'])
+    return None
+
+
+class PageWalker:
+    """
+    按分页方式逐页抓取，依次产出 (key, next_key, records)；
+    fetch_func(key) 返回页面内容，失败时返回 None，页面不存在时返回 END_OF_LIST；
+    parse_func(key, content) 返回记录列表；
+    record_key(record) 用于判断页面是否与之前的页重复；
+    prefetch 为解析当前页时最多预取的后续页数，即同时在途的请求数上限，
+    请求之间的间隔仍由 fetch_func 内的限速器控制；
+    skip_failed 为最多连续跳过的抓取失败页数，超过时停在 FAILED，
+    只对页码和 offset 分页有效（跟随链接分页拿不到失败页的下一页）。
+    遍历结束后 stop_reason 记录停止原因，skipped 为跳过的页
+    """
+
+    def __init__(self, pagination, fetch_func, parse_func, record_key=repr, prefetch=1, skip_failed=0):
+        self.pagination = pagination
+        self.fetch_func = fetch_func
+        self.parse_func = parse_func
+        self.record_key = record_key
+        self.predictable = getattr(pagination, 'predictable', False)
+        self.prefetch = max(1, prefetch) if self.predictable else 1
+        self.skip_failed = skip_failed if self.predictable else 0
+        self.skipped = []
+        self.stop_reason = None
+        self.stop_key = None
+        self.fetches = 0
+
+    def _submit(self, executor, key):
+        self.fetches += 1
+        return executor.submit(self.fetch_func, key)
+
+    def _stop(self, reason, key):
+        self.stop_reason = reason
+        self.stop_key = key
+
+    def _fill(self, executor, ahead, key, next_key):
+        """把预取队列补到 prefetch 页；ahead 中为按顺序排好的 (key, future)"""
+        if not self.predictable:
+            if next_key is not None and self.pagination.within_limit(next_key):
+                ahead.append((next_key, self._submit(executor, next_key)))
+            return
+        last = ahead[-1][0] if ahead else key
+        while len(ahead) < self.prefetch:
+            last = self.pagination.next_key(last, None)
+            if not self.pagination.within_limit(last):
+                return
+            ahead.append((last, self._submit(executor, last)))
+
+    def __iter__(self):
+        seen = set()
+        key = self.pagination.first()
+        ahead = deque()
+        # 连续抓取失败的页数
+        failures = 0
+        with ThreadPoolExecutor(max_workers=self.prefetch) as executor:
+            future = self._submit(executor, key)
+            try:
+                while True:
+                    content = future.result()
+                    if content is END_OF_LIST:
+                        self._stop(LAST, key)
+                        return
+                    if not content:
+                        if failures == self.skip_failed:
+                            self._stop(FAILED, key)
+                            return
+                        failures += 1
+                        self.skipped.append(key)
+                        next_key = self.pagination.next_key(key, None)
+                        self._fill(executor, ahead, key, next_key)
+                        if not ahead:
+                            self._stop(LIMIT, next_key)
+                            return
+                        key, future = ahead.popleft()
+                        continue
+                    failures = 0
+
+                    # 先确定下一页并开始预取，再解析当前页
+                    next_key = self.pagination.next_key(key, content)
+                    self._fill(executor, ahead, key, next_key)
+
+                    records = self.parse_func(key, content)
+                    fingerprint = tuple(self.record_key(record) for record in records)
+                    if not records or fingerprint in seen:
+                        self._stop(EMPTY if not records else REPEATED, key)
+                        return
+                    seen.add(fingerprint)
+
+                    yield key, next_key, records
+
+                    if not ahead:
+                        self._stop(LAST if next_key is None else LIMIT, next_key)
+                        return
+                    key, future = ahead.popleft()
+            finally:
+                # 末页之后的预取结果不再需要，还没开始的请求直接取消
+                for _, pending in ahead:
+                    pending.cancel()
+
+    def report(self):
+        reasons = {
+            EMPTY: "遇到空页",
+            REPEATED: "遇到重复页",
+            FAILED: "页面抓取失败",
+            LAST: "没有下一页",
+            LIMIT: "达到页数上限",
+        }
+        print(f"分页结束：{reasons.get(self.stop_reason, self.stop_reason)}（{self.stop_key}），共请求 {self.fetches} 页")
+        if self.skipped:
+            print(f"抓取失败跳过 {len(self.skipped)} 页: {', '.join(map(str, self.skipped))}")
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+可切换的 HTML 解析后端
+- html.parser: BeautifulSoup 自带的纯 Python 解析器，最慢
+- lxml: BeautifulSoup + lxml，接口不变，默认使用
+- lxml-xpath: 直接用 lxml.html + XPath，供热点提取函数走快速路径
+  （猫眼 parse_movie_info 和博客园 parse_blog_list）；本地宝两个爬虫没有 XPath 路径，
+  选 lxml-xpath 时仍用 BeautifulSoup + lxml 解析
+
+通过环境变量 SPIDER_PARSER_BACKEND 或爬虫的 parser_backend 属性切换
+"""
+
+import os
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+HTML_PARSER = 'html.parser'
+LXML = 'lxml'
+LXML_XPATH = 'lxml-xpath'
+BACKENDS = (HTML_PARSER, LXML, LXML_XPATH)
+
+# get_text() 不返回这些标签里的文字，XPath 路径保持一致
+_TEXT_XPATH = './/text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]'
+
+
+def resolve_backend(backend=None):
+    """确定实际使用的解析后端，未安装 lxml 时退回 html.parser"""
+    backend = backend or os.environ.get('SPIDER_PARSER_BACKEND') or (LXML if HAS_LXML else HTML_PARSER)
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的解析后端: {backend}，可选: {', '.join(BACKENDS)}")
+    if backend != HTML_PARSER and not HAS_LXML:
+        print(f"未安装 lxml，解析后端 {backend} 退回 {HTML_PARSER}")
+        return HTML_PARSER
+    return backend
+
+
+DEFAULT_BACKEND = resolve_backend()
+
+
+def make_soup(html_content, backend=DEFAULT_BACKEND, parse_only=None):
+    """
+    按后端构建 BeautifulSoup，lxml-xpath 在这里也使用 lxml；
+    parse_only 传入 SoupStrainer 时只构建需要的子树
+    """
+    return BeautifulSoup(html_content, HTML_PARSER if backend == HTML_PARSER else LXML, parse_only=parse_only)
+
+
+def make_tree(html_content):
+    """构建 lxml.html 文档树"""
+    return lxml.html.fromstring(html_content)
+
+
+def class_xpath(tag, class_name):
+    """与 find(tag, class_=class_name) 等价的 XPath 片段"""
+    return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+
+def first(node, xpath):
+    """返回 XPath 的第一个结果，没有时返回 None"""
+    found = node.xpath(xpath)
+    return found[0] if found else None
+
+
+def node_text(node, strip=False):
+    """与 get_text() / get_text(strip=True) 等价的文字提取"""
+    pieces = node.xpath(_TEXT_XPATH)
+    if strip:
+        return ''.join(piece.strip() for piece in pieces)
+    return ''.join(pieces)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+按域名的令牌桶限速器
+替代各爬虫里写死的 time.sleep，请求本身耗费的网络时间也计入配额
+"""
+
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1, clock=time.monotonic):
+        # 每秒补充的令牌数，以及桶容量（允许的突发请求数）；clock 可替换，便于测试
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """预订一个令牌，返回需要等待的秒数"""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # 令牌可以透支，后来的请求按顺序排在后面
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class RateLimiter:
+    def __init__(self, rate=None, burst=1, host_limits=None):
+        """
+        rate/burst 为未单独配置的域名的默认限速，rate 为 None 表示不限速；
+        host_limits 形如 {'www.cnblogs.com': (0.5, 1)}，值为 None 表示该域名不限速
+        """
+        self.default_limit = (rate, burst) if rate else None
+        self.host_limits = dict(host_limits or {})
+        self.buckets = {}
+        self.lock = threading.Lock()
+        # 累计等待时间，便于在爬取结束时查看限速开销
+        self.total_wait = 0.0
+
+    def set_limit(self, host, rate, burst=1):
+        """设置单个域名的限速，rate 为 None 表示不限速"""
+        with self.lock:
+            self.host_limits[host] = (rate, burst) if rate else None
+            self.buckets.pop(host, None)
+
+    def _bucket(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                limit = self.host_limits.get(host, self.default_limit)
+                self.buckets[host] = TokenBucket(*limit) if limit else None
+            return self.buckets[host]
+
+    def wait(self, url):
+        """在请求 url 之前调用，必要时阻塞到该域名有可用令牌"""
+        bucket = self._bucket(urlparse(url).netloc)
+        if bucket is None:
+            return 0.0
+        delay = bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+            with self.lock:
+                self.total_wait += delay
+        return delay
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+响应录制与回放
+录制模式下照常请求，同时把每个响应（状态码、响应头、正文）存进本地存档；
+回放模式下完全不访问网络，直接用存档构造响应，存档中没有的 URL 返回 404。
+存档目录：index.jsonl 每行一条记录（同一 URL 以最后一条为准），正文按 sha1 存在 bodies/ 下
+"""
+
+import hashlib
+import io
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from spider_core.frontier import canonicalize_url
+from spider_core.sinks import JsonlSink, iter_jsonl
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+# 正文按解码后的内容保存，这些响应头回放时不再成立
+_DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection'}
+
+
+class ResponseArchive:
+    def __init__(self, root):
+        self.root = root
+        self.bodies_dir = os.path.join(root, 'bodies')
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self.index_path = os.path.join(root, 'index.jsonl')
+        self.lock = threading.Lock()
+        # 规范化 URL -> {url, status, headers, body}
+        self.entries = {}
+        if os.path.exists(self.index_path):
+            for entry in iter_jsonl(self.index_path):
+                self.entries[canonicalize_url(entry['url'])] = entry
+        self.index = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, url):
+        """返回 (entry, 正文)，没有录制过时返回 None"""
+        entry = self.entries.get(canonicalize_url(url))
+        if entry is None:
+            return None
+        return entry, self.read_body(entry)
+
+    def read_body(self, entry):
+        with open(os.path.join(self.bodies_dir, entry['body']), 'rb') as f:
+            return f.read()
+
+    def put(self, url, status, headers, body):
+        digest = hashlib.sha1(body).hexdigest()
+        path = os.path.join(self.bodies_dir, digest)
+        entry = {
+            'url': url,
+            'status': status,
+            'headers': {key: value for key, value in headers.items() if key.lower() not in _DROPPED_HEADERS},
+            'body': digest,
+        }
+        with self.lock:
+            if not os.path.exists(path):
+                temp_path = path + '.part'
+                with open(temp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(temp_path, path)
+            if self.index is None:
+                self.index = JsonlSink(self.index_path, append=True)
+            # 每条记录立即 flush，录制中途中断也不会丢失已保存的响应
+            self.index.write_many([entry])
+            self.entries[canonicalize_url(url)] = entry
+
+    def close(self):
+        with self.lock:
+            if self.index is not None:
+                self.index.close()
+                self.index = None
+
+    def report(self):
+        print(f"响应存档 {self.root}：{len(self.entries)} 个 URL")
+
+
+def build_response(request, entry, body):
+    """用存档内容构造 requests.Response"""
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.reason = 'OK' if entry['status'] == 200 else ''
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.raw = io.BytesIO(body)
+    response._content = body
+    response._content_consumed = True
+    return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    def __init__(self, archive, mode=REPLAY, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    def send(self, request, stream=False, **kwargs):
+        if self.mode == REPLAY:
+            found = self.archive.get(request.url)
+            if found is None:
+                self.misses += 1
+                return build_response(request, {'status': 404, 'headers': {}}, b'')
+            self.hits += 1
+            return build_response(request, *found)
+
+        response = super().send(request, stream=stream, **kwargs)
+        # 流式下载（图片）也先完整读入，之后 iter_content 从内存中分块返回
+        self.archive.put(request.url, response.status_code, response.headers, response.content)
+        self.recorded += 1
+        return response
+
+    def report(self):
+        if self.mode == REPLAY:
+            print(f"回放：命中存档 {self.hits} 次，存档中没有 {self.misses} 次")
+        else:
+            print(f"录制：保存 {self.recorded} 个响应到 {self.archive.root}")
+
+
+def install_replay(session, root, mode=REPLAY):
+    """在 session 上挂载录制/回放适配器（替换原有的适配器，如条件请求缓存），返回该适配器"""
+    adapter = ReplayAdapter(ResponseArchive(root), mode)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return adapter
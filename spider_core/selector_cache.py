@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+学习型选择器缓存
+记住每个站点、每种页面模板上命中的列表选择器，并在多次运行之间保存；
+之后的页面先试已知的选择器，失效时才回到完整的级联查找
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+
+def template_fingerprint(soup, limit=200):
+    """
+    页面模板指纹：带 class 的 div/ul 的 "标签.类名" 集合的摘要，
+    只与页面骨架有关，与文章内容无关
+    """
+    shapes = set()
+    for tag in soup.find_all(['div', 'ul'], class_=True, limit=limit):
+        shapes.add(tag.name + '.' + '.'.join(sorted(tag.get('class'))))
+    return hashlib.sha1('|'.join(sorted(shapes)).encode('utf-8')).hexdigest()[:12]
+
+
+class SelectorCache:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.choices = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.choices = json.load(f)
+        self.hits = 0
+        self.stale = 0
+        self.searches = 0
+
+    @staticmethod
+    def key(site, fingerprint):
+        return f"{site}|{fingerprint}"
+
+    def get(self, key):
+        """返回已知命中的选择器，没有时返回 None"""
+        return self.choices.get(key)
+
+    def record_hit(self):
+        with self.lock:
+            self.hits += 1
+
+    def record_stale(self, key):
+        """已知选择器不再匹配，丢弃它"""
+        with self.lock:
+            self.stale += 1
+            self.choices.pop(key, None)
+
+    def learn(self, key, selector):
+        """完整查找后记住命中的选择器"""
+        with self.lock:
+            self.searches += 1
+            if selector:
+                self.choices[key] = selector
+
+    def save(self):
+        temp_path = self.path + '.part'
+        with self.lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.choices, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def report(self):
+        """打印命中统计"""
+        total = self.hits + self.searches
+        rate = self.hits / total * 100 if total else 0
+        print(f"选择器缓存: 命中 {self.hits} 次，失效 {self.stale} 次，"
+              f"完整查找 {self.searches} 次，命中率 {rate:.1f}%")
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+流式数据输出
+每解析完一页就把记录追加到紧凑的 JSONL 文件，定期 flush/fsync，
+爬虫中途崩溃也不会丢失已解析的数据；结束后再从 JSONL 流式生成
+原来格式的 JSON（indent=2）和 CSV 文件
+"""
+
+import csv
+import json
+import os
+import time
+
+
+class JsonlSink:
+    def __init__(self, path, append=False, fsync_interval=5.0):
+        """
+        path: JSONL 文件路径
+        append: True 时在已有文件末尾追加，否则清空重写
+        fsync_interval: 两次 fsync 之间的最长间隔（秒），None 表示只在关闭时 fsync
+        """
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self.count = 0
+        self.last_fsync = time.monotonic()
+
+    @classmethod
+    def resume(cls, path, offset, count, **kwargs):
+        """
+        从检查点继续写：截掉 offset 之后上次未记入检查点的内容，再追加；
+        count 为检查点之前已写入的记录数
+        """
+        if os.path.exists(path):
+            os.truncate(path, offset)
+        sink = cls(path, append=True, **kwargs)
+        sink.count = count
+        return sink
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def offset(self):
+        """当前写入位置（字节），可记录在断点文件中"""
+        return self.file.tell()
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self.file.write('\n')
+        self.count += 1
+
+    def write_many(self, records):
+        """追加一批记录（通常是一页）并 flush，按间隔 fsync"""
+        for record in records:
+            self.write(record)
+        self.flush()
+
+    def flush(self, fsync=False):
+        self.file.flush()
+        now = time.monotonic()
+        if fsync or (self.fsync_interval is not None and now - self.last_fsync >= self.fsync_interval):
+            os.fsync(self.file.fileno())
+            self.last_fsync = now
+
+    def close(self):
+        if not self.file.closed:
+            self.flush(fsync=True)
+            self.file.close()
+
+
+def iter_jsonl(path):
+    """逐条读取 JSONL 记录，跳过崩溃时可能写了一半的最后一行"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def replace_jsonl(records, path):
+    """用 records 原子地整体替换 JSONL 文件，返回记录数"""
+    temp_path = path + '.part'
+    with JsonlSink(temp_path) as sink:
+        sink.write_many(records)
+    os.replace(temp_path, path)
+    return sink.count
+
+
+def write_pretty_json(records, path):
+    """流式写出与 json.dump(list, indent=2, ensure_ascii=False) 完全相同的文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        first = True
+        for record in records:
+            text = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            f.write(('[\n  ' if first else ',\n  ') + text)
+            first = False
+        f.write('[]' if first else '\n]')
+
+
+def write_csv(records, path, header, row_func=None):
+    """
+    流式写出 CSV，header 为表头；
+    row_func 为 None 时按 header 作为字段名写字典（记录中多出的字段不写），否则用 row_func(record) 生成一行
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if row_func is None:
+            writer = csv.DictWriter(f, fieldnames=header, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for record in records:
+                writer.writerow(row_func(record))
+
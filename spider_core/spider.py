@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+爬虫公共运行时
+子类只需声明列表页 URL（page_url）、分页方式（make_pagination）和解析回调（parse），
+抓取、重试、限速、逐页预取、断点续爬、JSONL/SQLite/Parquet 输出都由 BaseSpider 完成，
+各阶段的耗时和计数记录在 spider.metrics 中（见 metrics.py）
+"""
+
+import contextlib
+import os
+import time
+
+import requests
+
+from spider_core.checkpoint import Checkpoint
+from spider_core.columnar import HAS_PYARROW, export_parquet
+from spider_core.details import DetailStage
+from spider_core.httpcache import install_cache
+from spider_core.metrics import CrawlMetrics, instrument_session
+from spider_core.pagination import END_OF_LIST, FAILED, PageNumberPagination, PageWalker
+from spider_core.parsers import DEFAULT_BACKEND
+from spider_core.ratelimit import RateLimiter
+from spider_core.replay import RECORD, REPLAY, install_replay
+from spider_core.sinks import JsonlSink, iter_jsonl, replace_jsonl, write_csv, write_pretty_json
+from spider_core.storage import SQLiteSink
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+
+# 这些状态码认为是暂时性错误，退避后重试
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 列表页返回这些状态码时认为已经翻过末页
+GONE_STATUS = {404, 410}
+
+
+def add_offline_arguments(parser):
+    """命令行参数：录制/回放响应存档，以及把列表页地址指向本地模拟站点"""
+    parser.add_argument('--base-url', help="覆盖列表页地址，如指向 spider_core.mocksite 启动的本地站点")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', metavar='DIR', help="把收到的响应录制到存档目录")
+    group.add_argument('--replay', metavar='DIR', help="只用存档目录中的响应，不访问网络")
+
+
+def apply_offline_arguments(spider, args):
+    if args.base_url:
+        spider.base_url = args.base_url
+    if args.record:
+        spider.use_archive(args.record, RECORD)
+    elif args.replay:
+        spider.use_archive(args.replay, REPLAY)
+
+
+def add_metrics_arguments(parser):
+    """命令行参数：运行指标导出为 Prometheus 文本文件或 HTTP 端点"""
+    parser.add_argument('--metrics', metavar='FILE', help="把运行指标以 Prometheus 文本格式写入该文件（运行中定期更新）")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT', help="在本地端口上提供 /metrics")
+
+
+def apply_metrics_arguments(spider, args):
+    if args.metrics:
+        spider.metrics_path = args.metrics
+    if args.metrics_port is not None:
+        server = spider.metrics.serve(args.metrics_port)
+        print(f"运行指标: http://127.0.0.1:{server.server_address[1]}/metrics")
+
+
+def records_alias():
+    """各爬虫原有的记录列表名（blog_data、all_data 等）指向 records"""
+    return property(lambda self: self.records, lambda self, value: setattr(self, 'records', value))
+
+
+class BaseSpider:
+    # 请求头、默认限速（每秒请求数）和按域名的限速
+    headers = {'User-Agent': USER_AGENT}
+    rate = 1.0
+    host_limits = None
+    timeout = 10
+    encoding = 'utf-8'
+    # 暂时性错误的重试次数，第 n 次重试前等待 retry_backoff * 2**n 秒
+    retries = 2
+    retry_backoff = 1.0
+    # 分页从哪一页（或 offset）开始
+    first_page = 1
+    # 记录的自然键：SQLite 主键，也用于判断两页是否重复
+    key_fields = ('url',)
+    # SQLite 表结构，db_table 为 None 时不写数据库
+    db_table = None
+    db_columns = ()
+    db_indexes = ()
+    # Parquet 列类型，为 None 时不导出
+    parquet_fields = None
+    # 列表页抓取失败时最多连续跳过的页数，0 表示停下（有检查点时可以 --resume 重抓）
+    skip_failed_pages = 0
+    # 详情页签名字段，为 None 时不抓取详情页
+    detail_signature_fields = None
+    # 进度信息里的量词，如"篇博客"
+    item_name = '条记录'
+    # 运行指标上的 spider 标签，默认用类名
+    name = None
+
+    def __init__(self, cache_dir="http_cache"):
+        """cache_dir: 列表页条件请求缓存目录，None 表示不缓存"""
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.rate_limiter = RateLimiter(rate=self.rate, burst=1, host_limits=self.host_limits)
+        # HTML 解析后端：html.parser / lxml / lxml-xpath
+        self.parser_backend = DEFAULT_BACKEND
+        self.http_cache = install_cache(self.session, cache_dir) if cache_dir else None
+        # 各阶段耗时直方图和计数器；metrics_path 不为 None 时运行中定期写出 Prometheus 文本文件
+        self.metrics = CrawlMetrics(self.name or type(self).__name__)
+        self.metrics_path = None
+        self.metrics_interval = 10
+        instrument_session(self.session, self.metrics)
+        # 录制/回放适配器，见 use_archive
+        self.replay = None
+        # 子类设置输出路径；checkpoint_path 为 None 时不支持断点续爬
+        self.jsonl_path = None
+        self.checkpoint_path = None
+        # 本次 crawl_pages 的检查点，process_pages 可以把续爬时要恢复的状态放进 checkpoint.state
+        self.checkpoint = None
+        self.db_path = None
+        self.parquet_dir = None
+        # 每解析完一页就追加到 JSONL；keep_in_memory 为 False 时不在内存中保留全部记录
+        self.keep_in_memory = True
+        # 详情页 URL 的调度队列，子类需要抓取详情页时设置
+        self.frontier = None
+        self.detail_workers = 4
+        # 解析当前列表页时最多预取的后续页数（同时在途的列表页请求数），间隔仍受限速器约束
+        self.list_prefetch = 4
+        self.records = []
+
+    # ---- 子类声明的部分 ----
+
+    def page_url(self, key):
+        """列表页 URL，默认用 base_url 模板"""
+        return self.base_url.format(key)
+
+    def make_pagination(self, start, max_pages):
+        """分页方式，默认按页码"""
+        return PageNumberPagination(self.page_url, start=start, max_pages=max_pages)
+
+    def parse(self, key, content):
+        """解析一页，返回记录列表"""
+        raise NotImplementedError
+
+    def process_pages(self, pages):
+        """在写出之前处理逐页产出的 (key, next_key, records)，如去重、提交下载；默认原样产出"""
+        return pages
+
+    def page_label(self, key):
+        return f"第 {key} 页"
+
+    def extract_detail(self, html_content):
+        """从详情页提取要合并进列表记录的字段"""
+        raise NotImplementedError
+
+    # ---- 抓取 ----
+
+    def use_archive(self, root, mode=REPLAY):
+        """录制所有响应到存档目录，或只用存档中的响应（替换条件请求缓存）"""
+        self.replay = install_replay(self.session, root, mode)
+        instrument_session(self.session, self.metrics)
+        if mode == REPLAY:
+            # 回放不访问网络，不需要限速
+            self.rate_limiter = RateLimiter()
+        return self.replay
+
+    def fetch(self, url, label=None, gone=None):
+        """
+        限速后请求 url，返回文本；暂时性错误按指数退避重试，最终失败返回 None；
+        gone 不为 None 时，404/410 返回 gone 而不是当作失败
+        """
+        label = label or url
+        with self.metrics.time('fetch'):
+            for attempt in range(self.retries + 1):
+                try:
+                    with self.metrics.time('rate_limit'):
+                        self.rate_limiter.wait(url)
+                    response = self.request(url)
+                    if response.status_code == 200:
+                        return response.text
+                    if gone is not None and response.status_code in GONE_STATUS:
+                        print(f"{label} 不存在（状态码: {response.status_code}），列表到此结束")
+                        return gone
+                    error = f"状态码: {response.status_code}"
+                    retryable = response.status_code in RETRY_STATUS
+                except requests.RequestException as e:
+                    self.metrics.inc('request_errors')
+                    error = e
+                    retryable = True
+                if not retryable or attempt == self.retries:
+                    break
+                delay = self.retry_backoff * 2 ** attempt
+                print(f"{label} 请求失败（{error}），{delay:g} 秒后重试")
+                self.metrics.inc('retries')
+                with self.metrics.time('retry_sleep'):
+                    time.sleep(delay)
+            print(f"{label} 请求失败: {error}")
+            self.metrics.inc('fetch_failures')
+            return None
+
+    def request(self, url):
+        """
+        发出一次 GET 请求并按阶段记录耗时：新建连接的建连和 TLS 由连接自己记录，
+        到收到响应头为止的其余时间记为 server，读取正文记为 download
+        """
+        self.metrics.take_setup()
+        start = time.perf_counter()
+        response = self.session.get(url, timeout=self.timeout)
+        total = time.perf_counter() - start
+        # elapsed 是发出请求到解析完响应头的时间
+        headers = response.elapsed.total_seconds()
+        self.metrics.observe('server', max(headers - self.metrics.take_setup(), 0.0))
+        self.metrics.observe('download', max(total - headers, 0.0))
+        self.metrics.inc('responses', status=response.status_code)
+        self.metrics.inc('response_bytes', len(response.content))
+        response.encoding = self.encoding
+        return response
+
+    def get_page_content(self, key):
+        """获取一页列表页的内容，页面不存在时返回 END_OF_LIST"""
+        return self.fetch(self.page_url(key), self.page_label(key), gone=END_OF_LIST)
+
+    def fetch_page(self, key):
+        """分页抓取时使用的取页函数，默认即 get_page_content"""
+        return self.get_page_content(key)
+
+    def get_detail_content(self, url):
+        """获取详情页"""
+        return self.fetch(url, f"详情页 {url}")
+
+    # ---- 逐页爬取 ----
+
+    def record_key(self, record):
+        return tuple(record[field] for field in self.key_fields)
+
+    def crawl_pages(self, start=None, max_pages=None, resume=False):
+        """
+        逐页抓取直到空页、重复页或没有下一页，解析当前页时预取下一页；
+        每页追加到 JSONL、写入数据库并更新检查点。返回已写入的记录数
+        """
+        if start is None:
+            start = self.first_page
+        checkpoint = Checkpoint(self.checkpoint_path) if self.checkpoint_path else None
+        self.checkpoint = checkpoint
+        if resume and checkpoint and checkpoint.load():
+            checkpoint.report()
+            start = checkpoint.state.get('next_page')
+            sink = JsonlSink.resume(self.jsonl_path, checkpoint.sink_offset, checkpoint.sink_count)
+            if self.keep_in_memory:
+                self.records = list(iter_jsonl(self.jsonl_path))
+        else:
+            sink = JsonlSink(self.jsonl_path)
+
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(sink)
+            db = stack.enter_context(self.open_db()) if self.db_table else None
+            if start is not None:
+                pagination = self.make_pagination(start, max_pages)
+                walker = PageWalker(pagination, self.fetch_page, self.metrics.timed('parse', self.parse),
+                                    record_key=self.record_key, prefetch=self.list_prefetch,
+                                    skip_failed=self.skip_failed_pages)
+                pages = self.process_pages(walker)
+                # 中断时立即关闭 process_pages 的生成器，让它收尾（如丢弃没写完的一页）
+                stack.callback(getattr(pages, 'close', lambda: None))
+                for key, next_key, records in pages:
+                    print(f"{self.page_label(key)}爬取完成，获取到 {len(records)} {self.item_name}")
+                    with self.metrics.time('write'):
+                        sink.write_many(records)
+                        if self.keep_in_memory:
+                            self.records.extend(records)
+                        if db is not None:
+                            db.write_many(records)
+                            # 数据库先提交，检查点才能记为完成
+                            db.flush()
+                        if checkpoint:
+                            checkpoint.advance(key, sink, next_key, pagination.url(next_key))
+                    self.metrics.inc('pages')
+                    self.metrics.inc('records', len(records))
+                    if self.metrics_path:
+                        self.metrics.write(self.metrics_path, self.metrics_interval)
+                walker.report()
+                # 抓取失败的页留在检查点的待抓取列表中
+                if checkpoint and walker.stop_reason != FAILED:
+                    checkpoint.end_reached()
+            if db is not None:
+                db.report()
+
+        if checkpoint:
+            checkpoint.finish()
+        print(f"爬取完成，总共获取到 {sink.count} {self.item_name}")
+        if self.replay:
+            self.replay.report()
+        elif self.http_cache:
+            self.http_cache.report()
+        return sink.count
+
+    def crawl_details(self):
+        """抓取列表记录对应的详情页并合并回记录，列表页元数据没变的复用上次的结果"""
+        missing = [name for name, ready in (
+            ('frontier', self.frontier is not None),
+            ('db_path', self.db_path is not None),
+            ('extract_detail', type(self).extract_detail is not BaseSpider.extract_detail),
+        ) if not ready]
+        if missing:
+            raise NotImplementedError(f"{type(self).__name__} 不支持抓取详情页，缺少: {', '.join(missing)}")
+        extract = self.metrics.timed('parse_detail', self.extract_detail)
+        stage = DetailStage(self.db_path, self.get_detail_content, extract, self.detail_signature_fields,
+                            workers=self.detail_workers)
+        details = stage.run(self.iter_records(), self.frontier)
+        self.replace_records(stage.join(self.iter_records(), details))
+        stage.report()
+        self.frontier.report()
+
+    # ---- 记录与输出 ----
+
+    def iter_records(self):
+        """遍历爬取到的记录：保留在内存中时直接遍历列表，否则从 JSONL 流式读取"""
+        if self.keep_in_memory:
+            return iter(self.records)
+        if not os.path.exists(self.jsonl_path):
+            return iter(())
+        return iter_jsonl(self.jsonl_path)
+
+    def replace_records(self, records):
+        """用 records 整体替换已有数据（JSONL 和内存中的列表）"""
+        if self.keep_in_memory:
+            records = list(records)
+        replace_jsonl(records, self.jsonl_path)
+        self.records = records if self.keep_in_memory else []
+
+    def open_db(self):
+        """打开（必要时创建）数据库"""
+        return SQLiteSink(self.db_path, self.db_table, self.db_columns, self.key_fields, self.db_indexes)
+
+    def export_json(self, filename, records=None):
+        """写出与 json.dump(indent=2) 相同格式的 JSON 文件"""
+        with self.metrics.time('save_json'):
+            write_pretty_json(self.iter_records() if records is None else records, filename)
+        print(f"数据已保存到 {filename}")
+        return filename
+
+    def export_csv(self, filename, header, row_func=None, records=None):
+        """写出 CSV 文件，header/row_func 同 sinks.write_csv"""
+        with self.metrics.time('save_csv'):
+            write_csv(self.iter_records() if records is None else records, filename, header, row_func)
+        print(f"数据已保存到 {filename}")
+        return filename
+
+    def save_to_parquet(self, root=None):
+        """导出带类型的 Parquet 文件，按爬取日期分区"""
+        if self.parquet_fields is None:
+            return None
+        if not HAS_PYARROW:
+            print("未安装 pyarrow，跳过 Parquet 导出")
+            return None
+        with self.metrics.time('save_parquet'):
+            path, rows = export_parquet(self.iter_records(), root or self.parquet_dir, self.parquet_fields)
+        print(f"数据已保存到 {path}（{rows} 行）")
+        return path
+
+    def report_metrics(self):
+        """打印本次运行的指标汇总表；设置了 metrics_path 时同时写出最终的 Prometheus 文本文件"""
+        self.metrics.report()
+        if self.metrics_path:
+            self.metrics.write(self.metrics_path)
+            print(f"运行指标已保存到 {self.metrics_path}")
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite 存储
+每个爬虫一张表，以自然键（博客 URL、电影名+上映时间、政策 URL）为主键，
+重复爬取时按主键 upsert 原地更新；常用查询字段建索引，
+按批次在一个事务内写入
+"""
+
+import sqlite3
+
+
+def quote(name):
+    """表名、列名加双引号"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteSink:
+    def __init__(self, path, table, columns, key, indexes=(), batch_size=200):
+        """
+        path: 数据库文件路径
+        table: 表名
+        columns: [(列名, 类型), ...]，记录中缺少的列写入 NULL
+        key: 自然键列名元组，作为主键
+        indexes: 需要建索引的列名
+        batch_size: 缓冲多少条记录后在一个事务内写入
+        """
+        self.path = path
+        self.table = table
+        self.columns = [name for name, _ in columns]
+        self.key = tuple(key)
+        self.batch_size = batch_size
+        self.pending = []
+        self.count = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+
+        column_defs = ', '.join(f'{quote(name)} {sql_type}' for name, sql_type in columns)
+        key_def = ', '.join(quote(name) for name in self.key)
+        with self.conn:
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS {quote(table)} '
+                              f'({column_defs}, PRIMARY KEY ({key_def}))')
+            for column in indexes:
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS {quote(f"idx_{table}_{column}")} '
+                                  f'ON {quote(table)} ({quote(column)})')
+
+        # 主键冲突时用新值覆盖其余列
+        updates = [name for name in self.columns if name not in self.key]
+        conflict = ('DO UPDATE SET ' + ', '.join(f'{quote(name)} = excluded.{quote(name)}' for name in updates)
+                    if updates else 'DO NOTHING')
+        self.upsert_sql = (f'INSERT INTO {quote(table)} ({", ".join(quote(name) for name in self.columns)}) '
+                           f'VALUES ({", ".join("?" for _ in self.columns)}) '
+                           f'ON CONFLICT ({key_def}) {conflict}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record):
+        self.pending.append(tuple(record.get(name) for name in self.columns))
+        self.count += 1
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        """把缓冲的记录在一个事务内写入"""
+        if self.pending:
+            with self.conn:
+                self.conn.executemany(self.upsert_sql, self.pending)
+            self.pending = []
+
+    def query(self, sql, params=()):
+        """执行查询，返回字典列表"""
+        self.flush()
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def query_plan(self, sql, params=()):
+        """返回 EXPLAIN QUERY PLAN 的说明文字，用于确认查询走了索引"""
+        return [row['detail'] for row in self.conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+    def row_count(self):
+        self.flush()
+        return self.conn.execute(f'SELECT COUNT(*) FROM {quote(self.table)}').fetchone()[0]
+
+    def report(self):
+        print(f"数据库 {self.path}：表 {self.table} 共 {self.row_count()} 行，本次写入 {self.count} 条")
+
+    def close(self):
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
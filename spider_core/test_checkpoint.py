@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+测试断点续爬
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'p02_maoyan'))
+sys.path.insert(0, os.path.join(ROOT, 'p03_cnblogs'))
+sys.path.insert(0, os.path.join(ROOT, 'p04_bendibao'))
+from maoyan_spider import MaoyanSpider  # noqa: E402
+from cnblogs_spider import CnblogsSpider  # noqa: E402
+from enhanced_crawler import EnhancedSchoolPolicyCrawler  # noqa: E402
+from school_policy_crawler import SchoolPolicyCrawler  # noqa: E402
+from spider_core.mocksite import MockSite  # noqa: E402
+from spider_core.ratelimit import RateLimiter  # noqa: E402
+from spider_core.sinks import JsonlSink, iter_jsonl  # noqa: E402
+
+with open(os.path.join(ROOT, 'output', 'cnblogs.html'), 'r', encoding='utf-8') as f:
+    CNBLOGS_HTML = f.read()
+
+
+def page_html(page_num):
+    """共 5 页，每页的博客 URL 不同，第 6 页起没有博客"""
+    if page_num > 5:
+        return '<html><body></body></html>'
+    return CNBLOGS_HTML.replace('/pinard/p/', f'/pinard/p/{page_num}0')
+
+
+def make_spider(fetched, failing=()):
+    spider = CnblogsSpider()
+
+    def get_page_content(page_num):
+        fetched.append(page_num)
+        return None if page_num in failing else page_html(page_num)
+
+    spider.get_page_content = get_page_content
+    return spider
+
+
+def test_resume_skips_completed_pages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetched = []
+    spider = make_spider(fetched, failing={3})
+    spider.crawl_all_pages()
+    # 第 3 页之后预取的页可能已经发出，但没有写出
+    assert sorted(fetched)[:3] == [1, 2, 3] and len(fetched) <= 3 + spider.list_prefetch
+    assert os.path.exists(spider.checkpoint_path)
+    per_page = len(spider.parse_blog_list(CNBLOGS_HTML))
+
+    # 模拟检查点之后写了一半就崩溃
+    with open(spider.jsonl_path, 'a', encoding='utf-8') as f:
+        f.write('{"title": "半')
+
+    fetched.clear()
+    spider = make_spider(fetched)
+    spider.crawl_all_pages(resume=True)
+    # 第 6 页为空，解析它时可能已经预取了后面几页
+    assert sorted(fetched) == list(range(3, 3 + len(fetched))) and 4 <= len(fetched) <= 4 + spider.list_prefetch
+    assert len(spider.blog_data) == 5 * per_page
+    assert len(list(iter_jsonl(spider.jsonl_path))) == 5 * per_page
+    assert not os.path.exists(spider.checkpoint_path)
+
+
+def test_maoyan_progress_survives_interruption(tmp_path, monkeypatch):
+    """猫眼按 offset 分页：每页海报下载完就写出并推进检查点，中断后从下一页继续"""
+    monkeypatch.chdir(tmp_path)
+    with MockSite(pages=3) as site:
+        def make_maoyan():
+            spider = MaoyanSpider()
+            spider.base_url = site.base_url('maoyan')
+            spider.rate_limiter = RateLimiter()
+            return spider
+
+        spider = make_maoyan()
+        parse = spider.parse
+
+        def interrupted(offset, html_content):
+            if offset == 20:
+                raise KeyboardInterrupt
+            return parse(offset, html_content)
+
+        spider.parse = interrupted
+        with pytest.raises(KeyboardInterrupt):
+            spider.crawl()
+        written = list(iter_jsonl(spider.jsonl_path))
+        assert len(written) == 20
+        assert all(movie['local_image_path'] for movie in written)
+        assert os.path.exists(spider.checkpoint_path)
+
+        spider = make_maoyan()
+        spider.crawl(resume=True)
+        names = [movie['name'] for movie in iter_jsonl(spider.jsonl_path)]
+        assert len(names) == len(set(names)) == 30
+        assert not os.path.exists(spider.checkpoint_path)
+
+
+@pytest.mark.parametrize('status', [404, 410])
+def test_missing_page_past_end_finishes_crawl(tmp_path, monkeypatch, status):
+    """最后一页之后的页面返回 404/410 时按列表结束处理，不留下检查点"""
+    monkeypatch.chdir(tmp_path)
+    with MockSite(pages=3, missing_status=status) as site:
+        spider = CnblogsSpider()
+        spider.base_url = site.base_url('cnblogs')
+        spider.rate_limiter = RateLimiter()
+        spider.crawl_all_pages()
+        assert len(spider.blog_data) == 3 * len(spider.parse_blog_list(site.cnblogs_page(1)))
+        assert not os.path.exists(spider.checkpoint_path)
+
+        crawler = EnhancedSchoolPolicyCrawler()
+        crawler.base_url = site.base_url('bendibao')
+        crawler.rate_limiter = RateLimiter()
+        crawler.crawl_all_pages()
+        assert {article['page'] for article in crawler.all_data} == {1, 2, 3}
+        assert not os.path.exists(crawler.checkpoint_path)
+
+
+def test_bendibao_failed_page_mid_crawl(tmp_path, monkeypatch):
+    """第 3 页返回 503：基础版跳过它爬完其余页，增强版停下，续爬时补上第 3 页"""
+    monkeypatch.chdir(tmp_path)
+    with MockSite(pages=5, errors={'/news/list_17_727_3.htm': 503}) as site:
+        crawler = SchoolPolicyCrawler()
+        crawler.base_url = site.base_url('bendibao')
+        crawler.rate_limiter = RateLimiter()
+        crawler.retries = 0
+        crawler.crawl_all_pages()
+        assert {article['page'] for article in crawler.all_data} == {1, 2, 4, 5}
+
+        crawler = EnhancedSchoolPolicyCrawler()
+        crawler.base_url = site.base_url('bendibao')
+        crawler.rate_limiter = RateLimiter()
+        crawler.retries = 0
+        crawler.crawl_all_pages()
+        assert {article['page'] for article in crawler.all_data} == {1, 2}
+        assert os.path.exists(crawler.checkpoint_path)
+
+        del site.errors['/news/list_17_727_3.htm']
+        crawler = EnhancedSchoolPolicyCrawler()
+        crawler.base_url = site.base_url('bendibao')
+        crawler.rate_limiter = RateLimiter()
+        crawler.crawl_all_pages(resume=True)
+        assert {article['page'] for article in iter_jsonl(crawler.jsonl_path)} == {1, 2, 3, 4, 5}
+        assert not os.path.exists(crawler.checkpoint_path)
+
+
+@pytest.mark.parametrize('interrupt', ['parse', 'write'])
+def test_bendibao_resume_keeps_dedup_run(tmp_path, monkeypatch, interrupt):
+    """每页都有同一篇置顶文章：第 2 页之后中断再续爬，置顶文章仍只写出一次"""
+    monkeypatch.chdir(tmp_path)
+    sticky = 'http://sh.bendibao.com/news/2018316/191342.shtm'
+    with MockSite(pages=4) as site:
+        def make_crawler(interrupt_page=None):
+            crawler = EnhancedSchoolPolicyCrawler()
+            crawler.base_url = site.base_url('bendibao')
+            crawler.rate_limiter = RateLimiter()
+            parse = crawler.parse
+
+            def with_sticky(page_num, page):
+                if interrupt == 'parse' and page_num == interrupt_page:
+                    raise KeyboardInterrupt
+                articles = parse(page_num, page)
+                return [dict(articles[0], url=sticky, title='置顶')] + articles if articles else articles
+
+            crawler.parse = with_sticky
+            return crawler
+
+        if interrupt == 'write':
+            write_many = JsonlSink.write_many
+
+            def interrupted(sink, records):
+                if any(record['page'] == 3 for record in records):
+                    raise KeyboardInterrupt
+                return write_many(sink, records)
+
+            monkeypatch.setattr(JsonlSink, 'write_many', interrupted)
+        crawler = make_crawler(interrupt_page=3)
+        with pytest.raises(KeyboardInterrupt):
+            crawler.crawl_all_pages()
+        monkeypatch.undo()
+        monkeypatch.chdir(tmp_path)
+        assert {article['page'] for article in iter_jsonl(crawler.jsonl_path)} == {1, 2}
+
+        crawler = make_crawler()
+        crawler.crawl_all_pages(resume=True)
+        articles = list(iter_jsonl(crawler.jsonl_path))
+        urls = [article['url'] for article in articles]
+        assert urls.count(sticky) == 1
+        assert len(urls) == len(set(urls))
+        assert {article['page'] for article in articles} == {1, 2, 3, 4}
+        assert not os.path.exists(crawler.checkpoint_path)
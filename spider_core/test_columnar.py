@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+测试 Parquet 列式导出
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'p02_maoyan'))
+sys.path.insert(0, os.path.join(ROOT, 'p03_cnblogs'))
+pytest.importorskip('pyarrow')
+
+from maoyan_spider import PARQUET_FIELDS as MOVIE_FIELDS  # noqa: E402
+from cnblogs_spider import PARQUET_FIELDS as BLOG_FIELDS  # noqa: E402
+from spider_core.columnar import export_parquet, parse_timestamp, read_parquet  # noqa: E402
+
+
+def load(*parts):
+    with open(os.path.join(ROOT, *parts), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_blogs_typed_and_partitioned(tmp_path):
+    blogs = load('p03_cnblogs', 'cnblogs_pinard_data_20251022_162819.json')
+    root = str(tmp_path / 'blogs')
+    export_parquet(iter(blogs), root, BLOG_FIELDS, crawl_date='2025-10-22')
+    path, rows = export_parquet(iter(blogs[:3]), root, BLOG_FIELDS, crawl_date='2025-10-23')
+    assert rows == 3 and 'crawl_date=2025-10-23' in path
+
+    table = read_parquet(root)
+    assert table.num_rows == len(blogs) + 3
+    assert str(table.schema.field('read_count').type) == 'int64'
+    assert str(table.schema.field('publish_time').type) == 'timestamp[ms]'
+
+    # 只读取一列
+    column = read_parquet(root, columns=['read_count'], filters=[('crawl_date', '=', '2025-10-22')])
+    assert column.column_names == ['read_count']
+    assert column.column('read_count').to_pylist() == [blog['read_count'] for blog in blogs]
+    first = read_parquet(root, columns=['publish_time']).column('publish_time')[0].as_py()
+    assert first == datetime.strptime(blogs[0]['publish_time'], '%Y-%m-%d %H:%M')
+
+
+def test_movie_score_is_float(tmp_path):
+    movies = load('p02_maoyan', 'maoyan_data', 'maoyan_movies.json')
+    root = str(tmp_path / 'movies')
+    export_parquet(iter(movies), root, MOVIE_FIELDS, batch_size=7)
+    scores = read_parquet(root, columns=['score']).column('score').to_pylist()
+    assert scores == [float(movie['score']) for movie in movies]
+
+
+def test_timestamp_found_after_prefix():
+    """本地宝的发布时间是整段 .time 文本，日期前可能有前缀"""
+    assert parse_timestamp('发布于 2025-01-03 10:00') == datetime(2025, 1, 3, 10, 0)
+    assert parse_timestamp('时间：2025-01-03') == datetime(2025, 1, 3)
+    assert parse_timestamp('1994-09-10(加拿大)') == datetime(1994, 9, 10)
+    assert parse_timestamp('暂无') is None
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+测试跨运行去重
+"""
+
+from array import array
+
+from spider_core import dedup as dedup_module
+from spider_core.dedup import DUPLICATE, KNOWN, NEW, BlockedBloomFilter, DedupFilter
+
+STICKY = 'http://sh.bendibao.com/news/2018316/191342.shtm'
+
+
+def test_duplicates_within_and_across_runs(tmp_path):
+    path = str(tmp_path / 'dedup.db')
+    page1 = [{'url': STICKY}, {'url': 'http://sh.bendibao.com/news/1.shtm'}]
+    page2 = [{'url': STICKY}, {'url': 'http://sh.bendibao.com/news/2.shtm'}]
+
+    with DedupFilter(path) as dedup:
+        assert dedup.filter(page1, lambda article: article['url']) == (page1, 0)
+        assert dedup.filter(page2, lambda article: article['url']) == (page2[1:], 1)
+        assert dedup.counts == {NEW: 3, KNOWN: 0, DUPLICATE: 1}
+
+    # 下一次运行：以前见过的记录不算本次重复
+    with DedupFilter(path) as dedup:
+        assert STICKY in dedup
+        assert dedup.check(STICKY) == KNOWN
+        assert dedup.check(STICKY) == DUPLICATE
+        assert dedup.check('http://sh.bendibao.com/news/3.shtm') == NEW
+
+
+def test_exact_store_corrects_bloom_false_positives(tmp_path):
+    with DedupFilter(str(tmp_path / 'dedup.db'), batch_size=7) as dedup:
+        # 全部置位的 Bloom：每个键都"可能见过"，新键只能靠精确存储判断
+        dedup.bloom = BlockedBloomFilter(0, array('Q', [(1 << 64) - 1] * 1000))
+        statuses = [dedup.check(f'http://example.com/{i}') for i in range(500)]
+        assert statuses == [NEW] * 500
+        assert dedup.false_positives == 500
+        assert dedup.check('http://example.com/42') == DUPLICATE
+
+
+def test_bloom_grows_past_capacity(tmp_path):
+    path = str(tmp_path / 'dedup.db')
+    urls = [f'http://example.com/{i}' for i in range(500)]
+    with DedupFilter(path, capacity=4, batch_size=7) as dedup:
+        assert [dedup.check(url) for url in urls] == [NEW] * 500
+        assert dedup.resizes > 0 and dedup.bloom.capacity >= 500
+        assert all(url in dedup.bloom for url in urls)
+        assert dedup.check(urls[42]) == DUPLICATE
+    with DedupFilter(path, capacity=4) as dedup:
+        assert dedup.bloom.capacity >= 500
+        assert dedup.check(urls[0]) == KNOWN
+        assert dedup.check('http://example.com/new') == NEW
+
+
+def test_fingerprint_only_after_bloom_hit(tmp_path, monkeypatch):
+    # Bloom 判断没见过的键不算精确指纹，写入 SQLite 时才批量计算
+    hashed = []
+    fingerprint = dedup_module.key_fingerprint
+    monkeypatch.setattr(dedup_module, 'key_fingerprint', lambda key: hashed.append(key) or fingerprint(key))
+    with DedupFilter(str(tmp_path / 'dedup.db'), batch_size=100) as dedup:
+        assert dedup.check('http://example.com/1') == NEW
+        assert hashed == []
+        assert dedup.check('http://example.com/1') == DUPLICATE
+        assert hashed == []
+    assert hashed == ['http://example.com/1']
+    with DedupFilter(str(tmp_path / 'dedup.db')) as dedup:
+        assert dedup.check('http://example.com/1') == KNOWN
+
+
+def test_bloom_rebuilt_after_unclean_exit(tmp_path):
+    path = str(tmp_path / 'dedup.db')
+    with DedupFilter(path) as dedup:
+        dedup.check('http://example.com/old')
+    # 写入了键但没有保存位图就退出（如进程被杀）
+    dedup = DedupFilter(path)
+    run = dedup.run
+    dedup.check(STICKY)
+    dedup.flush()
+    dedup.conn.close()
+
+    with DedupFilter(path, run=run) as dedup:
+        assert STICKY in dedup.bloom
+        assert dedup.check(STICKY) == DUPLICATE
+        assert dedup.check('http://example.com/old') == KNOWN
+    # 正常关闭后位图与精确存储一致，直接读取
+    with DedupFilter(path) as dedup:
+        assert dedup.check(STICKY) == KNOWN
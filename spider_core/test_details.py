@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+测试详情页抓取
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'p03_cnblogs'))
+sys.path.insert(0, os.path.join(ROOT, 'p04_bendibao'))
+from cnblogs_spider import CnblogsSpider  # noqa: E402
+from school_policy_crawler import SchoolPolicyCrawler  # noqa: E402
+from spider_core.sinks import iter_jsonl  # noqa: E402
+
+with open(os.path.join(ROOT, 'output', 'cnblogs.html'), 'r', encoding='utf-8') as f:
+    CNBLOGS_HTML = f.read()
+
+DETAIL_HTML = ('<html><body><span id="post-date" data-date-updated="2019-07-02 10:11">2019-07-01 18:10</span>'
+               '<div id="cnblogs_post_body"><p>正文 {url}</p></div></body></html>')
+
+
+def make_spider(fetched):
+    spider = CnblogsSpider()
+    lock = threading.Lock()
+
+    def get_detail_content(url):
+        with lock:
+            fetched.append(url)
+        return DETAIL_HTML.format(url=url)
+
+    spider.get_page_content = lambda page_num: CNBLOGS_HTML if page_num == 1 else None
+    spider.get_detail_content = get_detail_content
+    return spider
+
+
+def test_details_joined_and_unchanged_articles_skipped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetched = []
+    spider = make_spider(fetched)
+    spider.crawl_all_pages()
+    spider.crawl_details()
+
+    blogs = spider.blog_data
+    assert sorted(fetched) == sorted(blog['url'] for blog in blogs)
+    assert blogs[0]['content'] == f"正文 {blogs[0]['url']}"
+    assert blogs[0]['updated_time'] == '2019-07-02 10:11'
+    assert list(iter_jsonl(spider.jsonl_path)) == blogs
+
+    # 再次运行：只有摘要变化的那篇重新抓取
+    fetched.clear()
+    spider = make_spider(fetched)
+    spider.parse_blog_list = lambda html_content, parse=spider.parse_blog_list: [
+        dict(blog, summary='新摘要') if i == 1 else blog for i, blog in enumerate(parse(html_content))]
+    spider.crawl_all_pages()
+    spider.crawl_details()
+    assert fetched == [blogs[1]['url']]
+    assert all(blog['content'] for blog in spider.blog_data)
+
+
+def test_details_need_frontier_and_extractor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(NotImplementedError, match='frontier.*extract_detail'):
+        SchoolPolicyCrawler().crawl_details()
+
+
+def test_list_crawl_leaves_frontier_empty(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetched = []
+    spider = make_spider(fetched)
+    spider.crawl_all_pages()
+    # 只抓列表页时详情页 URL 不入队
+    assert (len(spider.frontier), spider.frontier.duplicates) == (0, 0)
+
+    spider.crawl_details()
+    assert spider.frontier.duplicates == 0
+    assert len(fetched) == len(spider.blog_data)
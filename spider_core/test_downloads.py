@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+测试并发下载池
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from spider_core.downloads import DownloadPool, stream_to_file, COMPLETED, SKIPPED, FAILED, FILE_MODE
+
+
+def test_per_host_limit_and_report():
+    """单域名并发不超过 per_host，结束后统计各状态数量"""
+    lock = threading.Lock()
+    state = {'current': 0, 'peak': 0}
+
+    def fake_download(name):
+        with lock:
+            state['current'] += 1
+            state['peak'] = max(state['peak'], state['current'])
+        time.sleep(0.03)
+        with lock:
+            state['current'] -= 1
+        if name == 'exists':
+            return SKIPPED, name
+        if name == 'broken':
+            raise IOError('connection reset')
+        return COMPLETED, name
+
+    names = ['a', 'b', 'c', 'd', 'e', 'exists', 'broken']
+    with DownloadPool(max_workers=8, per_host=2) as pool:
+        futures = [pool.submit(f'https://p0.pipi.cn/{name}.jpg', fake_download, name) for name in names]
+        results = [future.result() for future in futures]
+
+    assert state['peak'] == 2
+    assert results == ['a', 'b', 'c', 'd', 'e', 'exists', None]
+    assert pool.stats == {COMPLETED: 5, SKIPPED: 1, FAILED: 1}
+    assert pool.failures == ['https://p0.pipi.cn/broken.jpg']
+
+
+class FakeStreamResponse:
+    def __init__(self, chunks, headers=None, fail_after=None):
+        self.chunks = chunks
+        self.headers = headers or {}
+        self.fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and i >= self.fail_after:
+                raise IOError('connection reset')
+            yield chunk
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, timeout=10, stream=False):
+        assert stream
+        return self.response
+
+
+def test_stream_to_file_writes_chunks(tmp_path):
+    """分块写入，完成后目录里只剩目标文件"""
+    target = tmp_path / 'poster.jpg'
+    written = stream_to_file(FakeSession(FakeStreamResponse([b'ab', b'cd', b'e'])), 'u', str(target))
+
+    assert written == 5
+    assert target.read_bytes() == b'abcde'
+    assert os.listdir(tmp_path) == ['poster.jpg']
+    # 权限与普通 open() 新建的文件一致，而不是 mkstemp 的 0600
+    plain = tmp_path / 'plain.txt'
+    plain.write_bytes(b'')
+    assert os.stat(target).st_mode & 0o777 == os.stat(plain).st_mode & 0o777 == FILE_MODE
+
+
+def test_stream_to_file_leaves_no_partial_file(tmp_path):
+    """中途失败或超过大小上限时不留下目标文件和临时文件"""
+    target = tmp_path / 'poster.jpg'
+
+    with pytest.raises(IOError):
+        stream_to_file(FakeSession(FakeStreamResponse([b'ab', b'cd'], fail_after=1)), 'u', str(target))
+    with pytest.raises(ValueError):
+        stream_to_file(FakeSession(FakeStreamResponse([b'ab', b'cd'])), 'u', str(target), max_bytes=3)
+    with pytest.raises(ValueError):
+        stream_to_file(FakeSession(FakeStreamResponse([b'ab'], headers={'Content-Length': '100'})),
+                       'u', str(target), max_bytes=10)
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+测试预编译的提取计划
+结果必须与逐个 select_one / find_all(string=...) 的级联完全一致
+"""
+
+import os
+import re
+import sys
+
+import pytest
+from bs4 import BeautifulSoup
+
+from spider_core.extraction import SelectorPlan
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'p04_bendibao'))
+
+from enhanced_crawler import EnhancedSchoolPolicyCrawler  # noqa: E402
+from school_policy_crawler import SchoolPolicyCrawler  # noqa: E402
+
+ARTICLES = '''
+<div class="list-article"><ul>
+<li><a href="/news/1.shtm">政策一</a><p>政策一</p><div class="desc">描述一</div><span class="time">2025-01-02</span></li>
+<li><a href="/news/2.shtm">政策二</a><p></p><span class="pub-date">发布于 2025-01-03 10:00</span></li>
+<li><a href="/news/3.shtm">政策三</a>
+摘要第一行
+摘要第二行
+<em>2024-12-31</em></li>
+<li><a href="/news/4.shtm">政策四</a><span class="date">昨天</span><span class="post-time">2025-02-01</span><!-- 2020-01-01 --></li>
+<li><a href="/news/5.shtm">政策五</a><div class="content intro"><p>正文摘要</p></div><i>09:30</i></li>
+<li><span class="time">无链接</span></li>
+</ul></div>
+'''
+
+SELECTORS = ['p', '.summary', '.desc', '.intro', '.content', '.text',
+             '.time', '.date', '.publish-time', '.pub-time', 'span[class*="time"]', 'span[class*="date"]',
+             'div > p', 'li em:first-child']
+
+
+@pytest.mark.parametrize('backend', ['html.parser', 'lxml'])
+def test_plan_matches_select_one(backend):
+    soup = BeautifulSoup(ARTICLES, backend)
+    pattern = re.compile(r'\d{4}-\d{2}-\d{2}|\d{2}:\d{2}')
+    plan = SelectorPlan(SELECTORS, string_pattern=pattern)
+
+    for li in soup.find_all('li'):
+        first_matches, strings = plan.scan(li)
+        expected = [li.select_one(selector) for selector in SELECTORS]
+        assert [node is expect for node, expect in zip(first_matches, expected)] == [True] * len(SELECTORS)
+        assert [id(s) for s in strings] == [id(s) for s in li.find_all(string=pattern)]
+
+
+def test_enhanced_records_match_basic_crawler(tmp_path, monkeypatch):
+    """增强版与基础版（仍为逐个 select_one）提取出相同的字段"""
+    monkeypatch.chdir(tmp_path)
+    enhanced = EnhancedSchoolPolicyCrawler().parse_page(ARTICLES, 1)
+    basic = SchoolPolicyCrawler().parse_page(ARTICLES, 1)
+
+    assert len(enhanced) == 5
+    for record in enhanced:
+        record.pop('crawl_time')
+    assert enhanced == basic
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+测试 URL 调度队列
+"""
+
+import threading
+
+from spider_core.frontier import (PRIORITY_DETAIL, PRIORITY_LIST, Frontier, SeenSet,
+                                  canonicalize_url, run_frontier)
+
+
+def test_canonical_urls_are_deduplicated():
+    assert canonicalize_url('HTTP://WWW.Cnblogs.com:80?b=2&a=1#top') == 'http://www.cnblogs.com/?a=1&b=2'
+    frontier = Frontier()
+    assert frontier.add('https://www.cnblogs.com/pinard/p/6004041.html')
+    assert not frontier.add('https://www.cnblogs.com:443/pinard/p/6004041.html#comments')
+    assert (len(frontier), frontier.duplicates) == (1, 1)
+
+
+def test_priority_depth_and_host_rotation():
+    frontier = Frontier(max_depth=1)
+    frontier.add('http://sh.bendibao.com/news/1.shtm', PRIORITY_DETAIL, depth=1)
+    frontier.add('http://sh.bendibao.com/news/2.shtm', PRIORITY_DETAIL, depth=1)
+    frontier.add('https://www.cnblogs.com/pinard/p/1.html', PRIORITY_DETAIL, depth=1)
+    frontier.add('http://sh.bendibao.com/news/list_17_727_2.htm', PRIORITY_LIST)
+    assert not frontier.add('http://sh.bendibao.com/news/3.shtm', depth=2)
+
+    order = [frontier.pop(block=False)[0] for _ in range(4)]
+    assert order[0].endswith('list_17_727_2.htm')
+    # 列表页之后先轮到 cnblogs，再回到本地宝
+    assert order[1:] == ['https://www.cnblogs.com/pinard/p/1.html',
+                         'http://sh.bendibao.com/news/1.shtm',
+                         'http://sh.bendibao.com/news/2.shtm']
+    assert frontier.pop(block=False) is None
+
+
+def test_workers_drain_queue_including_new_urls():
+    frontier = Frontier(max_depth=1)
+    frontier.add('http://example.com/list')
+    handled = []
+    lock = threading.Lock()
+
+    def handler(url, depth, meta):
+        with lock:
+            handled.append(url)
+        if depth == 0:
+            frontier.add_many([f'http://example.com/{i}' for i in range(20)], PRIORITY_DETAIL, depth=1)
+
+    assert run_frontier(frontier, handler, workers=4) == 21
+    assert len(set(handled)) == 21
+
+
+def test_seen_set_merges_and_persists(tmp_path):
+    seen = SeenSet(merge_threshold=100)
+    urls = [f'http://example.com/p/{i}.html' for i in range(1000)]
+    assert all(seen.add(url) for url in urls)
+    assert not any(seen.add(url) for url in urls)
+    assert len(seen) == 1000
+    # 大部分指纹已并入 8 字节一个的数组
+    assert seen.fingerprints.itemsize == 8 and len(seen.recent) < 100
+
+    path = tmp_path / 'seen.bin'
+    seen.save(str(path))
+    restored = SeenSet()
+    restored.load(str(path))
+    assert urls[123] in restored and 'http://example.com/other' not in restored
+
+    # 并入已有数组和 recent 的集合，归并结果仍然有序
+    other = SeenSet(merge_threshold=100)
+    extra = [f'http://example.com/q/{i}.html' for i in range(150)]
+    for url in extra:
+        other.add(url)
+    other.load(str(path))
+    assert not other.recent and len(other) == 1150
+    assert list(other.fingerprints) == sorted(other.fingerprints)
+    assert all(url in other for url in urls[::50] + extra[::10])
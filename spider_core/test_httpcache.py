@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+测试 HTTP 条件请求缓存
+在本机起一个支持 ETag 的小服务器，不访问外网
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+
+from spider_core.httpcache import install_cache
+
+PAGE = '<html><body><div class="day">博客列表</div></body></html>'.encode('utf-8')
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.headers.get('If-None-Match'))
+        if self.path == '/plain':
+            # 没有校验信息的页面不缓存
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+        elif self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_not_modified_served_from_cache(tmp_path):
+    server = HTTPServer(('127.0.0.1', 0), ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    try:
+        session = requests.Session()
+        cache = install_cache(session, str(tmp_path / 'http_cache'))
+
+        first = session.get(url + '/list')
+        second = session.get(url + '/list')
+        session.get(url + '/plain')
+        session.get(url + '/plain')
+    finally:
+        server.shutdown()
+
+    assert first.status_code == second.status_code == 200
+    assert second.from_cache and not first.from_cache
+    assert second.text == first.text == PAGE.decode('utf-8')
+    assert ETagHandler.requests_seen[:2] == [None, '"v1"']
+    assert (cache.hits, cache.misses) == (1, 3)
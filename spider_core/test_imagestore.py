@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+测试按内容寻址的图片仓库
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'p02_maoyan'))
+from maoyan_spider import MaoyanSpider  # noqa: E402
+from spider_core.downloads import SKIPPED  # noqa: E402
+from spider_core.imagestore import ImageStore  # noqa: E402
+
+
+class FakeResponse:
+    headers = {}
+
+    def __init__(self, body):
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+
+class FakeSession:
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.requested = []
+
+    def get(self, url, timeout=10, stream=False):
+        self.requested.append(url)
+        return FakeResponse(self.bodies[url])
+
+
+def test_identical_content_stored_once(tmp_path):
+    """不同 URL 下载到相同内容时只保存一份"""
+    session = FakeSession({'https://p0.pipi.cn/a.jpg?w=160': b'poster', 'https://p1.pipi.cn/b.jpg': b'poster'})
+    store = ImageStore(str(tmp_path / 'store'))
+
+    first = store.download(session, 'https://p0.pipi.cn/a.jpg?w=160', '大鱼')
+    second = store.download(session, 'https://p1.pipi.cn/b.jpg', '大鱼（重映）')
+
+    assert first == second
+    assert first.endswith('.jpg')
+    assert len(store) == 1
+    assert store.lookup_name('大鱼（重映）') == first
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_known_url_survives_reload(tmp_path):
+    """保存索引后重新打开，已知 URL 直接命中"""
+    root = str(tmp_path / 'store')
+    store = ImageStore(root)
+    path = store.download(FakeSession({'https://p0.pipi.cn/a.jpg': b'poster'}), 'https://p0.pipi.cn/a.jpg', '大鱼')
+    store.save()
+
+    reopened = ImageStore(root)
+    assert reopened.lookup('https://p0.pipi.cn/a.jpg') == path
+    assert reopened.lookup('https://p0.pipi.cn/other.jpg') is None
+
+
+def test_import_directory_dedups_existing_trees(tmp_path):
+    """导入已有目录时相同内容只保存一份"""
+    for directory, name in (('images', '大鱼.jpg'), ('film', 'd2dad592.jpg')):
+        os.makedirs(tmp_path / directory)
+        (tmp_path / directory / name).write_bytes(b'poster')
+    store = ImageStore(str(tmp_path / 'store'))
+
+    store.import_directory(str(tmp_path / 'images'))
+    store.import_directory(str(tmp_path / 'film'), use_names=False)
+
+    assert len(store) == 1
+    assert os.path.exists(store.lookup_name('大鱼'))
+
+
+def test_maoyan_imports_film_directory_once(tmp_path, monkeypatch):
+    """图片仓库为空时导入 film/，之后同一海报按 URL 文件名命中，不再下载"""
+    monkeypatch.chdir(tmp_path)
+    film_dir = tmp_path / 'film'
+    os.makedirs(film_dir)
+    (film_dir / 'd2dad592c7e7e111e55bf165a69f4403a0815.jpg').write_bytes(b'poster')
+    monkeypatch.setattr(MaoyanSpider, 'film_dir', str(film_dir))
+
+    spider = MaoyanSpider()
+    spider.session = FakeSession({})
+    url = 'https://p0.pipi.cn/mmdb/d2dad592c7e7e111e55bf165a69f4403a0815.jpg?imageView2/1/w/160/h/220'
+    status, path = spider._download_image(url, '蝙蝠侠：黑暗骑士')
+    assert status == SKIPPED and spider.session.requested == []
+    assert spider.image_store.lookup(url) == path
+    spider.image_store.save()
+
+    # 仓库已有图片，不再重复导入
+    (film_dir / '54ecde02537ddd178967cbc55df9269f0bfee.jpg').write_bytes(b'other')
+    assert len(MaoyanSpider().image_store) == 1
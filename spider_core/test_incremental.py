@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+测试博客园增量爬取
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'p03_cnblogs'))
+from cnblogs_spider import CnblogsSpider  # noqa: E402
+from spider_core.mocksite import MockSite  # noqa: E402
+from spider_core.ratelimit import RateLimiter  # noqa: E402
+from spider_core.replay import RECORD, REPLAY  # noqa: E402
+from spider_core.sinks import JsonlSink, iter_jsonl  # noqa: E402
+
+with open(os.path.join(ROOT, 'output', 'cnblogs.html'), 'r', encoding='utf-8') as f:
+    CNBLOGS_HTML = f.read()
+
+
+def make_spider(fetched):
+    spider = CnblogsSpider()
+
+    def get_page_content(page_num):
+        fetched.append(page_num)
+        return CNBLOGS_HTML
+
+    spider.get_page_content = get_page_content
+    return spider
+
+
+def test_stops_at_first_page_without_new_posts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetched = []
+    spider = make_spider(fetched)
+    blogs = spider.parse_blog_list(CNBLOGS_HTML)
+
+    # 上次的数据缺少最新的一篇，且阅读量是旧的
+    previous = [dict(blog, read_count=0) for blog in blogs[1:]]
+    with JsonlSink(spider.jsonl_path) as sink:
+        sink.write_many(previous)
+
+    new_blogs = spider.crawl_incremental(max_pages=14)
+    assert fetched == [1, 2]
+    assert new_blogs == blogs[:1]
+    assert list(iter_jsonl(spider.jsonl_path)) == blogs
+    assert spider.blog_data == blogs
+
+    # 没有新博客时只请求一页
+    fetched.clear()
+    assert make_spider(fetched).crawl_incremental(max_pages=14) == []
+    assert fetched == [1]
+
+    # 不请求任何页时原样保留已有数据
+    fetched.clear()
+    assert make_spider(fetched).crawl_incremental(max_pages=0) == []
+    assert fetched == []
+    assert list(iter_jsonl(spider.jsonl_path)) == blogs
+
+
+def test_missing_page_ends_incremental_crawl(tmp_path, monkeypatch, capsys):
+    """翻过末页遇到 404 时正常结束；回放时报告回放统计而不是 HTTP 缓存"""
+    monkeypatch.chdir(tmp_path)
+    archive = str(tmp_path / 'archive')
+    with MockSite(pages=2, missing_status=404) as site:
+        spider = CnblogsSpider()
+        spider.base_url = site.base_url('cnblogs')
+        spider.rate_limiter = RateLimiter()
+        spider.use_archive(archive, RECORD)
+        new_blogs = spider.crawl_incremental(max_pages=14)
+        assert len(new_blogs) == 2 * len(spider.parse_blog_list(site.cnblogs_page(1)))
+        assert '爬取失败' not in capsys.readouterr().out
+
+    os.remove(spider.jsonl_path)
+    os.remove(spider.db_path)
+    spider = CnblogsSpider()
+    spider.base_url = site.base_url('cnblogs')
+    spider.use_archive(archive, REPLAY)
+    assert spider.crawl_incremental(max_pages=14) == new_blogs
+    out = capsys.readouterr().out
+    assert '回放：命中存档 3 次' in out and 'HTTP缓存' not in out
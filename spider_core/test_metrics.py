@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+测试运行指标：直方图、Prometheus 文本格式，以及爬虫各阶段的计时
+爬虫指向本地模拟站点，不访问外网
+"""
+
+import os
+import sys
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'p02_maoyan'))
+sys.path.insert(0, os.path.join(ROOT, 'p03_cnblogs'))
+from maoyan_spider import MaoyanSpider  # noqa: E402
+from cnblogs_spider import CnblogsSpider  # noqa: E402
+from spider_core.metrics import CrawlMetrics, Histogram  # noqa: E402
+from spider_core.mocksite import MockSite  # noqa: E402
+from spider_core.ratelimit import RateLimiter  # noqa: E402
+
+
+def test_histogram_and_prometheus_text(tmp_path):
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.05, 0.5, 2):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(0.1, 2), (1, 3), ('+Inf', 4)]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(1) == 2
+
+    metrics = CrawlMetrics('demo', buckets=(0.1, 1))
+    metrics.observe('parse', 0.05)
+    metrics.observe('parse', 0.5)
+    metrics.inc('responses', status=200)
+    metrics.inc('responses', 2, status=200)
+    metrics.inc('responses', status='5"03')
+    text = metrics.to_prometheus()
+    assert 'spider_stage_seconds_bucket{spider="demo",stage="parse",le="0.1"} 1' in text
+    assert 'spider_stage_seconds_bucket{spider="demo",stage="parse",le="+Inf"} 2' in text
+    assert 'spider_stage_seconds_count{spider="demo",stage="parse"} 2' in text
+    assert 'spider_responses_total{spider="demo",status="200"} 3' in text
+    assert 'status="5\\"03"' in text
+    assert metrics.counter('responses') == 4
+
+    path = str(tmp_path / 'metrics' / 'demo.prom')
+    assert metrics.write(path)
+    assert not metrics.write(path, min_interval=60)
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == text
+
+
+def test_spider_records_every_stage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with MockSite(pages=2) as site:
+        spider = CnblogsSpider()
+        spider.base_url = site.base_url('cnblogs')
+        spider.rate_limiter = RateLimiter()
+        spider.metrics_path = 'cnblogs.prom'
+        spider.crawl_all_pages()
+        spider.save_to_json()
+        spider.save_to_parquet()
+
+        # 第 3 页为空页，结束分页；其后预取的页（最多 list_prefetch 页）可能已经发出
+        fetches = spider.metrics.stage('fetch').count
+        assert 3 <= fetches <= 3 + spider.list_prefetch
+        assert spider.metrics.stage('server').count == spider.metrics.counter('responses', status=200) == fetches
+        assert spider.metrics.stage('parse').count == 3
+        for stage in ('rate_limit', 'connect', 'download', 'write', 'save_json', 'save_parquet'):
+            assert spider.metrics.stage(stage).count, stage
+        assert spider.metrics.counter('pages') == 2
+        assert spider.metrics.counter('records') == len(spider.blog_data)
+        assert spider.metrics.counter('connections') >= 1
+
+        server = spider.metrics.serve()
+        try:
+            response = requests.get(f'http://127.0.0.1:{server.server_address[1]}/metrics')
+        finally:
+            server.shutdown()
+        assert 'spider_pages_total{spider="cnblogs"} 2' in response.text
+
+        spider.report_metrics()
+        with open('cnblogs.prom', encoding='utf-8') as f:
+            assert f.read() == spider.metrics.to_prometheus()
+
+        # 不导入仓库中的 film/ 海报，让每张海报都走一次下载
+        monkeypatch.setattr(MaoyanSpider, 'film_dir', str(tmp_path / 'film'))
+        maoyan = MaoyanSpider()
+        maoyan.base_url = site.base_url('maoyan')
+        maoyan.rate_limiter = RateLimiter()
+        maoyan.crawl()
+        images = len(maoyan.movies_data)
+        assert maoyan.metrics.counter('images') == images
+        assert maoyan.metrics.stage('image_download').count == maoyan.metrics.counter('images', result='completed')
+        assert maoyan.metrics.stage('image_write').count == maoyan.metrics.counter('images', result='completed')
+        assert maoyan.metrics.counter('image_bytes') > 0
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+测试页面备忘录
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'p04_bendibao'))
+from school_policy_crawler import SchoolPolicyCrawler  # noqa: E402
+from spider_core.mocksite import MockSite  # noqa: E402
+from spider_core.pages import PageMemo, ParsedPage, as_page  # noqa: E402
+from spider_core.ratelimit import RateLimiter  # noqa: E402
+
+
+def test_each_url_fetched_once():
+    """并发访问同一 URL 时只抓取一次"""
+    calls = []
+    memo = PageMemo()
+
+    def fetch():
+        calls.append(1)
+        return '<ul><li><a href="/1.shtm">政策</a></li></ul>'
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pages = list(executor.map(lambda _: memo.get('http://sh.bendibao.com/news/list_17_727_1.htm', fetch), range(8)))
+
+    assert len(calls) == 1
+    assert all(page is pages[0] for page in pages)
+    assert (memo.fetches, memo.hits) == (1, 7)
+
+
+def test_soup_built_once_and_strings_accepted():
+    page = ParsedPage('u', '<ul><li>政策</li></ul>')
+    assert page.soup is page.soup
+    assert as_page(page) is page
+    assert as_page('<p>x</p>').soup.p.get_text() == 'x'
+    assert not ParsedPage('u', None)
+
+
+def test_discarded_page_fetched_again():
+    memo = PageMemo()
+    memo.get('u', lambda: '<p>1</p>')
+    memo.discard('u')
+    assert memo.get('u', lambda: '<p>2</p>').html == '<p>2</p>'
+    assert (memo.fetches, memo.hits, len(memo.pages)) == (2, 0, 1)
+
+
+def test_crawl_keeps_only_unparsed_pages(tmp_path, monkeypatch):
+    """第一页在检测总页数和解析之间复用，每页解析后就移出备忘录"""
+    monkeypatch.chdir(tmp_path)
+    with MockSite(pages=6) as site:
+        crawler = SchoolPolicyCrawler()
+        crawler.base_url = site.base_url('bendibao')
+        crawler.rate_limiter = RateLimiter()
+        parse = crawler.parse
+        memo_sizes = []
+
+        def parse_and_measure(page_num, page):
+            records = parse(page_num, page)
+            memo_sizes.append(len(crawler.page_memo.pages))
+            return records
+
+        crawler.parse = parse_and_measure
+        crawler.crawl_all_pages()
+        assert len(memo_sizes) == 6
+        assert max(memo_sizes) <= crawler.list_prefetch
+        assert (crawler.page_memo.fetches, crawler.page_memo.hits) == (6, 1)
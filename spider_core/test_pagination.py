@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+测试自动分页
+"""
+
+import threading
+import time
+
+from spider_core.pagination import (EMPTY, END_OF_LIST, FAILED, LAST, LIMIT, REPEATED, NextLinkPagination,
+                                    OffsetPagination, PageNumberPagination, PageWalker)
+from spider_core.ratelimit import RateLimiter
+
+RECORDS = {0: ['a', 'b'], 10: ['c', 'd'], 20: ['c', 'd']}
+
+
+def walk(pagination, pages):
+    fetched = []
+
+    def fetch(key):
+        fetched.append(key)
+        return pages.get(key, 'empty')
+
+    walker = PageWalker(pagination, fetch, lambda key, content: [] if content == 'empty' else content)
+    keys = [key for key, _, _ in walker]
+    return keys, fetched, walker.stop_reason
+
+
+def test_offset_stops_at_repeated_page():
+    keys, fetched, reason = walk(OffsetPagination(lambda offset: f'?offset={offset}'), RECORDS)
+    assert keys == [0, 10]
+    # 第 20 页与第 10 页重复；解析它时可能已经开始预取第 30 页
+    assert fetched[:3] == [0, 10, 20] and fetched[3:] in ([], [30])
+    assert reason == REPEATED
+
+
+def test_page_number_stops_at_empty_page_or_limit():
+    pages = {1: ['a'], 2: ['b']}
+    assert walk(PageNumberPagination(str), pages)[::2] == ([1, 2], EMPTY)
+    keys, fetched, reason = walk(PageNumberPagination(str, max_pages=1), pages)
+    assert (keys, fetched, reason) == ([1], [1], LIMIT)
+
+
+def test_end_of_list_stops_as_last_page():
+    # 页面不存在（404/410）按列表结束处理，抓取失败仍停在 FAILED
+    pages = {1: ['a'], 2: ['b'], 3: END_OF_LIST}
+    assert walk(PageNumberPagination(str), pages)[::2] == ([1, 2], LAST)
+    pages[3] = None
+    assert walk(PageNumberPagination(str), pages)[::2] == ([1, 2], FAILED)
+
+
+def test_skip_failed_pages_up_to_limit():
+    """跳过抓取失败的页继续往后翻，连续失败超过 skip_failed 页时停在 FAILED"""
+    pages = {1: ['a'], 2: None, 3: ['b'], 4: None, 5: None, 6: ['c'], 7: 'empty'}
+
+    def run(skip_failed):
+        walker = PageWalker(PageNumberPagination(str), pages.get,
+                            lambda key, content: [] if content == 'empty' else content, skip_failed=skip_failed)
+        return [key for key, _, _ in walker], walker.skipped, walker.stop_reason
+
+    assert run(0) == ([1], [], FAILED)
+    assert run(1) == ([1, 3], [2, 4], FAILED)
+    assert run(2) == ([1, 3, 6], [2, 4, 5], EMPTY)
+
+    # 跟随链接分页不知道失败页的下一页，仍然停下
+    walker = PageWalker(NextLinkPagination('http://x/list_1.htm'), lambda key: None, lambda key, content: [],
+                        skip_failed=3)
+    assert (list(walker), walker.stop_reason) == ([], FAILED)
+
+
+def test_next_link_follows_links():
+    pages = {
+        'http://x/list_1.htm': '<a href="list_2.htm">下一页</a><a href="/1.shtm">政策</a>',
+        'http://x/list_2.htm': '<a href="/2.shtm">政策</a>',
+    }
+    walker = PageWalker(NextLinkPagination('http://x/list_1.htm'), pages.get, lambda key, content: [content])
+    assert [key for key, _, _ in walker] == list(pages)
+    assert walker.stop_reason == LAST
+
+
+def test_prefetch_keeps_several_pages_in_flight():
+    """页码分页预取多页：同时在途的请求不止一个，请求的发出间隔仍由限速器控制"""
+    limiter = RateLimiter(rate=50, burst=1)
+    lock = threading.Lock()
+    state = {'current': 0, 'peak': 0}
+
+    def fetch(key):
+        limiter.wait('http://example.com/')
+        with lock:
+            state['current'] += 1
+            state['peak'] = max(state['peak'], state['current'])
+        time.sleep(0.1)
+        with lock:
+            state['current'] -= 1
+        return ['a', key] if key <= 8 else 'empty'
+
+    walker = PageWalker(PageNumberPagination(str), fetch, lambda key, content: [] if content == 'empty' else content,
+                        prefetch=4)
+    assert [key for key, _, _ in walker] == list(range(1, 9))
+    assert walker.stop_reason == EMPTY
+    assert 1 < state['peak'] <= 4
+    # 预取的请求在限速器上排队等待过
+    assert limiter.total_wait > 0
+
+
+def test_next_link_prefetches_one_page():
+    # 跟随链接分页要先拿到当前页才知道下一页
+    assert PageWalker(NextLinkPagination('http://x/'), None, None, prefetch=4).prefetch == 1
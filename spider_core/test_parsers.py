@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+解析后端一致性测试
+在保存的页面 output/film.html、output/cnblogs.html 上，三种后端解析出的记录必须完全相同
+"""
+
+import os
+import sys
+
+import pytest
+
+from spider_core.parsers import BACKENDS, LXML
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'p02_maoyan'))
+sys.path.insert(0, os.path.join(ROOT, 'p03_cnblogs'))
+
+from maoyan_spider import MaoyanSpider  # noqa: E402
+from cnblogs_spider import CnblogsSpider  # noqa: E402
+
+
+def read_fixture(name):
+    with open(os.path.join(ROOT, 'output', name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # 爬虫初始化时会在当前目录创建数据目录
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def parse_with_each_backend(spider, parse, html_content):
+    results = {}
+    for backend in BACKENDS:
+        spider.parser_backend = backend
+        results[backend] = parse(html_content)
+    return results
+
+
+def test_maoyan_backends_identical(workdir):
+    spider = MaoyanSpider()
+    results = parse_with_each_backend(spider, spider.parse_movie_info, read_fixture('film.html'))
+    # 不限制解析子树时结果也相同
+    spider.parser_backend, spider.list_strainer = LXML, None
+    results['full-tree'] = spider.parse_movie_info(read_fixture('film.html'))
+
+    assert len(results['html.parser']) == 10
+    assert results['html.parser'][0]['score'] == '9.3'
+    for backend in results:
+        assert results[backend] == results['html.parser'], backend
+
+
+def test_cnblogs_backends_identical(workdir):
+    spider = CnblogsSpider()
+    results = parse_with_each_backend(spider, spider.parse_blog_list, read_fixture('cnblogs.html'))
+    spider.parser_backend, spider.list_strainer = LXML, None
+    results['full-tree'] = spider.parse_blog_list(read_fixture('cnblogs.html'))
+
+    assert len(results['html.parser']) == 4
+    assert results['html.parser'][0]['read_count'] == 60826
+    for backend in results:
+        assert results[backend] == results['html.parser'], backend
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+测试按域名的令牌桶限速器
+"""
+
+import time
+
+from spider_core.ratelimit import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_throttle():
+    """突发额度用完后按速率等待"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=20, burst=2, clock=clock)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.05
+    # 透支的令牌按顺序排队
+    assert bucket.reserve() == 0.1
+    clock.now = 0.1
+    assert bucket.reserve() == 0.05
+
+    # 真实时钟下不检查精确的等待时间：机器负载高时两次调用之间已经过去的时间会抵扣等待
+    limiter = RateLimiter(rate=20, burst=2)
+    url = 'https://www.cnblogs.com/pinard'
+    assert limiter.wait(url) == 0
+    assert limiter.wait(url) == 0
+    assert 0 <= limiter.wait(url) <= 0.05
+
+
+def test_elapsed_time_counts_against_budget():
+    """请求耗费的时间计入间隔，不再重复等待"""
+    limiter = RateLimiter(rate=10, burst=1)
+    url = 'https://www.cnblogs.com/pinard'
+
+    limiter.wait(url)
+    time.sleep(0.1)  # 模拟一次网络请求的耗时
+    assert limiter.wait(url) == 0
+
+
+def test_hosts_are_independent_and_cdn_unthrottled():
+    """不同域名各自计数，未配置的图片域名不限速"""
+    limiter = RateLimiter(host_limits={'www.maoyan.com': (1, 1)})
+
+    assert limiter.wait('https://www.maoyan.com/board/4') == 0
+    for _ in range(5):
+        assert limiter.wait('https://p0.pipi.cn/mmdb/poster.jpg') == 0
+    assert limiter.wait('https://www.maoyan.com/board/4?offset=10') > 0.9
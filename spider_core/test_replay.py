@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+测试本地模拟站点与响应录制/回放
+爬虫指向 127.0.0.1 上的模拟站点，整个过程不访问外网
+"""
+
+import os
+import sys
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'p02_maoyan'))
+sys.path.insert(0, os.path.join(ROOT, 'p03_cnblogs'))
+sys.path.insert(0, os.path.join(ROOT, 'p04_bendibao'))
+from maoyan_spider import MaoyanSpider  # noqa: E402
+from cnblogs_spider import CnblogsSpider  # noqa: E402
+from enhanced_crawler import EnhancedSchoolPolicyCrawler  # noqa: E402
+from spider_core.mocksite import MockSite  # noqa: E402
+from spider_core.ratelimit import RateLimiter  # noqa: E402
+from spider_core.replay import RECORD, REPLAY, ResponseArchive, install_replay  # noqa: E402
+
+
+def offline(spider, site, name):
+    spider.base_url = site.base_url(name)
+    spider.rate_limiter = RateLimiter()
+    spider.retry_backoff = 0
+    return spider
+
+
+def test_crawls_run_against_mock_site(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with MockSite(pages=3, items_per_page=7) as site:
+        cnblogs = offline(CnblogsSpider(), site, 'cnblogs')
+        cnblogs.crawl_all_pages()
+        per_page = len(cnblogs.parse_blog_list(site.cnblogs_page(1)))
+        assert len(cnblogs.blog_data) == 3 * per_page
+        assert len({blog['url'] for blog in cnblogs.blog_data}) == 3 * per_page
+        assert all(blog['url'].startswith(site.url) for blog in cnblogs.blog_data)
+
+        bendibao = offline(EnhancedSchoolPolicyCrawler(), site, 'bendibao')
+        bendibao.crawl_all_pages()
+        assert [article['page'] for article in bendibao.all_data] == [1] * 7 + [2] * 7 + [3] * 7
+        assert bendibao.get_total_pages(site.bendibao_page(1)) == 3
+        bendibao.crawl_details()
+        assert bendibao.all_data[0]['content'] == f"正文 /news/1-0.shtm"
+
+        maoyan = offline(MaoyanSpider(), site, 'maoyan')
+        maoyan.crawl()
+        assert len(maoyan.movies_data) == 30
+        assert maoyan.movies_data[0]['local_image_path']
+
+
+def test_error_injection_and_retries(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # 第 2 页固定出错：重试后仍失败，爬取停在第 2 页
+    with MockSite(pages=4, errors={'/pinard/default.html?page=2': 503}) as site:
+        spider = offline(CnblogsSpider(), site, 'cnblogs')
+        spider.crawl_all_pages()
+        assert site.requests['/pinard/default.html?page=2'] == 1 + spider.retries
+        assert {blog['url'] for blog in spider.blog_data} == {
+            blog['url'] for blog in spider.parse_blog_list(site.cnblogs_page(1))}
+
+    # 随机错误由重试消化
+    with MockSite(pages=4, error_rate=0.3, seed=1) as site:
+        spider = offline(CnblogsSpider(), site, 'cnblogs')
+        spider.retries = 10
+        spider.crawl_all_pages()
+        assert site.failures > 0
+        assert len(spider.blog_data) == 4 * len(spider.parse_blog_list(site.cnblogs_page(1)))
+
+
+def test_record_then_replay_offline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    archive = str(tmp_path / 'archive')
+    with MockSite(pages=2) as site:
+        spider = offline(CnblogsSpider(), site, 'cnblogs')
+        spider.use_archive(archive, RECORD)
+        spider.crawl_all_pages()
+        recorded = spider.blog_data
+        base_url = spider.base_url
+    # 末页之后预取的页（最多 list_prefetch 页）可能已经录制
+    assert 3 <= len(ResponseArchive(archive)) <= 3 + spider.list_prefetch
+
+    # 站点已关闭，回放时只读存档
+    spider = CnblogsSpider()
+    spider.base_url = base_url
+    spider.use_archive(archive, REPLAY)
+    spider.crawl_all_pages()
+    assert spider.blog_data == recorded
+    assert spider.replay.hits >= 3
+
+    session = requests.Session()
+    install_replay(session, archive)
+    assert session.get(base_url + '/default.html?page=9').status_code == 404
+
+    # 模拟站点也可以直接返回存档中的页面
+    with MockSite(pages=0, archive=archive) as site:
+        spider = offline(CnblogsSpider(), site, 'cnblogs')
+        spider.crawl_all_pages()
+        assert [blog['title'] for blog in spider.blog_data] == [blog['title'] for blog in recorded]
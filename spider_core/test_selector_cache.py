@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+测试学习型选择器缓存
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'p04_bendibao'))
+
+from enhanced_crawler import EnhancedSchoolPolicyCrawler  # noqa: E402
+
+PAGE = '''<div class="header"></div><div class="news-box"><ul>
+<li><a href="/news/{0}1.shtm">政策{0}1</a><span class="time">2025-01-02</span></li>
+<li><a href="/news/{0}2.shtm">政策{0}2</a><span class="time">2025-01-03</span></li>
+</ul></div>'''
+
+# 模板骨架相同，但列表结构改成了 ol
+CHANGED_PAGE = '''<div class="header"></div><div class="news-box"><ol>
+<li class="news-item"><a href="/news/91.shtm">政策91</a></li>
+</ol></div>'''
+
+
+def test_selector_learned_and_reused_across_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    crawler = EnhancedSchoolPolicyCrawler()
+
+    first = crawler.parse_page(PAGE.format(1), 1)
+    second = crawler.parse_page(PAGE.format(2), 2)
+    assert [a['title'] for a in first + second] == ['政策11', '政策12', '政策21', '政策22']
+    assert (crawler.selector_cache.searches, crawler.selector_cache.hits) == (1, 1)
+    assert list(crawler.selector_cache.choices.values()) == ['.news-box li']
+    crawler.selector_cache.save()
+
+    # 下一次运行直接命中
+    rerun = EnhancedSchoolPolicyCrawler()
+    assert len(rerun.parse_page(PAGE.format(3), 3)) == 2
+    assert (rerun.selector_cache.searches, rerun.selector_cache.hits) == (0, 1)
+
+
+def test_stale_selector_falls_back_to_full_search(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    crawler = EnhancedSchoolPolicyCrawler()
+    crawler.parse_page(PAGE.format(1), 1)
+
+    # 模拟已知选择器只匹配旧的 ul 结构
+    key = next(iter(crawler.selector_cache.choices))
+    crawler.selector_cache.choices[key] = 'ul.list li'
+    articles = crawler.parse_page(CHANGED_PAGE, 2)
+
+    assert [a['title'] for a in articles] == ['政策91']
+    assert crawler.selector_cache.stale == 1
+    assert crawler.selector_cache.choices[key] == '.news-box li'
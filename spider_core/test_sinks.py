@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+测试流式数据输出
+"""
+
+import json
+
+from spider_core.sinks import JsonlSink, iter_jsonl, write_pretty_json
+
+RECORDS = [
+    {'name': '霸王别姬', 'stars': '张国荣,张丰毅,巩俐', 'score': '9.5'},
+    {'name': '肖申克的救赎', 'stars': '蒂姆·罗宾斯', 'score': 9.3, 'tags': ['剧情', None]},
+]
+
+
+def test_jsonl_round_trip_skips_truncated_line(tmp_path):
+    path = tmp_path / 'data.jsonl'
+    with JsonlSink(str(path)) as sink:
+        sink.write_many(RECORDS)
+    assert sink.count == 2
+    # 模拟崩溃时写了一半的最后一行
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"name": "半')
+    assert list(iter_jsonl(str(path))) == RECORDS
+
+
+def test_pretty_json_matches_json_dump(tmp_path):
+    for records in (RECORDS, []):
+        path = tmp_path / 'out.json'
+        write_pretty_json(iter(records), str(path))
+        assert path.read_text(encoding='utf-8') == json.dumps(records, ensure_ascii=False, indent=2)
+
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+测试爬虫公共运行时
+不访问网络，用假的 session 和页面模拟请求
+"""
+
+import datetime
+
+import requests
+
+from spider_core.sinks import iter_jsonl
+from spider_core.spider import BaseSpider, records_alias
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.elapsed = datetime.timedelta(0)
+        self.encoding = None
+
+
+class NumberSpider(BaseSpider):
+    """每页 3 条记录，第 4 页起为空页"""
+    rate = None
+    retry_backoff = 0
+    db_table = 'numbers'
+    db_columns = [('url', 'TEXT NOT NULL'), ('page', 'INTEGER')]
+    item_name = '条'
+    numbers = records_alias()
+
+    def __init__(self):
+        super().__init__(cache_dir=None)
+        self.base_url = "http://example.com/list_{}.htm"
+        self.jsonl_path = "numbers.jsonl"
+        self.checkpoint_path = "numbers_checkpoint.json"
+        self.db_path = "numbers.db"
+
+    def get_page_content(self, page_num):
+        return 'empty' if page_num > 3 else f'page {page_num}'
+
+    def parse(self, page_num, content):
+        if content == 'empty':
+            return []
+        return [{'url': f'http://example.com/{page_num}/{i}', 'page': page_num} for i in range(3)]
+
+
+def test_crawl_pages_writes_every_output(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    spider = NumberSpider()
+    assert spider.crawl_pages() == 9
+    assert spider.numbers == spider.records
+    assert list(iter_jsonl(spider.jsonl_path)) == spider.records
+    assert [record['page'] for record in spider.records] == [1, 1, 1, 2, 2, 2, 3, 3, 3]
+    with spider.open_db() as db:
+        assert db.row_count() == 9
+    assert not (tmp_path / spider.checkpoint_path).exists()
+
+
+def test_fetch_retries_transient_errors(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    spider = NumberSpider()
+    responses = [requests.ConnectionError('reset'), FakeResponse(503), FakeResponse(200, 'ok')]
+
+    def get(url, timeout=None):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    spider.session.get = get
+    assert spider.fetch('http://example.com/') == 'ok'
+    assert spider.metrics.counter('retries') == 2
+    assert spider.metrics.counter('responses', status=503) == 1
+
+    # 404 不重试
+    responses[:] = [FakeResponse(404), FakeResponse(200, 'ok')]
+    assert spider.fetch('http://example.com/') is None
+    assert len(responses) == 1
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+测试 SQLite 存储
+"""
+
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'p03_cnblogs'))
+from cnblogs_spider import CnblogsSpider  # noqa: E402
+
+BLOGS_JSON = os.path.join(ROOT, 'p03_cnblogs', 'cnblogs_pinard_data_20251022_162819.json')
+
+
+def load_blogs():
+    with open(BLOGS_JSON, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_recrawl_updates_rows_in_place(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    spider = CnblogsSpider()
+    blogs = load_blogs()
+
+    with spider.open_db() as db:
+        db.write_many(blogs)
+    # 第二次爬取：阅读量变化，行数不变
+    for blog in blogs:
+        blog['read_count'] += 1
+    with spider.open_db() as db:
+        db.write_many(blogs)
+        assert db.row_count() == len({blog['url'] for blog in blogs})
+        row = db.query("SELECT read_count FROM blogs WHERE url = ?", (blogs[0]['url'],))[0]
+        assert row['read_count'] == blogs[0]['read_count']
+
+    top = spider.top_read_since('2019-01-01', limit=3)
+    expected = sorted((blog for blog in blogs if blog['publish_time'] >= '2019-01-01'),
+                      key=lambda blog: -blog['read_count'])[:3]
+    assert [row['url'] for row in top] == [blog['url'] for blog in expected]
+
+
+def test_date_query_uses_index(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with CnblogsSpider().open_db() as db:
+        db.write_many(load_blogs())
+        db.flush()
+        # 有数据并更新统计信息后，规划器才按真实分布选择
+        db.conn.execute("ANALYZE")
+        plan = db.query_plan("SELECT * FROM blogs WHERE publish_time >= ? ORDER BY read_count DESC", ('2019-01-01',))
+    # 规划器按数据分布在 publish_time 和 read_count 索引之间选择，但不会全表扫描
+    assert any('USING INDEX idx_blogs_' in detail for detail in plan)